@@ -0,0 +1,9 @@
+"""Collection settings for the whole tree."""
+
+import sys
+
+collect_ignore = []
+
+if sys.version_info < (3, 5):
+    # async/await is a syntax error before Python 3.5, for pylama as well
+    collect_ignore.extend(['napalm_exaros/aio.py', 'test/unit/test_aio.py'])
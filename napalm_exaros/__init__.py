@@ -11,15 +11,50 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations under
 # the License.
-"""napalm-exaros package."""
+"""napalm-exaros package.
 
-from napalm_exaros.exaros import ExaROSDriver
+ExaROSDriver and __version__ are resolved on first access, so that
+importing the package, or its offline modules such as parser and diff,
+does not import napalm_base.
+"""
 
-import pkg_resources
+import sys
 
-try:
-    __version__ = pkg_resources.get_distribution('napalm-exaros').version
-except pkg_resources.DistributionNotFound:
-    __version__ = "Not installed"
+# Version reported when the distribution metadata is not available
+VERSION = "0.1.0"
 
 __all__ = ['ExaROSDriver']
+
+
+def _version():
+    """Return the version of the installed distribution."""
+    try:
+        from importlib.metadata import PackageNotFoundError, version
+    except ImportError:
+        return VERSION
+    try:
+        return version('napalm-exaros')
+    except PackageNotFoundError:
+        return VERSION
+
+
+def __getattr__(name):
+    """Import ExaROSDriver and compute __version__ on first access."""
+    if name == 'ExaROSDriver':
+        from napalm_exaros.exaros import ExaROSDriver
+        return ExaROSDriver
+    if name == '__version__':
+        return _version()
+    raise AttributeError("module {0!r} has no attribute {1!r}".format(
+        __name__, name))
+
+
+def __dir__():
+    """List the lazily resolved attributes with the module globals."""
+    return sorted(set(globals()) | {'ExaROSDriver', '__version__'})
+
+
+if sys.version_info < (3, 7):  # pragma: no cover
+    # module __getattr__ needs Python 3.7
+    from napalm_exaros.exaros import ExaROSDriver  # noqa
+    __version__ = _version()
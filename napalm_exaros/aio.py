@@ -0,0 +1,305 @@
+# Copyright 2017 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Asyncio driver module for ExaROS.
+
+Requires Python 3.5+ and asyncssh.
+"""
+
+import asyncio
+import posixpath
+import re
+
+from napalm_base.exceptions import (
+    CommitError,
+    ConnectionClosedException,
+    ConnectionException,
+    MergeConfigException,
+    ReplaceConfigException,
+    )
+
+from napalm_exaros import commands
+from napalm_exaros.utils import config_buffer
+
+try:
+    import asyncssh
+except ImportError:  # pragma: no cover
+    asyncssh = None
+
+MAX_READ = 65535
+NEWLINES = re.compile(r'(?:\r\r\n|\r\n|\n\r)')
+ANY_PROMPT = re.compile(r'[#>$]\s*$')
+LOGIN_TIMEOUT = 2
+
+
+class AsyncExaROSDriver(object):
+    """Asyncio driver for ExaROS.
+
+    Provides the configuration methods of ExaROSDriver as coroutines, so
+    that one event loop can manage many concurrent device sessions.
+    """
+
+    def __init__(self, hostname, username, password,
+                 timeout=60, optional_args=None):
+        """Constructor."""
+        self.hostname = hostname
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+
+        if optional_args is None:
+            optional_args = {}
+
+        self.candidate = "candidate.conf"
+        self.port = optional_args.get('port', 22)
+        self.command_timeout = (commands.COMMAND_TIMEOUT *
+                                optional_args.get('global_delay_factor', 1))
+
+        # asyncssh equivalents of the netmiko arguments used by ExaROSDriver
+        self.connect_args = {
+            'keepalive_interval': optional_args.get('keepalive', 30),
+        }
+        if not optional_args.get('ssh_strict', False):
+            self.connect_args['known_hosts'] = None
+        if optional_args.get('use_keys', False):
+            if optional_args.get('key_file'):
+                self.connect_args['client_keys'] = [optional_args['key_file']]
+        else:
+            self.connect_args['client_keys'] = None
+
+        self._conn = None
+        self._shell = None
+        self._prompt = None
+        self._config_mode = False
+
+    async def __aenter__(self):
+        """Open the connection on entering an async with block."""
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """Close the connection on leaving an async with block."""
+        await self.close()
+
+    async def open(self):
+        """Open a connection to the device."""
+        if asyncssh is None:
+            raise ImportError("asyncssh is required for AsyncExaROSDriver")
+        try:
+            self._conn = await asyncio.wait_for(
+                asyncssh.connect(self.hostname, port=self.port,
+                                 username=self.username,
+                                 password=self.password,
+                                 **self.connect_args),
+                self.timeout)
+            self._shell = await self._conn.create_process(
+                term_type='vt100', term_size=(511, 24))
+        except (OSError, asyncio.TimeoutError, asyncssh.Error) as e:
+            raise ConnectionException(str(e))
+        await self._session_preparation()
+
+    async def _session_preparation(self):
+        """Prepare the session after the connection has been established."""
+        # consume the prompt printed at login, as netmiko does, so that it
+        # is not mistaken for the prompt following the first command
+        try:
+            await asyncio.wait_for(
+                self._read(commands.CompletionScanner(ANY_PROMPT)),
+                LOGIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+        self._shell.stdin.write('\n')
+        output = await self._read(commands.CompletionScanner(ANY_PROMPT))
+        prompt = output.strip().splitlines()[-1].strip()
+        self._prompt = commands.prompt_pattern(prompt[:-1])
+        for command in commands.SESSION_PREPARATION:
+            await self._send_command(command)
+
+    async def close(self):
+        """Close the connection to the device."""
+        if self._conn is None:
+            return
+        try:
+            await self.discard_config()
+        except Exception:
+            pass
+        finally:
+            self._conn.close()
+            await self._conn.wait_closed()
+            self._conn = None
+            self._shell = None
+
+    async def _read(self, scanner):
+        """Read from the shell until the scanner reports completion."""
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + self.command_timeout
+        chunks = []
+        while True:
+            data = await asyncio.wait_for(self._shell.stdout.read(MAX_READ),
+                                          max(0, deadline - loop.time()))
+            if not data:
+                raise ConnectionClosedException("Connection closed by device")
+            chunks.append(data)
+            if scanner.feed(data):
+                return "".join(chunks)
+
+    async def _send_command(self, command, markers=commands.NO_MARKERS,
+                            strip_prompt=True, strip_command=True):
+        """Send command and return its outcome and output."""
+        self._shell.stdin.write(command + '\n')
+        output = await self._read(commands.CompletionScanner(self._prompt))
+        output = NEWLINES.sub('\n', output)
+        if strip_command:
+            output = output.split('\n', 1)[-1] if '\n' in output else ""
+        if strip_prompt:
+            output = output.rsplit('\n', 1)[0] if '\n' in output else ""
+        return markers.match(output), output
+
+    async def _enter_config_mode(self):
+        """Enter configuration mode if not already in it."""
+        if not self._config_mode:
+            await self._send_command(commands.CONFIG_MODE)
+            self._config_mode = True
+
+    async def is_alive(self):
+        """Return a flag with the state of the SSH connection."""
+        if self._conn is None:
+            return {'is_alive': False}
+        try:
+            await self._send_command('')
+        except (OSError, EOFError, asyncio.TimeoutError, asyncssh.Error,
+                ConnectionClosedException):
+            return {'is_alive': False}
+        return {'is_alive': True}
+
+    async def load_replace_candidate(self, filename=None, config=None):
+        """Load replace candidate config file to device."""
+        try:
+            return await self._load_candidate(
+                source_file=filename, source_config=config,
+                operation=commands.REPLACE_CONFIG)
+        except Exception as e:
+            raise ReplaceConfigException(e)
+
+    async def load_merge_candidate(self, filename=None, config=None):
+        """Load merge candidate config file to device."""
+        try:
+            return await self._load_candidate(
+                source_file=filename, source_config=config,
+                operation=commands.MERGE_CONFIG)
+        except Exception as e:
+            raise MergeConfigException(e)
+
+    async def _load_candidate(self, source_file=None, source_config=None,
+                              operation=commands.MERGE_CONFIG):
+        """Load candidate config."""
+        if source_file:
+            with open(source_file, 'rb') as fobj:
+                data = fobj.read()
+        elif source_config:
+            data = config_buffer(source_config).getvalue()
+        else:
+            raise ValueError("Must provide either source_file or "
+                             "source_config")
+        await self._scp_put_data(data, self.candidate)
+        await self._enter_config_mode()
+        outcome, output = await self._send_command(
+            commands.LOAD.format(operation=operation, file=self.candidate),
+            markers=commands.LOAD_MARKERS, strip_prompt=False,
+            strip_command=False)
+        if outcome != commands.OUTCOME_SUCCESS:
+            raise Exception("Load failed:\n\n{0}".format(output))
+        return True
+
+    async def _scp_put_data(self, data, dest_file):
+        """Put data to a remote file using the SCP sink protocol."""
+        process = await self._conn.create_process(
+            'scp -t {0}'.format(dest_file), encoding=None)
+        try:
+            await self._scp_ack(process)
+            header = 'C0644 {0} {1}\n'.format(
+                len(data), posixpath.basename(dest_file))
+            process.stdin.write(header.encode('utf-8'))
+            await self._scp_ack(process)
+            process.stdin.write(data + b'\0')
+            await self._scp_ack(process)
+            # end the transfer, and let the sink exit before the channel
+            # is closed
+            process.stdin.write_eof()
+            await asyncio.wait_for(process.wait_closed(),
+                                   self.command_timeout)
+        finally:
+            process.close()
+            await process.wait_closed()
+
+    @staticmethod
+    async def _scp_ack(process):
+        """Wait for an SCP acknowledgement."""
+        code = await process.stdout.read(1)
+        if code != b'\0':
+            message = await process.stdout.readline()
+            raise IOError("SCP transfer failed: {0}".format(
+                message.decode('utf-8', 'replace').strip()))
+
+    async def discard_config(self):
+        """Discard the configuration loaded into the candidate."""
+        if self._config_mode:
+            await self._send_command(commands.EXIT_CONFIG_MODE)
+            self._config_mode = False
+
+    async def compare_config(self):
+        """Compare the candidate and running configurations."""
+        await self._enter_config_mode()
+        outcome, output = await self._send_command(
+            commands.COMPARE, markers=commands.COMPARE_MARKERS)
+        if outcome == commands.OUTCOME_NOOP:
+            return ""
+        return output
+
+    async def commit_config(self):
+        """Commit the candidate configuration."""
+        try:
+            command = commands.commit_command(label=commands.COMMIT_LABEL)
+            await self._enter_config_mode()
+            outcome, output = await self._send_command(
+                commands.COMMIT_CHECK, markers=commands.COMMIT_CHECK_MARKERS,
+                strip_prompt=False, strip_command=False)
+            if outcome != commands.OUTCOME_SUCCESS:
+                raise ValueError(
+                    "Commit check failed:\n\n{0}".format(output))
+            outcome, output = await self._send_command(
+                command, markers=commands.COMMIT_MARKERS,
+                strip_prompt=False, strip_command=False)
+            if outcome not in (commands.OUTCOME_SUCCESS,
+                               commands.OUTCOME_NOOP):
+                raise ValueError("Commit failed:\n\n{0}".format(output))
+            return output
+        except Exception as e:
+            raise CommitError(e)
+
+    async def get_config(self, retrieve="all"):
+        """Get the device configuration."""
+        stores = ["all", "running", "candidate", "startup"]
+        if retrieve not in stores:
+            raise ValueError("retrieve should be one of {0}".format(stores))
+        output = {
+            "running": "",
+            "candidate": "",
+            "startup": ""
+        }
+        for store in ("running", "candidate"):
+            if retrieve in ("all", store):
+                await self._enter_config_mode()
+                outcome, output[store] = await self._send_command(
+                    commands.CONFIG_STORES[store])
+        return output
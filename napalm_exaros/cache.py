@@ -0,0 +1,111 @@
+# Copyright 2017 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Cache of running configurations keyed by device and commit."""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import collections
+import glob
+import hashlib
+import io
+import os
+import threading
+import uuid
+
+
+def _digest(value):
+    """Return a filename-safe digest of value."""
+    return hashlib.sha1(value.encode('utf-8')).hexdigest()
+
+
+class ConfigCache(object):
+    """LRU cache of running configurations.
+
+    Entries are keyed by device and by the ID of the latest commit, so an
+    entry stays valid until the next commit on the device. At most maxsize
+    entries are held in memory. If path is given, entries are also
+    written to files in that directory and survive the process.
+
+    A single cache may be shared by any number of drivers and threads.
+    """
+
+    def __init__(self, maxsize=128, path=None):
+        """Constructor."""
+        self.maxsize = maxsize
+        self.path = path
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        if path and not os.path.isdir(path):
+            os.makedirs(path)
+
+    def __len__(self):
+        """Return the number of entries held in memory."""
+        return len(self._entries)
+
+    def _filename(self, device, commit_id):
+        """Return the path of the file holding an entry."""
+        return os.path.join(self.path, '{0}-{1}.conf'.format(
+            _digest(device), _digest(commit_id)))
+
+    def get(self, device, commit_id):
+        """Return the cached configuration, or None."""
+        key = (device, commit_id)
+        with self._lock:
+            config = self._entries.pop(key, None)
+            if config is not None:
+                self._entries[key] = config
+                return config
+        if self.path:
+            try:
+                with io.open(self._filename(device, commit_id),
+                             encoding='utf-8') as fobj:
+                    config = fobj.read()
+            except IOError:
+                return None
+            self._store(key, config)
+        return config
+
+    def put(self, device, commit_id, config):
+        """Cache the configuration of device as of commit_id."""
+        self._store((device, commit_id), config)
+        if self.path:
+            filename = self._filename(device, commit_id)
+            # write then rename, so that readers never see a partial file
+            tmp_file = '{0}.{1}.tmp'.format(filename, uuid.uuid4().hex)
+            with io.open(tmp_file, 'w', encoding='utf-8') as fobj:
+                fobj.write(config)
+            os.rename(tmp_file, filename)
+
+    def _store(self, key, config):
+        """Add an entry in memory, evicting the least recently used."""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = config
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, device):
+        """Remove every entry for device."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == device]:
+                del self._entries[key]
+        if self.path:
+            pattern = os.path.join(self.path,
+                                   '{0}-*.conf'.format(_digest(device)))
+            for filename in glob.glob(pattern):
+                try:
+                    os.remove(filename)
+                except OSError:
+                    pass
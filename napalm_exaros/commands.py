@@ -0,0 +1,251 @@
+# Copyright 2017 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""ExaROS CLI command strings and completion markers.
+
+This module has no dependency on the SSH transport, so that every
+transport implementation can share the same command set.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import re
+from collections import namedtuple
+
+SESSION_PREPARATION = ('session paginate disable', 'terminal width 511')
+CONFIG_MODE = 'configure private'
+CONFIG_PROMPT = r'\)#'
+EXIT_CONFIG_MODE = 'abort'
+SHOW_RUNNING = 'show configuration running all'
+SHOW_CANDIDATE = 'show candidate all'
+LOAD = 'load {operation} {file}'
+MERGE_CONFIG = 'merge'
+REPLACE_CONFIG = 'replace'
+COMPARE = 'show candidate diff all'
+COMMIT_CHECK = 'commit check'
+COMMIT = 'commit'
+COMMIT_LABEL = "configured using napalm_exaros"
+COMMIT_ABORT = 'commit abort'
+COMMIT_LIST = 'show configuration commit list'
+ROLLBACK = 'rollback configuration {commit_id}'
+ROLLBACK_COMMENT = "rollback of commit {0} using napalm_exaros"
+SHOW_VERSION = 'show version'
+SHOW_INTERFACE = 'show interface'
+SHOW_LLDP_NEIGHBORS = 'show lldp neighbors'
+SHOW_BGP_NEIGHBOR = 'show bgp neighbor'
+EXIT = 'exit'
+NEGATE = 'no {0}'
+# Run an operational command from a configuration session
+OPERATIONAL = 'do {0}'
+
+CONFIG_STORES = {
+    "running": SHOW_RUNNING,
+    "candidate": SHOW_CANDIDATE,
+}
+# Commands showing the section of a configuration store at a path
+CONFIG_SECTION_STORES = {
+    "running": 'show configuration running {path}',
+    "candidate": 'show candidate {path}',
+}
+
+# CLI session modes tracked by transports: operational mode, a private
+# configuration session with no changes, one that may hold changes, or
+# unknown until the prompt is read again
+MODE_UNKNOWN = 'unknown'
+MODE_OPERATIONAL = 'operational'
+MODE_CONFIG = 'config'
+MODE_DIRTY = 'dirty'
+
+OUTCOME_SUCCESS = 'success'
+OUTCOME_FAILURE = 'failure'
+OUTCOME_NOOP = 'noop'
+OUTCOME_PROMPT = 'prompt'
+
+COMPLETE_PROMPT = 'prompt'
+COMPLETE_MARKER = 'marker'
+
+# Validation of the candidate before a commit: a separate 'commit check'
+# exchange, 'commit check' pipelined with the commit in one exchange, or
+# only the validation done by the commit itself
+COMMIT_CHECK_SEPARATE = 'separate'
+COMMIT_CHECK_PIPELINED = 'pipelined'
+COMMIT_CHECK_SKIP = 'skip'
+COMMIT_CHECK_MODES = (COMMIT_CHECK_SEPARATE, COMMIT_CHECK_PIPELINED,
+                      COMMIT_CHECK_SKIP)
+
+# Liveness probe tiers, in increasing order of cost and confidence
+ALIVE_TRANSPORT = 'transport'
+ALIVE_KEEPALIVE = 'keepalive'
+ALIVE_PROMPT = 'prompt'
+ALIVE_TIERS = (ALIVE_TRANSPORT, ALIVE_KEEPALIVE, ALIVE_PROMPT)
+KEEPALIVE_REQUEST = 'keepalive@openssh.com'
+
+ERRORS = (r'^\s*(?:% ?)?(?:Error|Aborted|syntax error)\b',)
+
+# First row of the commit list, which is the latest commit
+COMMIT_ID = re.compile(r'^\s*\d+\s+(?P<id>\d+)\s', re.MULTILINE)
+# Any row of the commit list
+COMMIT_ROW = re.compile(r'^\s*\d+\s+(?P<id>\d+)\s.*$', re.MULTILINE)
+
+# Upper bound in seconds on the wait for a command, per unit delay_factor
+COMMAND_TIMEOUT = 100
+# Default wait in seconds for the reply to a liveness probe
+ALIVE_TIMEOUT = 5
+# Trailing characters re-searched on each read, so that markers split
+# across reads are still found
+SEARCH_WINDOW = 256
+
+
+def _compile(patterns):
+    """Compile a sequence of patterns into a single regex."""
+    if not patterns:
+        return None
+    return re.compile('|'.join('(?:{0})'.format(p) for p in patterns),
+                      re.MULTILINE)
+
+
+class Markers(namedtuple('Markers',
+                         ['success', 'failure', 'noop', 'terminal'])):
+    """Compiled completion markers for a CLI command.
+
+    Each argument is a sequence of regular expressions. The success and
+    no-op markers are terminal: once either is seen, the command is known
+    to be complete. Failure markers only classify the output, so that the
+    full error text is collected up to the prompt.
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, success=(), failure=(), noop=()):
+        """Compile the marker patterns."""
+        return super(Markers, cls).__new__(
+            cls, _compile(success), _compile(failure), _compile(noop),
+            _compile(list(success) + list(noop)))
+
+    def match(self, output):
+        """Return the outcome indicated by the output of a command."""
+        if self.failure and self.failure.search(output):
+            return OUTCOME_FAILURE
+        if self.noop and self.noop.search(output):
+            return OUTCOME_NOOP
+        if self.success and self.success.search(output):
+            return OUTCOME_SUCCESS
+        return OUTCOME_PROMPT
+
+
+def prompt_pattern(base_prompt):
+    """Return a regex matching the device prompt at the end of output."""
+    return re.compile(re.escape(base_prompt[:16]) + r'[^\n]*[#>$]\s*$')
+
+
+def batch_prompt_pattern(base_prompt):
+    """Return a regex matching the prompt at the start of any line.
+
+    In the output of pipelined commands, each prompt but the last is
+    followed on the same line by the echo of the next command.
+    """
+    return re.compile('^' + re.escape(base_prompt[:16]) + r'[^\n]*?[#>$] ?',
+                      re.MULTILINE)
+
+
+def commit_command(comment=None, label=None, confirmed=None):
+    """Return the commit command for the given comment and label.
+
+    If confirmed is given, the commit is reverted unless it is confirmed
+    within that many minutes.
+    """
+    command = COMMIT
+    if comment:
+        if '"' in comment:
+            raise ValueError("Invalid comment contains double quote")
+        command += ' comment "{0}"'.format(comment)
+    if label:
+        if '"' in label:
+            raise ValueError("Invalid label contains double quote")
+        command += ' label "{0}"'.format(label)
+    if confirmed:
+        command += ' confirmed {0}'.format(int(confirmed))
+    return command
+
+
+def commit_id_by_label(commit_list, label):
+    """Return the ID of the latest commit with label, or None.
+
+    commit_list is the output of 'show configuration commit list', whose
+    rows are ordered from the latest commit.
+    """
+    for row in COMMIT_ROW.finditer(commit_list):
+        if label in row.group(0):
+            return row.group('id')
+    return None
+
+
+def section_command(store, path):
+    """Return the command showing the configuration at path in store.
+
+    path is a configuration line, such as 'interface x-eth 0/0/1', or a
+    sequence of lines leading to a nested section.
+    """
+    if store not in CONFIG_SECTION_STORES:
+        raise ValueError("store should be one of {0}".format(
+            list(CONFIG_SECTION_STORES)))
+    if not hasattr(path, 'split'):
+        path = " ".join(path)
+    # a path spanning several lines would run several commands
+    path = " ".join(path.split())
+    if not path:
+        raise ValueError("Invalid empty configuration path")
+    return CONFIG_SECTION_STORES[store].format(path=path)
+
+
+class CompletionScanner(object):
+    """Incrementally detect the completion of a command in its output."""
+
+    __slots__ = ('prompt', 'terminal', '_tail')
+
+    def __init__(self, prompt, terminal=None):
+        """Constructor."""
+        self.prompt = prompt
+        self.terminal = terminal
+        self._tail = ""
+
+    def feed(self, data):
+        """Scan the next chunk of output.
+
+        Return COMPLETE_PROMPT once the output ends in the prompt,
+        COMPLETE_MARKER if a terminal marker has been seen, and None
+        otherwise.
+        """
+        window = self._tail + data
+        if self.prompt.search(window):
+            return COMPLETE_PROMPT
+        if self.terminal and self.terminal.search(window):
+            return COMPLETE_MARKER
+        self._tail = window[-SEARCH_WINDOW:]
+        return None
+
+
+NO_MARKERS = Markers()
+LOAD_MARKERS = Markers(success=[re.escape('Operation completed successfully')],
+                       failure=ERRORS)
+COMPARE_MARKERS = Markers(
+    noop=[re.escape('% No configuration changes found.')])
+COMMIT_CHECK_MARKERS = Markers(success=[re.escape('Validation complete')],
+                               failure=ERRORS)
+CONFIG_SET_MARKERS = Markers(failure=ERRORS)
+ROLLBACK_MARKERS = Markers(failure=ERRORS)
+SECTION_MARKERS = Markers(failure=ERRORS)
+COMMIT_MARKERS = Markers(success=[re.escape('Commit complete.')],
+                         failure=ERRORS,
+                         noop=[re.escape('% No modifications to commit.')])
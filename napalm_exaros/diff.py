@@ -0,0 +1,315 @@
+# Copyright 2017 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Offline structural diff of ExaROS configurations.
+
+The diff is computed on parsed configuration trees, in time linear in
+the size of the configurations. Each line is prefixed with '+' if it
+would be added, '-' if it would be removed, or ' ' if it only gives the
+context of a change, as in the output of 'show candidate diff all'.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from napalm_exaros.commands import EXIT, MERGE_CONFIG, NEGATE, REPLACE_CONFIG
+from napalm_exaros.parser import CLOSER, ConfigNode, END_PREFIX, parse
+
+ADDED = '+'
+REMOVED = '-'
+CONTEXT = ' '
+# Headers of unified diffs, which carry no configuration
+DIFF_HEADERS = ('---', '+++', '@@')
+
+
+def _tree(config):
+    """Return config as a parsed tree."""
+    if isinstance(config, ConfigNode):
+        return config
+    return parse(config)
+
+
+def _subtree(prefix, node, depth):
+    """Yield the lines of node and its block, all with prefix."""
+    indent = " " * depth
+    yield prefix + indent + node.line
+    for line in node.render(depth + 1):
+        yield prefix + line
+    for closer in node.closers:
+        yield prefix + indent + closer
+
+
+def _block(node, changes, depth):
+    """Return the changes to the block of node, wrapped in context."""
+    if not changes:
+        return changes
+    indent = " " * depth
+    lines = [CONTEXT + indent + node.line]
+    lines.extend(changes)
+    lines.extend(CONTEXT + indent + closer for closer in node.closers)
+    return lines
+
+
+def _replace(running, candidate, depth=0):
+    """Return the changes to make the children of running match candidate."""
+    lines = []
+    for child in running:
+        if child.key not in candidate:
+            lines.extend(_subtree(REMOVED, child, depth))
+    for child in candidate:
+        current = running.get(child.key)
+        if current is None:
+            lines.extend(_subtree(ADDED, child, depth))
+        else:
+            lines.extend(_block(child, _replace(current, child, depth + 1),
+                                depth))
+    return lines
+
+
+def _is_leaf(node):
+    """Return True if node is a leaf rather than a (possibly empty) block."""
+    return not node.children and not node.closers
+
+
+def _replaced_leaf(running, candidate, keyword):
+    """Return the leaf of running that a candidate leaf would overwrite.
+
+    A leaf replaces an existing leaf with the same keyword if that keyword
+    is unique at this level of both configurations, as with 'description'
+    or 'admin-state'.
+    """
+    existing = running.unique(keyword)
+    if existing is None or not _is_leaf(existing):
+        return None
+    new = candidate.unique(keyword)
+    if new is None or not _is_leaf(new):
+        return None
+    return existing
+
+
+def _merge(running, candidate, depth=0):
+    """Return the changes from merging the children of candidate."""
+    lines = []
+    for child in candidate:
+        current = running.get(child.key)
+        if current is not None:
+            lines.extend(_block(child, _merge(current, child, depth + 1),
+                                depth))
+            continue
+        if _is_leaf(child):
+            replaced = _replaced_leaf(running, candidate, child.keyword)
+            if replaced is not None:
+                lines.extend(_subtree(REMOVED, replaced, depth))
+        lines.extend(_subtree(ADDED, child, depth))
+    return lines
+
+
+def diff(running, candidate, operation=REPLACE_CONFIG):
+    """Return the diff from loading candidate onto running.
+
+    running and candidate are configuration text or parsed trees, and
+    operation is either 'replace' or 'merge'. Return "" if loading the
+    candidate would not change anything.
+    """
+    if operation == REPLACE_CONFIG:
+        lines = _replace(_tree(running), _tree(candidate))
+    elif operation == MERGE_CONFIG:
+        lines = _merge(_tree(running), _tree(candidate))
+    else:
+        raise ValueError("Invalid operation type: {0}".format(operation))
+    return "\n".join(lines)
+
+
+def _exit(node):
+    """Return the command that leaves the context entered by node."""
+    for closer in node.closers:
+        if closer.startswith(END_PREFIX):
+            return closer
+    return EXIT
+
+
+def _set_commands(node):
+    """Yield the commands that configure node and its block."""
+    yield node.key
+    if not _is_leaf(node):
+        for child in node:
+            for command in _set_commands(child):
+                yield command
+        yield _exit(node)
+
+
+def _delta(running, candidate, replace):
+    """Return the commands to apply candidate below running."""
+    commands = []
+    if replace:
+        for child in running:
+            if child.key in candidate:
+                continue
+            if (_is_leaf(child) and _replaced_leaf(
+                    running, candidate, child.keyword) is not None):
+                # setting the new value overwrites the old one
+                continue
+            commands.append(NEGATE.format(child.key))
+    for child in candidate:
+        current = running.get(child.key)
+        if current is None:
+            commands.extend(_set_commands(child))
+            continue
+        nested = _delta(current, child, replace)
+        if nested:
+            commands.append(child.key)
+            commands.extend(nested)
+            commands.append(_exit(child))
+    return commands
+
+
+def delta_commands(running, candidate, operation=REPLACE_CONFIG):
+    """Return the configuration commands that load candidate onto running.
+
+    The commands enter each changed block, set new lines, remove lines
+    with 'no' for replace semantics, and exit the block again.
+    """
+    if operation not in (REPLACE_CONFIG, MERGE_CONFIG):
+        raise ValueError("Invalid operation type: {0}".format(operation))
+    return _delta(_tree(running), _tree(candidate),
+                  replace=operation == REPLACE_CONFIG)
+
+
+def _is_closer(content):
+    """Return True if a configuration line only closes a block."""
+    content = content.strip()
+    return content == CLOSER or content.startswith(END_PREFIX)
+
+
+class Hunk(object):
+    """The changes to a top-level stanza of the configuration.
+
+    stanza is the top-level line, such as 'interface x-eth 0/0/1', and
+    keyword its first word. lines holds the diff lines of the hunk with
+    their prefixes, and added and removed the changed configuration
+    lines, not counting lines that only close a block.
+    """
+
+    __slots__ = ('stanza', 'keyword', 'lines', 'added', 'removed')
+
+    def __init__(self, stanza):
+        """Constructor."""
+        self.stanza = stanza
+        self.keyword = stanza.split()[0] if stanza.strip() else ""
+        self.lines = []
+        self.added = []
+        self.removed = []
+
+    def __repr__(self):
+        """Return a representation of the hunk."""
+        return "Hunk({0!r}, +{1}, -{2})".format(self.stanza, len(self.added),
+                                                len(self.removed))
+
+
+class StructuredDiff(object):
+    """A diff parsed into hunks, with the total counts of changed lines."""
+
+    __slots__ = ('hunks', 'added', 'removed')
+
+    def __init__(self):
+        """Constructor."""
+        self.hunks = []
+        self.added = 0
+        self.removed = 0
+
+    def __iter__(self):
+        """Iterate over the hunks."""
+        return iter(self.hunks)
+
+    def __len__(self):
+        """Return the number of hunks."""
+        return len(self.hunks)
+
+    def section(self, keyword):
+        """Return the hunks of stanzas whose first word is keyword."""
+        return [hunk for hunk in self.hunks if hunk.keyword == keyword]
+
+    def text(self):
+        """Return the diff as text."""
+        return "\n".join(line for hunk in self.hunks for line in hunk.lines)
+
+
+class DiffParser(object):
+    """Incremental parser of diffs into a StructuredDiff.
+
+    Text is fed in chunks as it arrives, and lines need not be complete
+    at chunk boundaries.
+    """
+
+    def __init__(self):
+        """Constructor."""
+        self.result = StructuredDiff()
+        self._hunk = None
+        self._partial = ""
+
+    def feed(self, chunk):
+        """Parse a chunk of diff text."""
+        lines = (self._partial + chunk).split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self._line(line)
+
+    def close(self):
+        """Parse any remaining text and return the StructuredDiff."""
+        if self._partial:
+            self._line(self._partial)
+            self._partial = ""
+        self._flush()
+        return self.result
+
+    def _flush(self):
+        """Add the current hunk to the result if it has changes."""
+        hunk = self._hunk
+        if hunk is not None and (hunk.added or hunk.removed):
+            self.result.hunks.append(hunk)
+            self.result.added += len(hunk.added)
+            self.result.removed += len(hunk.removed)
+        self._hunk = None
+
+    def _line(self, line):
+        """Parse a line of diff text."""
+        line = line.rstrip("\r")
+        prefix, content = line[:1], line[1:]
+        if (prefix not in (ADDED, REMOVED, CONTEXT) or not content.strip() or
+                line.startswith(DIFF_HEADERS)):
+            # blank lines, headers and device messages
+            return
+        stanza = not content.startswith(" ") and not _is_closer(content)
+        if stanza or self._hunk is None:
+            self._flush()
+            self._hunk = Hunk(content if stanza else "")
+        self._hunk.lines.append(line)
+        if prefix != CONTEXT and not _is_closer(content):
+            if prefix == ADDED:
+                self._hunk.added.append(content)
+            else:
+                self._hunk.removed.append(content)
+
+
+def parse_diff(source):
+    """Parse a diff into hunks grouped by top-level stanza.
+
+    source is either diff text, as returned by diff() or compare_config(),
+    or an iterable of text chunks. Return a StructuredDiff.
+    """
+    if hasattr(source, 'splitlines'):
+        source = (source,)
+    parser = DiffParser()
+    for chunk in source:
+        parser.feed(chunk)
+    return parser.close()
@@ -16,10 +16,10 @@
 from __future__ import print_function
 from __future__ import unicode_literals
 
-import os
+import contextlib
+import hashlib
+import re
 import socket
-import tempfile
-import uuid
 
 from napalm_base.base import NetworkDriver
 from napalm_base.exceptions import (
@@ -33,10 +33,67 @@ from napalm_base.exceptions import (
     )
 from napalm_base.utils import py23_compat
 
-from napalm_exaros.ssh import ExaROSSSH
+from napalm_exaros.cache import ConfigCache
+from napalm_exaros.commands import (
+    ALIVE_KEEPALIVE,
+    ALIVE_TIMEOUT,
+    COMMIT_CHECK_SEPARATE,
+    COMMIT_LABEL,
+    MERGE_CONFIG,
+    MODE_CONFIG,
+    MODE_DIRTY,
+    MODE_OPERATIONAL,
+    MODE_UNKNOWN,
+    REPLACE_CONFIG,
+    SHOW_BGP_NEIGHBOR,
+    SHOW_INTERFACE,
+    SHOW_LLDP_NEIGHBORS,
+    SHOW_VERSION,
+    )
+from napalm_exaros.diff import delta_commands, diff, parse_diff
+from napalm_exaros.instrument import NOOP_INSTRUMENT
+from napalm_exaros.parser import parse
+from napalm_exaros.pool import default_pool
+from napalm_exaros.utils import config_buffer, textfsm_extractor
+
+# Remote name of candidate files, and of content-addressed ones
+CANDIDATE = 'candidate.conf'
+CANDIDATE_NAME = 'napalm-{0}.conf'
+CANDIDATE_PATTERN = re.compile(r'^napalm-[0-9a-f]{16}\.conf$')
+# Seconds before the candidate just loaded within which other candidates
+# are never pruned, as concurrent sessions may not have loaded them yet
+CANDIDATE_PRUNE_GRACE = 300
+
+VENDOR = 'Exaware'
+# Durations such as '12 days, 03:04:05'
+DURATION = re.compile(r'(?:(\d+) days?, )?(\d+):(\d+):(\d+)')
+# Speeds such as '100 Gbps'
+SPEED = re.compile(r'(\d+)\s*([KMG])bps')
+SPEED_UNITS = {'K': 0.001, 'M': 1, 'G': 1000}
+# napalm names of BGP address families
+ADDRESS_FAMILIES = {'ipv4 unicast': 'ipv4', 'ipv6 unicast': 'ipv6'}
+
+
+def _seconds(duration):
+    """Return a duration in seconds, or -1.0 if it is not known."""
+    match = DURATION.search(duration or "")
+    if not match:
+        return -1.0
+    days, hours, minutes, seconds = (int(g or 0) for g in match.groups())
+    return float(((days * 24 + hours) * 60 + minutes) * 60 + seconds)
+
 
-MERGE_CONFIG = 'merge'
-REPLACE_CONFIG = 'replace'
+def _speed(speed):
+    """Return an interface speed in Mbps, or 0 if it is not known."""
+    match = SPEED.search(speed or "")
+    if not match:
+        return 0
+    return int(int(match.group(1)) * SPEED_UNITS[match.group(2)])
+
+
+def _counter(value):
+    """Return a counter value, or -1 if it is not reported."""
+    return int(value) if value else -1
 
 
 class ExaROSDriver(NetworkDriver):
@@ -54,7 +111,7 @@ class ExaROSDriver(NetworkDriver):
         if optional_args is None:
             optional_args = {}
 
-        self.candidate = "candidate.conf"
+        self.candidate = CANDIDATE
 
         # Netmiko possible arguments
         netmiko_argument_map = {
@@ -83,15 +140,111 @@ class ExaROSDriver(NetworkDriver):
         self.global_delay_factor = optional_args.get('global_delay_factor', 1)
         self.port = optional_args.get('port', 22)
 
+        # Skip the upload, load and commit of candidates that would not
+        # change the running configuration
+        self.skip_unchanged = optional_args.get('skip_unchanged', False)
+        self._noop_candidate = False
+
+        # Load candidates as the configuration commands that differ from
+        # the running configuration, unless there are more of them than
+        # delta_threshold times the number of lines in the candidate
+        self.delta_load = optional_args.get('delta_load', False)
+        self.delta_threshold = optional_args.get('delta_threshold', 0.2)
+
+        # Name uploaded candidates by a hash of their content, skipping the
+        # transfer if the device already has the file, and keep at most
+        # candidate_retention such files on the device
+        self.content_addressed = optional_args.get('content_addressed', False)
+        self.candidate_retention = optional_args.get('candidate_retention', 5)
+
+        # Label of the commits made by the driver, which rollback reverts,
+        # and the validation of candidates before a commit: a separate
+        # commit check, pipelined with the commit, or skipped in favour of
+        # the validation done by the commit itself
+        self.commit_label = optional_args.get('commit_label', COMMIT_LABEL)
+        self.commit_check = optional_args.get('commit_check',
+                                              COMMIT_CHECK_SEPARATE)
+
+        # Default tier of the liveness probe used by is_alive
+        self.alive_tier = optional_args.get('alive_tier', ALIVE_KEEPALIVE)
+
+        # Side channels opened on the SSH transport to run read-only
+        # commands concurrently with the configuration session
+        self.parallel_channels = optional_args.get('parallel_channels', 0)
+
+        # Pool of sessions reused across driver instances: either a
+        # SessionPool, or True for the process-wide default pool
+        self.session_pool = optional_args.get('session_pool')
+        if self.session_pool is True:
+            self.session_pool = default_pool
+
+        # Cache of running configurations: either a ConfigCache, possibly
+        # shared with other drivers, or True for a private one
+        self.config_cache = optional_args.get('config_cache')
+        if self.config_cache is True:
+            self.config_cache = ConfigCache()
+
+        # Instrument receiving timing spans of device operations
+        self.instrument = optional_args.get('instrument', NOOP_INSTRUMENT)
+
+        # Record the exchanges of new sessions to the session file record,
+        # or replay them from the session file replay instead of connecting
+        # to the device, with their recorded latencies scaled by
+        # replay_timing
+        self.record = optional_args.get('record')
+        self.replay = optional_args.get('replay')
+        self.replay_timing = optional_args.get('replay_timing', 0.0)
+
+        # Outputs of show commands, while in a command_cache() block
+        self._command_outputs = None
+
     def open(self):
         """Open a connection to the device."""
-        self.connection = ExaROSSSH(host=self.hostname, username=self.username,
-                                    password=self.password,
-                                    **self.netmiko_optional_args)
+        with self.instrument.span('open', host=self.hostname):
+            if self.session_pool is not None:
+                self.connection = self.session_pool.checkout(
+                    self._pool_key(), self._connect)
+            else:
+                self.connection = self._connect()
+        self.connection.max_channels = self.parallel_channels
+        self.connection.instrument = self.instrument
+
+    def _connect(self):
+        """Establish a new SSH session."""
+        # netmiko, paramiko and scp are only imported once a session is
+        # opened
+        if self.replay is not None:
+            from napalm_exaros.replay import ReplaySSH
+            return ReplaySSH(self.replay, timing=self.replay_timing,
+                             instrument=self.instrument)
+        from napalm_exaros.ssh import ExaROSSSH
+        recorder = None
+        if self.record is not None:
+            from napalm_exaros.replay import SessionRecorder
+            recorder = SessionRecorder(self.record, host=self.hostname)
+        try:
+            return ExaROSSSH(host=self.hostname, username=self.username,
+                             password=self.password,
+                             instrument=self.instrument, recorder=recorder,
+                             **self.netmiko_optional_args)
+        except Exception:
+            if recorder is not None:
+                recorder.close()
+            raise
+
+    def _pool_key(self):
+        """Return the key of this device's sessions in the pool."""
+        return (self.hostname, self.port, self.username)
 
     def close(self):
-        """Close the connection to the device."""
-        self.connection.disconnect()
+        """Close the connection to the device, if it is open."""
+        connection, self.connection = self.connection, None
+        if connection is None:
+            return
+        if self.session_pool is not None:
+            self.session_pool.checkin(self._pool_key(), connection)
+        else:
+            connection.disconnect()
 
     def _send_command(self, command):
         """Wrap self.device.send_command()."""
@@ -100,20 +253,34 @@ class ExaROSDriver(NetworkDriver):
         except (socket.error, EOFError) as e:
             raise ConnectionClosedException(str(e))
 
+    def cli(self, commands):
+        """Run read-only commands and return their output by command.
+
+        The commands run concurrently if parallel_channels is set.
+        """
+        if not isinstance(commands, (list, tuple)):
+            raise TypeError("commands should be a list")
+        outputs = self.connection.send_command_parallel(list(commands))
+        return dict(zip(commands, outputs))
+
     def is_alive(self):
         """Return a flag with the state of the SSH connection."""
-        null = chr(0)
-        try:
-            if self.connection is None:
-                return {'is_alive': False}
-            else:
-                # Try sending ASCII null byte to maintain the connection alive
-                self.connection.send_command(null)
-        except (socket.error, EOFError):
-            # If unable to send, we can tell for sure that the connection
-            # is unusable, hence return False.
-            return {'is_alive': False}
-        return {'is_alive': self.connection.remote_conn.transport.is_active()}
+        return {'is_alive': self.probe()['is_alive']}
+
+    def probe(self, tier=None, timeout=ALIVE_TIMEOUT):
+        """Check the state of the SSH connection with a liveness probe.
+
+        tier is 'transport', 'keepalive' or 'prompt', and defaults to the
+        alive_tier optional argument. Return a dict with the result, the
+        tier and the latency of the probe in seconds.
+        """
+        if tier is None:
+            tier = self.alive_tier
+        if self.connection is None:
+            alive, latency = False, 0.0
+        else:
+            alive, latency = self.connection.probe(tier, timeout)
+        return {'is_alive': alive, 'tier': tier, 'latency': latency}
 
     def load_replace_candidate(self, filename=None, config=None):
         """Load replace candidate config file to device."""
@@ -136,54 +303,234 @@ class ExaROSDriver(NetworkDriver):
     def _load_candidate(self, source_file=None, source_config=None,
                         operation=MERGE_CONFIG):
         """Load candidate config."""
-        self._put_candidate(source_file=source_file,
-                            source_config=source_config)
+        self._noop_candidate = False
+        if ((self.skip_unchanged or self.delta_load) and
+                self._candidate_clean(operation)):
+            source_config = self._read_candidate(source_file=source_file,
+                                                 source_config=source_config)
+            source_file = None
+            running = self._get_running_tree()
+            candidate = parse(source_config)
+            if (self.skip_unchanged and
+                    not diff(running, candidate, operation=operation)):
+                self._noop_candidate = True
+                return True
+            if self.delta_load:
+                delta = delta_commands(running, candidate,
+                                       operation=operation)
+                lines = len(source_config.splitlines())
+                if len(delta) <= self.delta_threshold * lines:
+                    self.connection.send_config_set(delta)
+                    return True
+        uploaded = self._put_candidate(source_file=source_file,
+                                       source_config=source_config)
         self.connection.load(operation=operation, file=self.candidate)
+        if (uploaded and self.content_addressed and
+                self.candidate_retention is not None and
+                self.candidate != CANDIDATE):
+            # pruned once loaded, so that this candidate is the newest
+            self.connection.prune_remote_files(
+                CANDIDATE_PATTERN, keep=self.candidate_retention,
+                exclude=(self.candidate,), grace=CANDIDATE_PRUNE_GRACE)
         return True
 
+    def _candidate_clean(self, operation):
+        """Return True if the device candidate holds no pending changes.
+
+        Local diffs against the running configuration are only valid for
+        a clean candidate. A replace would overwrite pending changes, so
+        they are discarded first.
+        """
+        mode = self.connection.mode
+        if mode == MODE_UNKNOWN:
+            mode = self.connection.resync_mode()
+        if mode == MODE_DIRTY and operation == REPLACE_CONFIG:
+            self.connection.exit_config_mode()
+            mode = self.connection.mode
+        return mode in (MODE_OPERATIONAL, MODE_CONFIG)
+
+    @staticmethod
+    def _read_candidate(source_file=None, source_config=None):
+        """Return the candidate configuration as text."""
+        if source_file:
+            with open(source_file) as fobj:
+                return fobj.read()
+        if source_config:
+            return config_buffer(source_config).getvalue().decode('utf-8')
+        raise ValueError("Must provide either source_file or source_config")
+
+    def diff_candidate(self, filename=None, config=None,
+                       operation=MERGE_CONFIG, running=None):
+        """Return the diff a candidate would produce, computed locally.
+
+        running is the current running configuration, as text or a parsed
+        tree. It is retrieved from the device if not given.
+        """
+        candidate = self._read_candidate(source_file=filename,
+                                         source_config=config)
+        if running is None:
+            running = self._get_running_tree()
+        return diff(running, candidate, operation=operation)
+
+    def _get_running_tree(self):
+        """Return the parsed running configuration."""
+        if self.config_cache is not None:
+            return parse(self._get_cached_running())
+        return self.get_config_tree(retrieve="running")
+
     def _put_candidate(self, source_file=None, source_config=None):
-        """Transfer file to remote device for merge or replace operations."""
+        """Transfer file to remote device for merge or replace operations.
+
+        Return True if the file was transferred.
+        """
+        if self.content_addressed:
+            if source_file:
+                with open(source_file, 'rb') as fobj:
+                    data = fobj.read()
+            elif source_config:
+                data = config_buffer(source_config).getvalue()
+            else:
+                raise ValueError("Must provide either source_file or "
+                                 "source_config")
+            return self._put_addressed_candidate(data)
         if source_file:
             self.connection.scp_put_file(source_file=source_file,
                                          dest_file=self.candidate)
             return True
         if source_config:
-            tmp_file = self._create_tmp_file(source_config)
-            self.connection.scp_put_file(source_file=tmp_file,
+            self.connection.scp_put_data(source_config,
                                          dest_file=self.candidate)
-            if tmp_file and os.path.isfile(tmp_file):
-                os.remove(tmp_file)
             return True
         raise ValueError("Must provide either source_file or source_config")
 
+    def _put_addressed_candidate(self, data):
+        """Transfer a candidate named by its hash, unless already present.
+
+        Return True if the candidate was transferred. The hash in the name
+        identifies the content, so a remote file with that name and the
+        same size needs no transfer: an interrupted transfer leaves a
+        shorter file, and only a file written to that name by something
+        other than the driver could differ. A reused file is touched, so
+        that pruning treats it as recent. Without SFTP, remote files can
+        neither be found nor pruned, so the candidate is uploaded to the
+        fixed name instead.
+        """
+        if not self.connection.sftp_available():
+            self.candidate = CANDIDATE
+            self.connection.scp_put_data(data, dest_file=self.candidate)
+            return True
+        self.candidate = CANDIDATE_NAME.format(
+            hashlib.sha256(data).hexdigest()[:16])
+        if self.connection.remote_file_size(self.candidate) == len(data):
+            self.connection.touch_remote_file(self.candidate)
+            return False
+        self.connection.scp_put_data(data, dest_file=self.candidate)
+        return True
+
     def discard_config(self):
         """Discard the configuration loaded into the candidate."""
+        self._noop_candidate = False
+        self._invalidate_cache()
         self.connection.exit_config_mode()
 
     def compare_config(self):
         """Compare the candidate and running configurations."""
+        if self._noop_candidate:
+            return ""
         return self.connection.compare()
 
+    def compare_config_structured(self):
+        """Compare the candidate and running configurations.
+
+        Return the diff as a StructuredDiff, parsed into hunks by
+        top-level stanza as it streams in from the device.
+        """
+        if self._noop_candidate:
+            return parse_diff("")
+        return parse_diff(self.connection.stream_compare())
+
     def commit_config(self):
         """Commit the candidate configuration."""
-        commit_label = "configured using napalm_exaros"
+        return self._commit()
+
+    def commit_config_confirmed(self, revert_in=600):
+        """Commit the candidate configuration, pending confirmation.
+
+        The commit is reverted unless confirm_commit is called within
+        revert_in seconds, rounded up to whole minutes, on the same
+        session.
+        """
+        if revert_in < 1:
+            raise ValueError("revert_in must be at least 1 second")
+        return self._commit(confirmed=(int(revert_in) + 59) // 60)
+
+    def _commit(self, confirmed=None):
+        """Commit the candidate configuration with the commit label."""
+        if self._noop_candidate:
+            self._noop_candidate = False
+            return ""
         try:
-            return self.connection.commit(label=commit_label)
+            return self.connection.commit(label=self.commit_label,
+                                          check=self.commit_check,
+                                          confirmed=confirmed)
         except Exception as e:
             raise CommitError(e)
+        finally:
+            self._invalidate_cache()
 
-    @staticmethod
-    def _create_tmp_file(config):
-        """Write temp file and for use with SCP."""
-        tmp_dir = tempfile.gettempdir()
-        rand_fname = py23_compat.text_type(uuid.uuid4())
-        filename = os.path.join(tmp_dir, rand_fname)
-        with open(filename, 'wt') as fobj:
-            fobj.write(config)
-        return filename
+    def confirm_commit(self):
+        """Confirm the pending confirmed commit."""
+        try:
+            return self.connection.confirm_commit()
+        except Exception as e:
+            raise CommitError(e)
+
+    def has_pending_commit(self):
+        """Return True if a confirmed commit awaits confirmation."""
+        return self.connection.confirm_pending
+
+    def rollback(self):
+        """Revert the latest commit made by the driver."""
+        return self.rollback_config()
+
+    def rollback_config(self, label=None):
+        """Revert the latest commit with label, by default commit_label.
+
+        A pending confirmed commit is aborted instead, which reverts it
+        without a further commit.
+        """
+        try:
+            if self.connection.confirm_pending:
+                return self.connection.abort_commit()
+            if label is None:
+                label = self.commit_label
+            return self.connection.rollback(label=label,
+                                            check=self.commit_check)
+        finally:
+            self._invalidate_cache()
+
+    def _invalidate_cache(self):
+        """Drop cached running configurations of this device."""
+        if self.config_cache is not None:
+            self.config_cache.invalidate(self.hostname)
+
+    def _get_cached_running(self):
+        """Get the running configuration, revalidating any cached copy."""
+        commit_id = self.connection.get_commit_id()
+        if commit_id is None:
+            return self.connection.get_config(store="running")
+        running = self.config_cache.get(self.hostname, commit_id)
+        if running is None:
+            running = self.connection.get_config(store="running")
+            self.config_cache.put(self.hostname, commit_id, running)
+        return running
 
     def get_config(self, retrieve="all"):
-        """Get the device configuration."""
+        """Get the device configuration.
+
+        ExaROS has no separate startup configuration, since committed
+        changes persist across reloads, so startup is always empty.
+        """
         stores = ["all", "running", "candidate", "startup"]
         if retrieve not in stores:
             raise ValueError("retrieve should be one of {0}".format(stores))
@@ -192,8 +539,197 @@ class ExaROSDriver(NetworkDriver):
             "candidate": "",
             "startup": ""
         }
-        if retrieve in ("all", "running"):
+        if self.config_cache is not None and retrieve in ("all", "running"):
+            output["running"] = self._get_cached_running()
+            if retrieve == "all":
+                output["candidate"] = output["running"]
+                if self.connection.candidate_changed():
+                    output["candidate"] = self.connection.get_config(
+                        store="candidate")
+        elif retrieve == "all":
+            running, candidate = self.connection.get_config_all()
+            output["running"] = running
+            output["candidate"] = candidate
+        elif retrieve == "running":
             output["running"] = self.connection.get_config(store="running")
-        if retrieve in ("all", "candidate"):
+        if retrieve == "candidate":
             output["candidate"] = self.connection.get_config(store="candidate")
         return output
+
+    def get_config_section(self, paths, retrieve="running"):
+        """Get sections of the device configuration by path.
+
+        Each path is a configuration line, such as 'interface x-eth 0/0/1',
+        or a sequence of lines leading to a nested section. Only the
+        requested sections are transferred, all in a single exchange.
+        Return a dict of the configuration of each section keyed by path,
+        with sequences of lines as tuples.
+        """
+        if hasattr(paths, 'split'):
+            paths = [paths]
+        # make the keys before the exchange, so that no output is lost
+        paths = [path if hasattr(path, 'split') else tuple(path)
+                 for path in paths]
+        outputs = self.connection.get_config_sections(paths, store=retrieve)
+        return dict(zip(paths, outputs))
+
+    def get_config_stream(self, retrieve="running", fobj=None):
+        """Stream a configuration store from the device.
+
+        Return an iterator of text chunks as they are received or, if fobj
+        is given, write them to it and return the number of characters
+        written.
+        """
+        stores = ["running", "candidate"]
+        if retrieve not in stores:
+            raise ValueError("retrieve should be one of {0}".format(stores))
+        chunks = self.connection.stream_config(store=retrieve)
+        if fobj is None:
+            return chunks
+        written = 0
+        for chunk in chunks:
+            fobj.write(chunk)
+            written += len(chunk)
+        return written
+
+    def get_config_tree(self, retrieve="running"):
+        """Return a configuration store parsed into an indexed tree.
+
+        The configuration is parsed as it streams in from the device.
+        """
+        return parse(self.get_config_stream(retrieve=retrieve))
+
+    @contextlib.contextmanager
+    def command_cache(self):
+        """Run each show command at most once within the block.
+
+        Getters share the output of the commands they have in common, such
+        as 'show interface' for get_facts, get_interfaces and
+        get_interfaces_counters, when called within the same block.
+        """
+        if self._command_outputs is not None:
+            yield
+            return
+        self._command_outputs = {}
+        try:
+            yield
+        finally:
+            self._command_outputs = None
+
+    def _show(self, *command_list):
+        """Return the outputs of show commands, running only new ones."""
+        with self.command_cache():
+            missing = [command for command in command_list
+                       if command not in self._command_outputs]
+            if missing:
+                outputs = self.connection.send_command_parallel(missing)
+                self._command_outputs.update(zip(missing, outputs))
+            return [self._command_outputs[command]
+                    for command in command_list]
+
+    def _extract(self, template_name, command):
+        """Return the output of a show command parsed with a template."""
+        return textfsm_extractor(template_name, self._show(command)[0])
+
+    def get_facts(self):
+        """Return general information about the device."""
+        with self.command_cache():
+            self._show(SHOW_VERSION, SHOW_INTERFACE)
+            version = self._extract('show_version', SHOW_VERSION)
+            interfaces = self._extract('show_interface', SHOW_INTERFACE)
+        version = version[0] if version else {}
+        hostname = py23_compat.text_type(version.get('hostname', ""))
+        return {
+            'uptime': int(_seconds(version.get('uptime'))),
+            'vendor': VENDOR,
+            'os_version': py23_compat.text_type(
+                version.get('os_version', "")),
+            'serial_number': py23_compat.text_type(
+                version.get('serial_number', "")),
+            'model': py23_compat.text_type(version.get('model', "")),
+            'hostname': hostname,
+            'fqdn': hostname,
+            'interface_list': [py23_compat.text_type(row['interface'])
+                               for row in interfaces],
+        }
+
+    def get_interfaces(self):
+        """Return the state of each interface."""
+        interfaces = {}
+        for row in self._extract('show_interface', SHOW_INTERFACE):
+            mac_address = row['mac_address']
+            if mac_address == '-':
+                mac_address = ""
+            interfaces[py23_compat.text_type(row['interface'])] = {
+                'is_up': row['oper_state'] == 'up',
+                'is_enabled': row['admin_state'] == 'up',
+                'description': py23_compat.text_type(row['description']),
+                'last_flapped': _seconds(row['last_change']),
+                'speed': _speed(row['speed']),
+                'mac_address': py23_compat.text_type(mac_address),
+            }
+        return interfaces
+
+    def get_interfaces_counters(self):
+        """Return the traffic and error counters of each interface."""
+        counters = {}
+        for row in self._extract('show_interface', SHOW_INTERFACE):
+            counters[py23_compat.text_type(row['interface'])] = {
+                'tx_errors': _counter(row['tx_errors']),
+                'rx_errors': _counter(row['rx_errors']),
+                'tx_discards': _counter(row['tx_discards']),
+                'rx_discards': _counter(row['rx_discards']),
+                'tx_octets': _counter(row['tx_octets']),
+                'rx_octets': _counter(row['rx_octets']),
+                'tx_unicast_packets': _counter(row['tx_unicast']),
+                'rx_unicast_packets': _counter(row['rx_unicast']),
+                'tx_multicast_packets': _counter(row['tx_multicast']),
+                'rx_multicast_packets': _counter(row['rx_multicast']),
+                'tx_broadcast_packets': _counter(row['tx_broadcast']),
+                'rx_broadcast_packets': _counter(row['rx_broadcast']),
+            }
+        return counters
+
+    def get_lldp_neighbors(self):
+        """Return the LLDP neighbors on each interface."""
+        neighbors = {}
+        for row in self._extract('show_lldp_neighbors', SHOW_LLDP_NEIGHBORS):
+            neighbors.setdefault(
+                py23_compat.text_type(row['local_port']), []).append({
+                    'hostname': py23_compat.text_type(row['hostname']),
+                    'port': py23_compat.text_type(row['port']),
+                })
+        return neighbors
+
+    def get_bgp_neighbors(self):
+        """Return the state of the BGP neighbors in each VRF."""
+        vrfs = {'global': {'router_id': "", 'peers': {}}}
+        for row in self._extract('show_bgp_neighbor', SHOW_BGP_NEIGHBOR):
+            vrf = row['vrf']
+            if vrf == 'default':
+                vrf = 'global'
+            vrf = vrfs.setdefault(py23_compat.text_type(vrf),
+                                  {'router_id': "", 'peers': {}})
+            if not vrf['router_id']:
+                vrf['router_id'] = py23_compat.text_type(row['router_id'])
+            address_family = {}
+            for af, received, accepted, sent in zip(
+                    row['address_family'], row['received'],
+                    row['accepted'], row['sent']):
+                af = ADDRESS_FAMILIES.get(af, af.replace(' ', '-'))
+                address_family[py23_compat.text_type(af)] = {
+                    'received_prefixes': int(received),
+                    'accepted_prefixes': int(accepted),
+                    'sent_prefixes': int(sent),
+                }
+            vrf['peers'][py23_compat.text_type(row['neighbor'])] = {
+                'local_as': int(row['local_as']),
+                'remote_as': int(row['remote_as']),
+                'remote_id': py23_compat.text_type(row['remote_id']),
+                'is_up': row['session_state'] == 'Established',
+                'is_enabled': row['admin_state'] == 'enabled',
+                'description': py23_compat.text_type(row['description']),
+                'uptime': int(_seconds(row['uptime'])),
+                'address_family': address_family,
+            }
+        return vrfs
@@ -0,0 +1,289 @@
+# Copyright 2017 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Concurrent execution of driver operations across a fleet of devices."""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import collections
+import threading
+import time
+
+from napalm_exaros.exaros import ExaROSDriver
+
+try:
+    import queue
+except ImportError:  # pragma: no cover
+    import Queue as queue
+
+
+class DeviceTimeoutError(Exception):
+    """A device operation did not complete within the fleet timeout."""
+
+
+class FleetResult(collections.namedtuple(
+        'FleetResult',
+        ['device', 'operation', 'result', 'exception', 'elapsed'])):
+    """The outcome of an operation on a single device."""
+
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        """Return True if the operation completed without error."""
+        return self.exception is None
+
+
+class _Run(object):
+    """Scheduling state of one operation across devices."""
+
+    def __init__(self, devices):
+        """Constructor."""
+        self.pending = collections.deque(devices)
+        # start times of the running devices, and devices that timed out
+        # but whose worker has not returned
+        self.started = {}
+        self.stale = set()
+        self.site_counts = collections.Counter()
+        self.results = queue.Queue()
+
+
+class Fleet(object):
+    """Run driver operations concurrently across an inventory of devices.
+
+    inventory maps device names to dicts of driver constructor arguments
+    (hostname, username, password and optionally timeout and
+    optional_args). An optional 'site' key groups devices for the
+    per-site concurrency limit.
+
+    Each operation opens its own session, and the session is always closed
+    when the operation finishes, whatever the outcome. An operation that
+    runs past timeout is reported as failed with DeviceTimeoutError; its
+    worker thread is left to finish in the background and still counts
+    against the concurrency limits until it does.
+    """
+
+    def __init__(self, inventory, max_workers=16, site_limit=None,
+                 timeout=None, driver=ExaROSDriver):
+        """Constructor."""
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.inventory = inventory
+        self.max_workers = max_workers
+        self.site_limit = site_limit
+        self.timeout = timeout
+        self.driver = driver
+
+    def run(self, operation, *args, **kwargs):
+        """Run operation on every device, yielding results as they finish.
+
+        operation is either the name of a driver method, called with args
+        and kwargs, or a callable taking an open driver instance.
+        """
+        if callable(operation):
+            name = getattr(operation, '__name__', 'operation')
+            func = operation
+        else:
+            name = operation
+
+            def func(device):
+                return getattr(device, operation)(*args, **kwargs)
+        return self._run(name, list(self.inventory), func)
+
+    def get_config(self, retrieve="all"):
+        """Retrieve the configuration of every device."""
+        return self.run('get_config', retrieve=retrieve)
+
+    def compare(self, config=None, filename=None, replace=False,
+                devices=None):
+        """Load a candidate on each device and return its diff.
+
+        The candidate is discarded afterwards. config and filename may
+        either apply to every device or be dicts keyed by device name.
+        """
+        def compare(device, name):
+            self._load(device, name, config, filename, replace)
+            try:
+                return device.compare_config()
+            finally:
+                device.discard_config()
+        return self._run_named('compare', devices, compare)
+
+    def commit(self, config=None, filename=None, replace=False,
+               devices=None):
+        """Load and commit a candidate on each device that has changes.
+
+        The result for each device is the diff that was committed.
+        """
+        def commit(device, name):
+            self._load(device, name, config, filename, replace)
+            diff = device.compare_config()
+            if diff:
+                device.commit_config()
+            else:
+                device.discard_config()
+            return diff
+        return self._run_named('commit', devices, commit)
+
+    def rollback(self, devices=None):
+        """Revert the latest commit made by the driver on each device."""
+        def rollback(device, name):
+            return device.rollback()
+        return self._run_named('rollback', devices, rollback)
+
+    def rollout(self, config=None, filename=None, replace=False,
+                wave_size=None, halt_on_failure=True):
+        """Compare on every device, then commit changed devices in waves.
+
+        Results of the compare stage are yielded first, followed by the
+        commit results of each wave. If halt_on_failure is set, no further
+        waves are started after a wave with a failed device.
+        """
+        changed = set()
+        for result in self.compare(config=config, filename=filename,
+                                   replace=replace):
+            if result.ok and result.result:
+                changed.add(result.device)
+            yield result
+        changed = [name for name in self.inventory if name in changed]
+        if not wave_size:
+            wave_size = len(changed) or 1
+        for i in range(0, len(changed), wave_size):
+            failed = False
+            for result in self.commit(config=config, filename=filename,
+                                      replace=replace,
+                                      devices=changed[i:i + wave_size]):
+                failed = failed or not result.ok
+                yield result
+            if failed and halt_on_failure:
+                return
+
+    @staticmethod
+    def _load(device, name, config, filename, replace):
+        """Load the candidate selected for a device."""
+        if isinstance(config, dict):
+            config = config[name]
+        if isinstance(filename, dict):
+            filename = filename[name]
+        if replace:
+            device.load_replace_candidate(filename=filename, config=config)
+        else:
+            device.load_merge_candidate(filename=filename, config=config)
+
+    def _run_named(self, operation, devices, func):
+        """Run func(device, name) on the given devices."""
+        if devices is None:
+            devices = list(self.inventory)
+        return self._run(operation, devices, func, pass_name=True)
+
+    def _site(self, name):
+        """Return the site of a device, or None."""
+        return self.inventory[name].get('site')
+
+    def _session(self, name, func, pass_name):
+        """Open a session to a device, run func and close the session."""
+        params = dict(self.inventory[name])
+        params.pop('site', None)
+        device = self.driver(**params)
+        try:
+            device.open()
+            if pass_name:
+                return func(device, name)
+            return func(device)
+        finally:
+            try:
+                device.close()
+            except Exception:
+                pass
+
+    def _worker(self, name, operation, func, pass_name, results):
+        """Run a single device operation and queue its result."""
+        start = time.time()
+        try:
+            result = self._session(name, func, pass_name)
+        except Exception as e:
+            results.put(FleetResult(name, operation, None, e,
+                                    time.time() - start))
+        else:
+            results.put(FleetResult(name, operation, result, None,
+                                    time.time() - start))
+
+    def _run(self, operation, devices, func, pass_name=False):
+        """Schedule operation across devices, yielding results."""
+        run = _Run(devices)
+        # devices that timed out keep their slot until their worker
+        # returns, but are only waited for while other devices need it
+        while run.pending or run.started:
+            self._submit(run, operation, func, pass_name)
+            result = self._collect(run)
+            if result is not None:
+                yield result
+            for result in self._expire(run, operation):
+                yield result
+
+    def _submit(self, run, operation, func, pass_name):
+        """Start workers for pending devices, within the limits."""
+        for name in list(run.pending):
+            if len(run.started) + len(run.stale) >= self.max_workers:
+                break
+            site = self._site(name)
+            if (self.site_limit and site is not None and
+                    run.site_counts[site] >= self.site_limit):
+                continue
+            run.pending.remove(name)
+            run.site_counts[site] += 1
+            run.started[name] = time.time()
+            worker = threading.Thread(
+                target=self._worker,
+                args=(name, operation, func, pass_name, run.results))
+            worker.daemon = True
+            worker.start()
+
+    def _collect(self, run):
+        """Wait for the next result, up to the earliest device deadline.
+
+        Return the result, or None if the wait timed out or the result
+        is from a device that was already reported as timed out.
+        """
+        wait = None
+        if self.timeout and run.started:
+            deadline = min(run.started.values()) + self.timeout
+            wait = max(0, deadline - time.time())
+        try:
+            result = run.results.get(timeout=wait)
+        except queue.Empty:
+            return None
+        run.site_counts[self._site(result.device)] -= 1
+        if result.device in run.stale:
+            run.stale.discard(result.device)
+            return None
+        del run.started[result.device]
+        return result
+
+    def _expire(self, run, operation):
+        """Return timeout results for devices past their deadline."""
+        if not self.timeout:
+            return []
+        now = time.time()
+        expired = []
+        for name, start in list(run.started.items()):
+            if now - start >= self.timeout:
+                del run.started[name]
+                run.stale.add(name)
+                expired.append(FleetResult(
+                    name, operation, None,
+                    DeviceTimeoutError("{0} timed out after {1}s".format(
+                        operation, self.timeout)),
+                    now - start))
+        return expired
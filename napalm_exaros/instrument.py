@@ -0,0 +1,194 @@
+# Copyright 2017 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Timing instrumentation of ExaROS operations.
+
+Operations such as open, send_command, scp_put_file, load, compare and
+commit are measured as spans. Each span yields a Measurement of its
+duration, the bytes transferred and whether it failed. An Instrument is
+passed to ExaROSDriver with the 'instrument' optional argument.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import threading
+import time
+from collections import namedtuple
+
+timer = getattr(time, 'perf_counter', time.time)
+
+# Upper bounds in seconds of the Histogram buckets
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1, 2.5, 5, 10, 25, 50, 100, float('inf'))
+
+Measurement = namedtuple('Measurement', ['name', 'elapsed', 'nbytes',
+                                         'error', 'tags'])
+
+
+class Span(object):
+    """Context manager timing an operation."""
+
+    __slots__ = ('instrument', 'name', 'tags', 'nbytes', '_start')
+
+    def __init__(self, instrument, name, tags):
+        """Constructor."""
+        self.instrument = instrument
+        self.name = name
+        self.tags = tags
+        self.nbytes = 0
+        self._start = None
+
+    def __enter__(self):
+        """Start timing."""
+        self._start = timer()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Record the measurement of the operation."""
+        # a generator closed early by its consumer has not failed
+        error = (exc_type is not None and
+                 not issubclass(exc_type, GeneratorExit))
+        self.instrument.record(Measurement(self.name, timer() - self._start,
+                                           self.nbytes, error, self.tags))
+        return False
+
+    def add_bytes(self, nbytes):
+        """Count bytes transferred by the operation."""
+        self.nbytes += nbytes
+
+
+class _NoopSpan(object):
+    """Span that measures nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        """Do nothing."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Do nothing."""
+        return False
+
+    def add_bytes(self, nbytes):
+        """Do nothing."""
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Instrument(object):
+    """Base class of instruments.
+
+    Subclasses override record(), which is called with a Measurement at
+    the end of each span.
+    """
+
+    def span(self, name, **tags):
+        """Return a span timing the operation name."""
+        return Span(self, name, tags)
+
+    def record(self, measurement):
+        """Record a measurement."""
+        raise NotImplementedError
+
+
+class NoopInstrument(Instrument):
+    """Instrument that records nothing, at negligible cost."""
+
+    def span(self, name, **tags):
+        """Return a span that measures nothing."""
+        return NOOP_SPAN
+
+    def record(self, measurement):
+        """Discard a measurement."""
+
+
+NOOP_INSTRUMENT = NoopInstrument()
+
+
+class Callback(Instrument):
+    """Instrument passing each measurement to a callable.
+
+    This is the interface for exporters to metrics and tracing systems.
+    """
+
+    def __init__(self, callback):
+        """Constructor."""
+        self.callback = callback
+
+    def record(self, measurement):
+        """Pass a measurement to the callback."""
+        self.callback(measurement)
+
+
+class Histogram(Instrument):
+    """Instrument collecting latency histograms in memory, by span name."""
+
+    def __init__(self, buckets=BUCKETS):
+        """Constructor."""
+        self.buckets = tuple(buckets)
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, measurement):
+        """Add a measurement to the histogram of its span name."""
+        with self._lock:
+            stats = self._stats.get(measurement.name)
+            if stats is None:
+                stats = self._stats[measurement.name] = {
+                    'count': 0, 'errors': 0, 'total': 0.0, 'max': 0.0,
+                    'bytes': 0, 'buckets': [0] * len(self.buckets),
+                }
+            stats['count'] += 1
+            stats['errors'] += measurement.error
+            stats['total'] += measurement.elapsed
+            stats['max'] = max(stats['max'], measurement.elapsed)
+            stats['bytes'] += measurement.nbytes
+            for i, bound in enumerate(self.buckets):
+                if measurement.elapsed <= bound:
+                    stats['buckets'][i] += 1
+                    break
+
+    def quantile(self, name, q):
+        """Return the upper bound of the bucket holding quantile q of name.
+
+        Return None if nothing has been recorded for name.
+        """
+        with self._lock:
+            stats = self._stats.get(name)
+            if not stats:
+                return None
+            rank = q * stats['count']
+            seen = 0
+            for bound, count in zip(self.buckets, stats['buckets']):
+                seen += count
+                if count and seen >= rank:
+                    return min(bound, stats['max'])
+            return stats['max']
+
+    def summary(self):
+        """Return the statistics of each span name."""
+        with self._lock:
+            summary = {}
+            for name, stats in self._stats.items():
+                summary[name] = dict(stats, buckets=list(zip(
+                    self.buckets, stats['buckets'])))
+                summary[name]['mean'] = stats['total'] / stats['count']
+            return summary
+
+    def reset(self):
+        """Discard every recorded measurement."""
+        with self._lock:
+            self._stats.clear()
@@ -0,0 +1,182 @@
+# Copyright 2017 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Parser for ExaROS configuration text.
+
+ExaROS configuration is indented by one space per level. A block is
+closed by '!' at its own indentation, or by an 'end-...' keyword such as
+'end-policy', and top-level stanzas are separated by '!'.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+
+try:
+    from sys import intern
+except ImportError:  # pragma: no cover
+    pass
+
+CLOSER = '!'
+END_PREFIX = 'end-'
+
+
+def _intern(word):
+    """Return word interned, unless it cannot be.
+
+    Python 2 only interns byte strings, so non-ASCII words are kept as
+    they are there.
+    """
+    try:
+        return intern(str(word))
+    except UnicodeEncodeError:
+        return word
+
+
+class ConfigNode(object):
+    """A line of ExaROS configuration and the block it opens.
+
+    line is the configuration line as written, and key is the line with
+    whitespace normalised, as used for lookups. closers holds the lines
+    that closed the block, such as ('end-policy', '!'). Children are
+    indexed by key and by keyword on first lookup.
+    """
+
+    __slots__ = ('line', 'key', 'keyword', 'children', 'closers', '_index')
+
+    def __init__(self, line=""):
+        """Constructor."""
+        self.line = line
+        words = line.split()
+        self.key = " ".join(words)
+        self.keyword = _intern(words[0]) if words else ""
+        self.children = []
+        self.closers = ()
+        self._index = None
+
+    def __repr__(self):
+        """Return a representation of the node."""
+        return "ConfigNode({0!r})".format(self.line)
+
+    def __iter__(self):
+        """Iterate over the child nodes."""
+        return iter(self.children)
+
+    def __len__(self):
+        """Return the number of child nodes."""
+        return len(self.children)
+
+    def __contains__(self, key):
+        """Return True if a child with the given key exists."""
+        return " ".join(key.split()) in self._indexes()[0]
+
+    def _indexes(self):
+        """Return the key and keyword indexes of the children."""
+        if self._index is None:
+            by_key = {}
+            by_keyword = {}
+            for child in self.children:
+                by_key[child.key] = child
+                by_keyword.setdefault(child.keyword, []).append(child)
+            self._index = (by_key, by_keyword)
+        return self._index
+
+    def get(self, *path):
+        """Return the node at path below this node, or None.
+
+        Each element of path is a configuration line, such as
+        get('routing bgp 65000', 'neighbor 10.0.0.2').
+        """
+        node = self
+        for key in path:
+            node = node._indexes()[0].get(" ".join(key.split()))
+            if node is None:
+                return None
+        return node
+
+    def section(self, keyword):
+        """Return the children whose first word is keyword."""
+        return list(self._indexes()[1].get(keyword, ()))
+
+    def unique(self, keyword):
+        """Return the only child whose first word is keyword, or None."""
+        children = self._indexes()[1].get(keyword, ())
+        if len(children) != 1:
+            return None
+        return children[0]
+
+    def render(self, depth=0):
+        """Yield the configuration lines of the children of this node."""
+        indent = " " * depth
+        for child in self.children:
+            yield indent + child.line
+            for line in child.render(depth + 1):
+                yield line
+            for closer in child.closers:
+                yield indent + closer
+
+    def text(self):
+        """Return the configuration below this node as text."""
+        return "".join(line + "\n" for line in self.render())
+
+
+def _iter_lines(source):
+    """Yield lines from text or from an iterable of text chunks."""
+    if hasattr(source, 'splitlines'):
+        for line in source.splitlines():
+            yield line
+        return
+    partial = ""
+    for chunk in source:
+        lines = (partial + chunk).split("\n")
+        partial = lines.pop()
+        for line in lines:
+            yield line
+    if partial:
+        yield partial
+
+
+def parse(source):
+    """Parse ExaROS configuration into a tree in a single pass.
+
+    source is either text or an iterable of text chunks, such as that
+    returned by ExaROSDriver.get_config_stream(). Return the root node.
+    """
+    root = ConfigNode()
+    # stack of (indentation, node) for the currently open blocks
+    stack = [(-1, root)]
+    for raw in _iter_lines(source):
+        line = raw.strip()
+        if not line:
+            continue
+        indent = len(raw) - len(raw.lstrip(" "))
+        if line == CLOSER or line.startswith(END_PREFIX):
+            while stack[-1][0] > indent:
+                stack.pop()
+            if stack[-1][0] == indent:
+                node = stack.pop()[1]
+            elif stack[-1][1].children:
+                # a further closer of a block that is already closed
+                node = stack[-1][1].children[-1]
+            else:
+                continue
+            node.closers += (line,)
+            continue
+        if line.startswith(CLOSER):
+            # comments and markers such as '!end-of-config'
+            continue
+        while stack[-1][0] >= indent:
+            stack.pop()
+        node = ConfigNode(line)
+        stack[-1][1].children.append(node)
+        stack.append((indent, node))
+    return root
@@ -0,0 +1,201 @@
+# Copyright 2017 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Pool of prepared SSH sessions shared across driver instances."""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import threading
+import time
+
+from napalm_exaros.commands import ALIVE_KEEPALIVE
+
+try:
+    import queue
+except ImportError:  # pragma: no cover
+    import Queue as queue
+
+
+def _disconnect(session):
+    """Disconnect a session, ignoring errors."""
+    try:
+        session.disconnect()
+    except Exception:
+        pass
+
+
+class SessionPool(object):
+    """Pool of prepared ExaROSSSH sessions.
+
+    Sessions are keyed by (host, port, username). A session checked out
+    of the pool is health-checked first, with a liveness probe of the
+    given health_tier unless a health_check callable is given, and
+    sessions left idle for longer than ttl seconds are disconnected. At
+    most max_idle idle sessions are kept per key.
+    """
+
+    def __init__(self, ttl=300, max_idle=4, health_check=None,
+                 health_tier=ALIVE_KEEPALIVE):
+        """Constructor."""
+        self.ttl = ttl
+        self.max_idle = max_idle
+        self.health_check = health_check
+        self.health_tier = health_tier
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def stats(self):
+        """Return the pool metrics."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'idle': sum(len(idle) for idle in self._idle.values()),
+            }
+
+    def _expired(self, now):
+        """Remove and return the idle sessions older than ttl."""
+        expired = []
+        for key, idle in list(self._idle.items()):
+            fresh = [(s, t) for s, t in idle if now - t < self.ttl]
+            expired.extend(s for s, t in idle if now - t >= self.ttl)
+            if fresh:
+                self._idle[key] = fresh
+            else:
+                del self._idle[key]
+        self.evictions += len(expired)
+        return expired
+
+    def checkout(self, key, factory):
+        """Return a healthy idle session for key, or a new one from factory."""
+        while True:
+            with self._lock:
+                expired = self._expired(time.time())
+                idle = self._idle.get(key)
+                session = idle.pop()[0] if idle else None
+            for stale in expired:
+                _disconnect(stale)
+            if session is None:
+                break
+            if self._check(session, self.health_tier)[0]:
+                with self._lock:
+                    self.hits += 1
+                return session
+            with self._lock:
+                self.evictions += 1
+            _disconnect(session)
+        with self._lock:
+            self.misses += 1
+        return factory()
+
+    def _check(self, session, tier):
+        """Return the health of a session and the latency of the check."""
+        start = time.time()
+        try:
+            if self.health_check is not None:
+                alive = bool(self.health_check(session))
+            else:
+                alive = session.probe(tier)[0]
+        except Exception:
+            alive = False
+        return alive, time.time() - start
+
+    def sweep(self, tier=None, max_workers=16):
+        """Check every idle session in parallel, evicting dead sessions.
+
+        Return a list of (key, alive, latency) tuples, one per session.
+        """
+        if tier is None:
+            tier = self.health_tier
+        with self._lock:
+            expired = self._expired(time.time())
+            idle = [(key, session, t) for key, sessions in self._idle.items()
+                    for session, t in sessions]
+            self._idle.clear()
+        for stale in expired:
+            _disconnect(stale)
+        checks = [None] * len(idle)
+        pending = queue.Queue()
+        for i in range(len(idle)):
+            pending.put(i)
+        workers = [threading.Thread(target=self._sweep_worker,
+                                    args=(pending, idle, tier, checks))
+                   for _ in range(min(max_workers, len(idle)))]
+        for thread in workers:
+            thread.daemon = True
+            thread.start()
+        for thread in workers:
+            thread.join()
+        self._keep_alive(idle, checks)
+        return [(key, alive, latency)
+                for (key, session, t), (alive, latency) in zip(idle, checks)]
+
+    def _sweep_worker(self, pending, idle, tier, checks):
+        """Check the pending idle sessions until none are left."""
+        while True:
+            try:
+                i = pending.get_nowait()
+            except queue.Empty:
+                return
+            checks[i] = self._check(idle[i][1], tier)
+
+    def _keep_alive(self, idle, checks):
+        """Return the live swept sessions to the pool, evicting the dead."""
+        dead = []
+        with self._lock:
+            for (key, session, t), (alive, latency) in zip(idle, checks):
+                if alive:
+                    self._idle.setdefault(key, []).append((session, t))
+                else:
+                    dead.append(session)
+            self.evictions += len(dead)
+        for session in dead:
+            _disconnect(session)
+
+    def checkin(self, key, session):
+        """Return a session to the pool.
+
+        Any configuration session is aborted first, so that the next user
+        starts in operational mode with no pending candidate.
+        """
+        try:
+            session.exit_config_mode()
+        except Exception:
+            _disconnect(session)
+            return
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            idle.append((session, time.time()))
+            excess = max(len(idle) - self.max_idle, 0)
+            stale = [s for s, t in idle[:excess]]
+            del idle[:excess]
+            self.evictions += len(stale)
+            stale.extend(self._expired(time.time()))
+        for session in stale:
+            _disconnect(session)
+
+    def clear(self):
+        """Disconnect every idle session."""
+        with self._lock:
+            idle = [s for sessions in self._idle.values() for s, t in sessions]
+            self._idle.clear()
+        for session in idle:
+            _disconnect(session)
+
+
+default_pool = SessionPool()
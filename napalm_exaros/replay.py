@@ -0,0 +1,239 @@
+# Copyright 2017 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with the
+# License. You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Recording of device sessions, and their replay without a device.
+
+A session file holds one JSON document per line: a header, and then one
+[kind, command, output, elapsed] record per exchange with the device, in
+the order they happened. Files whose name ends in '.gz' are compressed.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import collections
+import gzip
+import io
+import json
+import threading
+import time
+
+from napalm_exaros import ssh
+from napalm_exaros.commands import ALIVE_KEEPALIVE, ALIVE_TIMEOUT, NO_MARKERS
+
+SESSION_FORMAT = 1
+
+
+class ReplayError(Exception):
+    """The session file has no response to an exchange."""
+
+
+def _open(path, mode):
+    """Open a session file for reading or writing text."""
+    if path.endswith('.gz'):
+        return io.TextIOWrapper(gzip.open(path, mode + 'b'),
+                                encoding='utf-8')
+    return io.open(path, mode, encoding='utf-8')
+
+
+class SessionRecorder(object):
+    """Writer of the exchanges of an ExaROSSSH session to a session file.
+
+    The recorder is passed to ExaROSSSH as recorder, and is closed when
+    the session disconnects.
+    """
+
+    def __init__(self, path, host=None):
+        """Constructor."""
+        self.path = path
+        self._file = _open(path, 'w')
+        self._lock = threading.Lock()
+        self._write({'format': SESSION_FORMAT, 'host': host,
+                     'recorded': time.time()})
+
+    def _write(self, document):
+        """Write a line to the session file."""
+        self._file.write(json.dumps(document, separators=(',', ':')) + "\n")
+
+    def record(self, kind, command, output, elapsed):
+        """Record an exchange and its latency in seconds."""
+        with self._lock:
+            if not self._file.closed:
+                self._write([kind, command, output, round(elapsed, 6)])
+
+    def close(self):
+        """Close the session file."""
+        with self._lock:
+            self._file.close()
+
+
+class Session(object):
+    """Responses of a recorded session, by kind and command.
+
+    A command that was recorded several times returns its responses in
+    the order they were recorded, and then keeps returning the last one.
+    """
+
+    def __init__(self, path):
+        """Constructor."""
+        self.path = path
+        self._responses = collections.defaultdict(collections.deque)
+        with _open(path, 'r') as fobj:
+            self.header = json.loads(fobj.readline())
+            if self.header.get('format') != SESSION_FORMAT:
+                raise ValueError("Unsupported session file format: {0}"
+                                 .format(self.header.get('format')))
+            for line in fobj:
+                kind, command, output, elapsed = json.loads(line)
+                self._responses[kind, command].append((output, elapsed))
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Return the number of recorded exchanges."""
+        return sum(len(responses) for responses in self._responses.values())
+
+    def recorded(self, kind):
+        """Return True if any exchange of kind was recorded."""
+        return any(key[0] == kind for key in self._responses)
+
+    def response(self, kind, command):
+        """Return the next recorded output and latency of an exchange."""
+        with self._lock:
+            responses = self._responses.get((kind, command))
+            if not responses:
+                raise ReplayError("No recorded response to {0} {1!r}".format(
+                    kind, command))
+            if len(responses) > 1:
+                return responses.popleft()
+            return responses[0]
+
+
+class ReplaySSH(ssh.ExaROSSSH):
+    """ExaROSSSH session replaying a session file instead of a device.
+
+    Responses are returned as fast as possible, or after their recorded
+    latency multiplied by timing, so a timing of 1.0 replays the session
+    at its recorded speed.
+    """
+
+    def __init__(self, session, timing=0.0, instrument=None, **kwargs):
+        """Constructor.
+
+        session is a Session or the path of a session file. Other kwargs,
+        as accepted by ExaROSSSH, are ignored.
+        """
+        if not isinstance(session, Session):
+            session = Session(session)
+        self.session = session
+        self.timing = timing
+        if instrument is not None:
+            self.instrument = instrument
+        with self.instrument.span('session_preparation'):
+            self.base_prompt = self._replay(ssh.RECORD_OPEN, None)
+            self._mode = ssh.MODE_OPERATIONAL
+
+    def _replay(self, kind, command):
+        """Return the recorded output of an exchange, after its latency."""
+        output, elapsed = self.session.response(kind, command)
+        if self.timing:
+            time.sleep(elapsed * self.timing)
+        return output
+
+    def select_delay_factor(self, delay_factor):
+        """Return the delay factor, which has no effect on replay."""
+        return delay_factor
+
+    def send_command(self, *args, **kwargs):
+        """Return the recorded output of a command."""
+        command = args[0] if args else kwargs.get('command_string')
+        with self.instrument.span('send_command', command=command) as span:
+            output = self._replay(ssh.RECORD_COMMAND, command)
+            span.add_bytes(len(output))
+        return output
+
+    def send_command_markers(self, command, markers=NO_MARKERS,
+                             strip_prompt=True, strip_command=True,
+                             delay_factor=1):
+        """Return the recorded outcome and output of a command."""
+        output = self.send_command(command)
+        return markers.match(output), output
+
+    def send_command_batch(self, command_list, delay_factor=1):
+        """Return the recorded outputs of commands."""
+        with self.instrument.span('send_command_batch',
+                                  commands=command_list) as span:
+            outputs = [self._replay(ssh.RECORD_COMMAND, command)
+                       for command in command_list]
+            span.add_bytes(sum(len(output) for output in outputs))
+        return outputs
+
+    def _iter_lines(self, command, timeout):
+        """Yield the recorded output of a streamed command."""
+        output = self._replay(ssh.RECORD_STREAM, command)
+        if output:
+            yield output
+
+    def _send_command_parallel(self, command_list, config_mode, delay_factor):
+        """Return the recorded outputs of commands."""
+        if not self.max_channels:
+            command_list = self._primary_commands(command_list, config_mode)
+        return [self._replay(ssh.RECORD_COMMAND, command)
+                for command in command_list]
+
+    def _send_config_batch(self, batch, delay_factor):
+        """Return the recorded output of a batch of configuration commands."""
+        self._mode = ssh.MODE_DIRTY
+        return self._replay(ssh.RECORD_CONFIG, "\n".join(batch))
+
+    def check_config_mode(self, check_string=')#', pattern=''):
+        """Return True if the tracked mode is a configuration mode."""
+        return self._mode in (ssh.MODE_CONFIG, ssh.MODE_DIRTY)
+
+    def scp_put_file(self, source_file=None, dest_file=None):
+        """Replay the upload of a file."""
+        with self.instrument.span('scp_put_file', file=dest_file):
+            self._replay(ssh.RECORD_PUT, dest_file)
+
+    def scp_put_data(self, data, dest_file=None):
+        """Replay the upload of in-memory data."""
+        with self.instrument.span('scp_put_file', file=dest_file):
+            self._replay(ssh.RECORD_PUT, dest_file)
+
+    def sftp_available(self):
+        """Return True if remote file sizes were recorded."""
+        return self.session.recorded(ssh.RECORD_STAT)
+
+    def _remote_file_size(self, filename):
+        """Return the recorded size of a remote file, or None."""
+        size = self._replay(ssh.RECORD_STAT, filename)
+        return int(size) if size else None
+
+    def touch_remote_file(self, filename):
+        """Do nothing, as touching files is not recorded."""
+
+    def prune_remote_files(self, pattern, keep, exclude=(), grace=None):
+        """Do nothing, as pruning is not recorded."""
+
+    def probe(self, tier=ALIVE_KEEPALIVE, timeout=ALIVE_TIMEOUT):
+        """Return that the replayed session is alive."""
+        return True, 0.0
+
+    def close_channels(self):
+        """Do nothing, as replayed sessions have no side channels."""
+
+    def disconnect(self):
+        """Leave any configuration session, as the recording did."""
+        try:
+            self.cleanup()
+        except ReplayError:
+            pass
@@ -16,20 +16,645 @@
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import codecs
+import os
 import re
+import select
+import socket
+import threading
+import time
 
-from netmiko import BaseConnection, SCPConn
+from napalm_exaros import commands
+from napalm_exaros.commands import (
+    MODE_CONFIG,
+    MODE_DIRTY,
+    MODE_OPERATIONAL,
+    MODE_UNKNOWN,
+    )
+from napalm_exaros.instrument import NOOP_INSTRUMENT
+from napalm_exaros.utils import config_buffer
+
+from netmiko import BaseConnection
+
+import paramiko
+
+from scp import SCPClient
+
+try:
+    import queue
+except ImportError:  # pragma: no cover
+    import Queue as queue
+
+# Kinds of exchange written to a session recorder
+RECORD_OPEN = 'open'
+RECORD_COMMAND = 'command'
+RECORD_STREAM = 'stream'
+RECORD_CONFIG = 'config'
+RECORD_PUT = 'put'
+RECORD_STAT = 'stat'
+
+MAX_BUFFER = 65535
+# Configuration commands written to the channel before reading back
+CONFIG_BATCH_SIZE = 50
+# Terminal size requested for side channels
+TERM_SIZE = (511, 24)
+
+
+class ExaROSChannel(object):
+    """Additional interactive shell on the transport of an ExaROSSSH.
+
+    Side channels run read-only commands alongside the primary channel,
+    which keeps exclusive use of the configuration session. A side channel
+    that enters configuration mode gets a private session of its own, so
+    it sees the running configuration but not the primary's candidate.
+    """
+
+    def __init__(self, transport, base_prompt, timeout=commands.ALIVE_TIMEOUT):
+        """Constructor."""
+        self.prompt = commands.prompt_pattern(base_prompt)
+        self.in_config_mode = False
+        self.channel = transport.open_session()
+        try:
+            self.channel.get_pty(term='vt100', width=TERM_SIZE[0],
+                                 height=TERM_SIZE[1])
+            self.channel.invoke_shell()
+            self._read(timeout)
+            for command in commands.SESSION_PREPARATION:
+                self.send_command(command, timeout)
+        except Exception:
+            self.channel.close()
+            raise
+
+    def _read(self, timeout):
+        """Read from the channel until the prompt."""
+        decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        scanner = commands.CompletionScanner(self.prompt)
+        chunks = []
+        deadline = time.time() + timeout
+        while True:
+            if self.channel.recv_ready():
+                data = self.channel.recv(MAX_BUFFER)
+                if not data:
+                    raise EOFError("Channel closed by device")
+                chunk = decoder.decode(data)
+                chunks.append(chunk)
+                if scanner.feed(chunk):
+                    return "".join(chunks)
+                continue
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise IOError("Timed-out waiting for command to complete")
+            select.select([self.channel], [], [], remaining)
+
+    def send_command(self, command, timeout=commands.COMMAND_TIMEOUT):
+        """Send command and return its output, without echo or prompt."""
+        self.channel.sendall((command + '\n').encode('utf-8'))
+        output = self._read(timeout).replace('\r', '')
+        lines = output.split('\n')
+        return '\n'.join(lines[1:-1])
+
+    def config_mode(self, timeout=commands.COMMAND_TIMEOUT):
+        """Enter a private configuration session if not already in one."""
+        if not self.in_config_mode:
+            self.send_command(commands.CONFIG_MODE, timeout)
+            self.in_config_mode = True
+
+    def exit_config_mode(self, timeout=commands.COMMAND_TIMEOUT):
+        """Abort the private configuration session if in one."""
+        if self.in_config_mode:
+            self.send_command(commands.EXIT_CONFIG_MODE, timeout)
+            self.in_config_mode = False
+
+    def set_mode(self, config_mode, timeout=commands.COMMAND_TIMEOUT):
+        """Enter or leave a private configuration session as requested."""
+        if config_mode:
+            self.config_mode(timeout)
+        else:
+            self.exit_config_mode(timeout)
+
+    def close(self):
+        """Close the channel, aborting any configuration session."""
+        try:
+            self.exit_config_mode(commands.ALIVE_TIMEOUT)
+        except Exception:
+            pass
+        finally:
+            self.channel.close()
 
 
 class ExaROSSSH(BaseConnection):
     """Class for ExaROS SSH connection handling."""
 
+    _mode = MODE_UNKNOWN
+    # Set while a confirmed commit awaits confirmation
+    confirm_pending = False
+    _prompt_re = None
+    _prompt_pending = False
+    # Output read past the line of a terminal marker, which is the start
+    # of the pending prompt
+    _pending_output = ""
+    _scp = None
+    _sftp = None
+    # Side channels opened for send_command_parallel, or 0 to run every
+    # command on the primary channel
+    max_channels = 0
+    _channels = None
+    instrument = NOOP_INSTRUMENT
+    # Reply event of the outstanding keepalive request, if any
+    _keepalive_reply = None
+    _keepalive_lock = threading.Lock()
+    # Session recorder receiving every exchange with the device, if any
+    recorder = None
+
+    def __init__(self, *args, **kwargs):
+        """Constructor."""
+        self.instrument = kwargs.pop('instrument', NOOP_INSTRUMENT)
+        self.recorder = kwargs.pop('recorder', None)
+        start = time.time()
+        super(ExaROSSSH, self).__init__(*args, **kwargs)
+        self._record(RECORD_OPEN, None, self.base_prompt, time.time() - start)
+
+    def _record(self, kind, command, output, elapsed):
+        """Write an exchange with the device to the recorder, if any."""
+        if self.recorder is not None:
+            self.recorder.record(kind, command, output, elapsed)
+
+    @property
+    def mode(self):
+        """Return the tracked CLI mode of the session."""
+        return self._mode
+
     def session_preparation(self):
         """Prepare the session after the connection has been established."""
-        self._test_channel_read()
-        self.set_base_prompt()
-        self.disable_paging(command="session paginate disable")
-        self.set_terminal_width(command='terminal width 511')
+        with self.instrument.span('session_preparation'):
+            self._test_channel_read()
+            self.set_base_prompt()
+            self._prompt_re = None
+            paginate, width = commands.SESSION_PREPARATION
+            self.disable_paging(command=paginate)
+            self.set_terminal_width(command=width)
+            self._mode = MODE_OPERATIONAL
+
+    def resync_mode(self):
+        """Query the device prompt to re-establish the tracked mode."""
+        self._mode = MODE_UNKNOWN
+        if self.check_config_mode():
+            # the state of a candidate we did not track is unknown
+            self._mode = MODE_DIRTY
+        else:
+            self._mode = MODE_OPERATIONAL
+        return self._mode
+
+    def send_command(self, *args, **kwargs):
+        """Send command, invalidating the tracked mode on failure."""
+        command = args[0] if args else kwargs.get('command_string')
+        start = time.time()
+        with self.instrument.span('send_command', command=command) as span:
+            try:
+                self._drain_prompt()
+                output = super(ExaROSSSH, self).send_command(*args, **kwargs)
+            except Exception:
+                self._mode = MODE_UNKNOWN
+                raise
+            span.add_bytes(len(output))
+        self._record(RECORD_COMMAND, command, output, time.time() - start)
+        return output
+
+    def send_command_markers(self, command, markers=commands.NO_MARKERS,
+                             strip_prompt=True, strip_command=True,
+                             delay_factor=1):
+        """Send command and wait only until its outcome is known.
+
+        Return a tuple of the outcome, one of the commands.OUTCOME_*
+        constants, and the command output.
+        """
+        delay_factor = self.select_delay_factor(delay_factor)
+        start = time.time()
+        with self.instrument.span('send_command', command=command) as span:
+            try:
+                self._drain_prompt()
+                self.write_channel(self.normalize_cmd(command))
+                output, self._prompt_pending = self._read_until_complete(
+                    terminal=markers.terminal,
+                    timeout=commands.COMMAND_TIMEOUT * delay_factor)
+            except Exception:
+                self._mode = MODE_UNKNOWN
+                self._prompt_pending = False
+                self._pending_output = ""
+                raise
+            span.add_bytes(len(output))
+        output = self.normalize_linefeeds(output)
+        if strip_command:
+            output = self.strip_command(command, output)
+        if strip_prompt and not self._prompt_pending:
+            output = self.strip_prompt(output)
+        self._record(RECORD_COMMAND, command, output, time.time() - start)
+        return markers.match(output), output
+
+    def send_command_batch(self, command_list, delay_factor=1):
+        """Send read-only commands back-to-back in a single exchange.
+
+        All commands are written to the channel at once and the combined
+        output is split on the prompt. Return a list of the outputs.
+        """
+        delay_factor = self.select_delay_factor(delay_factor)
+        start = time.time()
+        with self.instrument.span('send_command_batch',
+                                  commands=command_list) as span:
+            try:
+                self._drain_prompt()
+                self.write_channel("".join(self.normalize_cmd(command)
+                                           for command in command_list))
+                output, _ = self._read_until_complete(
+                    timeout=commands.COMMAND_TIMEOUT * delay_factor,
+                    prompts=len(command_list))
+            except Exception:
+                self._mode = MODE_UNKNOWN
+                raise
+            span.add_bytes(len(output))
+        output = self.normalize_linefeeds(output)
+        splitter = commands.batch_prompt_pattern(self.base_prompt)
+        outputs = []
+        for command, segment in zip(command_list, splitter.split(output)):
+            segment = self.strip_command(command, segment)
+            if segment.endswith("\n"):
+                segment = segment[:-1]
+            outputs.append(segment)
+        # the commands share a single exchange, and so its latency
+        elapsed = (time.time() - start) / max(len(outputs), 1)
+        for command, segment in zip(command_list, outputs):
+            self._record(RECORD_COMMAND, command, segment, elapsed)
+        return outputs
+
+    def stream_command(self, command, delay_factor=1):
+        """Send a read-only command and yield its output as it arrives.
+
+        The command echo and the trailing prompt are stripped and line
+        endings normalised as the output streams in, so that the full
+        output is never held in memory. Each chunk is one or more complete
+        lines.
+        """
+        delay_factor = self.select_delay_factor(delay_factor)
+        lines = self._iter_lines(command,
+                                 commands.COMMAND_TIMEOUT * delay_factor)
+        if self.recorder is not None:
+            lines = self._tee(command, lines)
+        with self.instrument.span('stream_command', command=command) as span:
+            try:
+                for chunk in lines:
+                    span.add_bytes(len(chunk))
+                    yield chunk
+            finally:
+                # leave the channel at the prompt if the caller stops early
+                for chunk in lines:
+                    pass
+
+    def _tee(self, command, lines):
+        """Yield the chunks of a stream, recording it once complete."""
+        start = time.time()
+        chunks = []
+        for chunk in lines:
+            chunks.append(chunk)
+            yield chunk
+        self._record(RECORD_STREAM, command, "".join(chunks),
+                     time.time() - start)
+
+    def send_command_parallel(self, command_list, config_mode=False,
+                              delay_factor=1):
+        """Run read-only commands concurrently on side channels.
+
+        Up to max_channels side channels are opened on the SSH transport
+        and kept for reuse. If config_mode is set, each side channel runs
+        the commands in a private configuration session. The primary
+        channel is left untouched. Return a list of the outputs.
+        """
+        with self.instrument.span('send_command_parallel',
+                                  commands=command_list) as span:
+            outputs = self._send_command_parallel(command_list, config_mode,
+                                                  delay_factor)
+            span.add_bytes(sum(len(output) for output in outputs))
+        return outputs
+
+    def _send_command_parallel(self, command_list, config_mode, delay_factor):
+        """Run commands on side channels and return their outputs."""
+        delay_factor = self.select_delay_factor(delay_factor)
+        timeout = commands.COMMAND_TIMEOUT * delay_factor
+        if not self.max_channels:
+            return [self.send_command_markers(command,
+                                              delay_factor=delay_factor)[1]
+                    for command in self._primary_commands(command_list,
+                                                          config_mode)]
+        pending = queue.Queue()
+        for item in enumerate(command_list):
+            pending.put(item)
+        outputs = {}
+        errors = []
+        workers = [threading.Thread(target=self._channel_worker,
+                                    args=(pending, config_mode, timeout,
+                                          outputs, errors))
+                   for _ in range(min(self.max_channels, len(command_list)))]
+        for thread in workers:
+            thread.daemon = True
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return self._ordered_outputs(outputs, errors, len(command_list))
+
+    def _channel_worker(self, pending, config_mode, timeout, outputs,
+                        errors):
+        """Run pending commands on a side channel until none are left.
+
+        Outputs are stored in outputs by the index of their command, and
+        exceptions are appended to errors.
+        """
+        try:
+            channel = self._checkout_channel(config_mode)
+        except Exception as e:
+            errors.append(e)
+            return
+        try:
+            # idle channels are shared by callers in either mode
+            channel.set_mode(config_mode, timeout)
+            while True:
+                try:
+                    i, command = pending.get_nowait()
+                except queue.Empty:
+                    return
+                outputs[i] = self._run_on_channel(channel, command, timeout)
+        except Exception as e:
+            errors.append(e)
+            channel.close()
+        finally:
+            self._checkin_channel(channel)
+
+    def _run_on_channel(self, channel, command, timeout):
+        """Run a command on a side channel and record its output."""
+        start = time.time()
+        output = channel.send_command(command, timeout)
+        self._record(RECORD_COMMAND, command, output, time.time() - start)
+        return output
+
+    @staticmethod
+    def _ordered_outputs(outputs, errors, count):
+        """Return the outputs in command order, or raise the first error."""
+        if errors:
+            raise errors[0]
+        return [outputs[i] for i in range(count)]
+
+    def _primary_commands(self, command_list, config_mode):
+        """Return commands to run in the mode of the primary channel.
+
+        If config_mode is set the primary channel enters configuration
+        mode. Otherwise it is left in the mode it is in, as leaving a
+        configuration session would discard its candidate, and operational
+        commands are run from the configuration session with 'do'.
+        """
+        if config_mode:
+            self.config_mode()
+            return command_list
+        if self._mode == MODE_UNKNOWN:
+            self.resync_mode()
+        if self._mode in (MODE_CONFIG, MODE_DIRTY):
+            return [commands.OPERATIONAL.format(command)
+                    for command in command_list]
+        return command_list
+
+    def _channel_state(self):
+        """Return the idle side channels, their count and their condition."""
+        if self._channels is None:
+            self._channels = ([], [0], threading.Condition())
+        return self._channels
+
+    def _checkout_channel(self, config_mode=False):
+        """Return an idle side channel, opening one if below the limit.
+
+        An idle channel already in the mode asked for by config_mode is
+        preferred, so that channels switch modes only when they must.
+        """
+        idle, count, condition = self._channel_state()
+        with condition:
+            while not idle and count[0] >= self.max_channels:
+                condition.wait()
+            for i, channel in enumerate(idle):
+                if channel.in_config_mode == config_mode:
+                    return idle.pop(i)
+            if idle:
+                return idle.pop()
+            count[0] += 1
+        try:
+            return ExaROSChannel(self.remote_conn.get_transport(),
+                                 self.base_prompt)
+        except Exception:
+            with condition:
+                count[0] -= 1
+                condition.notify()
+            raise
+
+    def _checkin_channel(self, channel):
+        """Return a side channel for reuse, or release a closed one."""
+        idle, count, condition = self._channel_state()
+        with condition:
+            if channel.channel.closed:
+                count[0] -= 1
+            else:
+                idle.append(channel)
+            condition.notify()
+
+    def close_channels(self):
+        """Close every idle side channel."""
+        if self._channels is None:
+            return
+        idle, count, condition = self._channels
+        with condition:
+            closing = list(idle)
+            del idle[:]
+            count[0] -= len(closing)
+            condition.notify_all()
+        for channel in closing:
+            channel.close()
+
+    def _iter_lines(self, command, timeout):
+        """Write command and yield complete output lines until the prompt."""
+        prompt = self._prompt_pattern()
+        echo = True
+        partial = ""
+        try:
+            self._drain_prompt()
+            self.write_channel(self.normalize_cmd(command))
+            for text in self._iter_text(timeout):
+                chunk, partial = self._split_lines(partial + text)
+                if echo and chunk:
+                    chunk = chunk.split("\n", 1)[1]
+                    echo = False
+                if chunk:
+                    yield chunk
+                if prompt.search(partial):
+                    return
+        except Exception:
+            self._mode = MODE_UNKNOWN
+            raise
+
+    def _iter_text(self, timeout):
+        """Yield text read from the channel as it arrives, until timeout."""
+        decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        deadline = time.time() + timeout
+        while True:
+            if not self.remote_conn.recv_ready():
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise IOError("Timed-out waiting for command to complete")
+                self._wait_readable(remaining)
+                continue
+            data = self.remote_conn.recv(MAX_BUFFER)
+            if not data:
+                raise EOFError("Channel closed by device")
+            yield decoder.decode(data)
+
+    @staticmethod
+    def _split_lines(text):
+        """Split text after its last newline.
+
+        Return the complete lines, without carriage returns, and the
+        partial line that follows them.
+        """
+        end = text.rfind("\n") + 1
+        return text[:end].replace("\r", ""), text[end:]
+
+    def _prompt_pattern(self):
+        """Return a regex matching the device prompt at the end of output."""
+        if self._prompt_re is None:
+            self._prompt_re = commands.prompt_pattern(self.base_prompt)
+        return self._prompt_re
+
+    def _wait_readable(self, timeout):
+        """Block until the channel has data to read or timeout expires."""
+        select.select([self.remote_conn], [], [], timeout)
+
+    def _read_until_complete(self, terminal=None,
+                             timeout=commands.COMMAND_TIMEOUT, prompts=1,
+                             pending=""):
+        """Read from the channel until the prompt or a terminal marker.
+
+        Return the output read and a flag that is set if a terminal marker
+        ended the read, in which case the prompt is still to follow and
+        any output read past the line of the marker is kept in
+        _pending_output. If prompts is greater than one, keep reading until
+        that many prompts have been seen. pending is output already read,
+        which is scanned before reading from the channel.
+        """
+        scanner = commands.CompletionScanner(self._prompt_pattern(), terminal)
+        chunks = []
+        deadline = time.time() + timeout
+        while True:
+            if pending:
+                data, pending = pending, ""
+            else:
+                data = self.read_channel()
+            if data:
+                chunks.append(data)
+                complete = scanner.feed(data)
+                if complete == commands.COMPLETE_MARKER:
+                    output, self._pending_output = self._split_marker_line(
+                        "".join(chunks), terminal)
+                    return output, True
+                if complete and (prompts == 1 or
+                                 self._count_prompts(chunks) >= prompts):
+                    return "".join(chunks), False
+                continue
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise IOError("Timed-out waiting for command to complete")
+            self._wait_readable(remaining)
+
+    @staticmethod
+    def _split_marker_line(output, terminal):
+        """Split output after the line holding the first terminal marker."""
+        match = terminal.search(output)
+        end = output.find("\n", match.end()) if match else -1
+        if end < 0:
+            return output, ""
+        return output[:end + 1], output[end + 1:]
+
+    def _count_prompts(self, chunks):
+        """Return the number of prompts in the output read so far."""
+        splitter = commands.batch_prompt_pattern(self.base_prompt)
+        return len(splitter.findall("".join(chunks)))
+
+    def _drain_prompt(self):
+        """Consume the prompt left behind by an early completion."""
+        if self._prompt_pending:
+            self._prompt_pending = False
+            pending, self._pending_output = self._pending_output, ""
+            self._read_until_complete(pending=pending)
+
+    def probe(self, tier=commands.ALIVE_KEEPALIVE,
+              timeout=commands.ALIVE_TIMEOUT):
+        """Check that the session is alive.
+
+        tier is one of commands.ALIVE_TIERS: 'transport' only checks the
+        local state of the SSH transport, 'keepalive' waits for the reply
+        to an SSH keepalive request, and 'prompt' waits for the device
+        prompt. Return a tuple of a flag with the result and the latency
+        of the probe in seconds.
+        """
+        if tier not in commands.ALIVE_TIERS:
+            raise ValueError("tier should be one of {0}".format(
+                commands.ALIVE_TIERS))
+        start = time.time()
+        try:
+            alive = self._probe(tier, timeout)
+        except (socket.error, EOFError, IOError, paramiko.SSHException):
+            alive = False
+        return alive, time.time() - start
+
+    def _probe(self, tier, timeout):
+        """Return the result of a liveness probe."""
+        transport = self.remote_conn.get_transport()
+        if transport is None or not transport.is_active():
+            return False
+        if tier == commands.ALIVE_TRANSPORT:
+            return True
+        if tier == commands.ALIVE_KEEPALIVE:
+            return self._keepalive(transport, timeout)
+        self._drain_prompt()
+        self.write_channel(self.RETURN)
+        try:
+            self._read_until_complete(timeout=timeout)
+        except IOError:
+            # a late prompt must not be mistaken for the next output
+            self._prompt_pending = True
+            raise
+        return True
+
+    def _keepalive(self, transport, timeout):
+        """Send an SSH keepalive and wait up to timeout for the reply.
+
+        paramiko waits for the reply without a timeout, and keeps a single
+        reply per transport. So at most one keepalive is outstanding per
+        session, and a probe made while one is unanswered waits for that
+        reply instead of sending another request.
+        """
+        with self._keepalive_lock:
+            replied = self._keepalive_reply
+            if replied is None or replied.is_set():
+                replied = self._keepalive_reply = threading.Event()
+                thread = threading.Thread(target=self._keepalive_request,
+                                          args=(transport, replied))
+                thread.daemon = True
+                thread.start()
+        replied.wait(timeout)
+        return replied.is_set() and transport.is_active()
+
+    @staticmethod
+    def _keepalive_request(transport, replied):
+        """Send a keepalive request, and set replied once it returns."""
+        try:
+            # returns once the reply arrives or the transport closes
+            transport.global_request(commands.KEEPALIVE_REQUEST, wait=True)
+        except Exception:
+            pass
+        finally:
+            replied.set()
 
     def check_enable_mode(self, check_string='#'):
         """Check if in enable mode. Return boolean."""
@@ -50,129 +675,467 @@ class ExaROSSSH(BaseConnection):
         return super(ExaROSSSH, self).check_config_mode(
             check_string=check_string, pattern=pattern)
 
-    def config_mode(self, config_command='configure private', pattern=''):
+    def config_mode(self, config_command=commands.CONFIG_MODE, pattern=''):
         """Enter into configuration mode on remote device."""
-        if not pattern:
-            pattern = re.escape(self.base_prompt[:16])
-        return super(ExaROSSSH, self).config_mode(
-            config_command=config_command, pattern=pattern)
+        if self._mode == MODE_UNKNOWN:
+            self.resync_mode()
+        if self._mode in (MODE_CONFIG, MODE_DIRTY):
+            return ""
+        output = self.send_command(config_command,
+                                   expect_string=commands.CONFIG_PROMPT,
+                                   strip_prompt=False, strip_command=False)
+        self._mode = MODE_CONFIG
+        return output
 
-    def exit_config_mode(self, exit_config='abort', pattern=''):
+    def exit_config_mode(self, exit_config=commands.EXIT_CONFIG_MODE,
+                         pattern=''):
         """Exit configuration mode."""
+        if self._mode == MODE_UNKNOWN:
+            self.resync_mode()
+        if self._mode == MODE_OPERATIONAL:
+            return ""
         if not pattern:
             pattern = re.escape(self.base_prompt[:16])
-        return super(ExaROSSSH, self).exit_config_mode(exit_config=exit_config,
-                                                       pattern=pattern)
+        output = self.send_command(exit_config, expect_string=pattern,
+                                   strip_prompt=False, strip_command=False)
+        self._mode = MODE_OPERATIONAL
+        return output
 
     def send_config_set(self, config_commands=None, exit_config_mode=False,
+                        batch_size=CONFIG_BATCH_SIZE, delay_factor=1,
                         **kwargs):
-        """Send configuration commands down the SSH channel."""
-        return super(ExaROSSSH, self).send_config_set(
-            config_commands=config_commands, exit_config_mode=exit_config_mode,
-            **kwargs)
+        """Send configuration commands down the SSH channel.
+
+        Commands are pipelined: each batch of batch_size commands is written
+        at once, and then read back until all of its prompts are seen.
+        Raise ValueError if the device reports an error, without sending
+        any further batches.
+        """
+        if config_commands is None:
+            return ""
+        if hasattr(config_commands, 'splitlines'):
+            config_commands = [config_commands]
+        config_commands = list(config_commands)
+        delay_factor = self.select_delay_factor(delay_factor)
+        self.config_mode()
+        output = []
+        for i in range(0, len(config_commands), batch_size):
+            batch = config_commands[i:i + batch_size]
+            try:
+                output.append(self._send_config_batch(batch, delay_factor))
+            except Exception:
+                self._mode = MODE_UNKNOWN
+                raise
+            if (commands.CONFIG_SET_MARKERS.match(output[-1]) ==
+                    commands.OUTCOME_FAILURE):
+                raise ValueError("Configuration failed:\n\n{0}".format(
+                    "".join(output)))
+        if exit_config_mode:
+            output.append(self.exit_config_mode())
+        return "".join(output)
+
+    def _send_config_batch(self, batch, delay_factor):
+        """Write a batch of configuration commands and return the output."""
+        start = time.time()
+        self._drain_prompt()
+        self.write_channel("".join(self.normalize_cmd(command)
+                                   for command in batch))
+        self._mode = MODE_DIRTY
+        output, _ = self._read_until_complete(
+            timeout=commands.COMMAND_TIMEOUT * delay_factor,
+            prompts=len(batch))
+        output = self.normalize_linefeeds(output)
+        self._record(RECORD_CONFIG, "\n".join(batch), output,
+                     time.time() - start)
+        return output
 
     def get_config(self, store=None, delay_factor=1):
         """Get configuration store."""
-        delay_factor = self.select_delay_factor(delay_factor)
-        stores = {
-            "running": "show configuration running all",
-            "candidate": "show candidate all"
-        }
+        stores = commands.CONFIG_STORES
         if store not in stores:
             raise ValueError("store should be one of {0}".format(
-                stores.iterkeys()))
+                list(stores)))
         self.config_mode()
-        output = self.send_command(stores[store])
+        outcome, output = self.send_command_markers(stores[store],
+                                                    delay_factor=delay_factor)
         return output
 
+    def get_config_sections(self, paths, store=None, delay_factor=1):
+        """Get the sections of a configuration store at each of paths.
+
+        The sections are fetched in a single exchange. Return a list of
+        their configuration, and raise ValueError if the device rejects
+        a path.
+        """
+        command_list = [commands.section_command(store, path)
+                        for path in paths]
+        if not command_list:
+            return []
+        self.config_mode()
+        outputs = self.send_command_batch(command_list,
+                                          delay_factor=delay_factor)
+        for command, output in zip(command_list, outputs):
+            if (commands.SECTION_MARKERS.match(output) ==
+                    commands.OUTCOME_FAILURE):
+                raise ValueError("Invalid configuration path in '{0}':\n\n"
+                                 "{1}".format(command, output))
+        return outputs
+
+    def get_commit_id(self, delay_factor=1):
+        """Return the ID of the latest commit, or None."""
+        self.config_mode()
+        outcome, output = self.send_command_markers(commands.COMMIT_LIST,
+                                                    delay_factor=delay_factor)
+        match = commands.COMMIT_ID.search(output)
+        if match:
+            return match.group('id')
+        return None
+
+    def stream_config(self, store=None, delay_factor=1):
+        """Get configuration store as an iterator of text chunks."""
+        stores = commands.CONFIG_STORES
+        if store not in stores:
+            raise ValueError("store should be one of {0}".format(
+                list(stores)))
+        self.config_mode()
+        return self.stream_command(stores[store], delay_factor=delay_factor)
+
+    def get_config_all(self, delay_factor=1):
+        """Get the running and candidate configurations in one exchange.
+
+        Return a tuple of the running and candidate configuration. If the
+        candidate has no changes, only the running configuration is
+        transferred and is returned for both.
+        """
+        self.config_mode()
+        if not self.candidate_changed(delay_factor=delay_factor):
+            running = self.get_config(store="running",
+                                      delay_factor=delay_factor)
+            return running, running
+        if self.max_channels:
+            # the running configuration streams in on a side channel
+            # while the candidate is read on the primary channel
+            running = []
+
+            def side():
+                try:
+                    running.extend(self.send_command_parallel(
+                        [commands.SHOW_RUNNING], config_mode=True,
+                        delay_factor=delay_factor))
+                except Exception as e:
+                    running.append(e)
+            thread = threading.Thread(target=side)
+            thread.daemon = True
+            thread.start()
+            candidate = self.get_config(store="candidate",
+                                        delay_factor=delay_factor)
+            thread.join()
+            if isinstance(running[0], Exception):
+                raise running[0]
+            return running[0], candidate
+        running, candidate = self.send_command_batch(
+            [commands.SHOW_RUNNING, commands.SHOW_CANDIDATE],
+            delay_factor=delay_factor)
+        return running, candidate
+
+    def candidate_changed(self, delay_factor=1):
+        """Return True if the candidate differs from the running config.
+
+        A configure private session that this session entered and has not
+        changed since is known to be clean without asking the device.
+        """
+        if self._mode == MODE_CONFIG:
+            return False
+        return bool(self.compare(delay_factor=delay_factor))
+
     def load(self, operation=None, file=None, delay_factor=1):
         """Load the candidate configuration from a file."""
-        delay_factor = self.select_delay_factor(delay_factor)
         # check args
-        if operation not in ("replace", "merge"):
+        if operation not in (commands.REPLACE_CONFIG, commands.MERGE_CONFIG):
             raise ValueError("Invalid operation type: {0}".format(operation))
         if not file:
             raise ValueError("No filename provided")
         # load configuration
-        load_command = "load {0} {1}".format(operation, file)
-        load_success = 'Operation completed successfully'
-        self.config_mode()
-        output = self.send_command(load_command, strip_prompt=False,
-                                   strip_command=False,
-                                   delay_factor=delay_factor)
-        if load_success not in output:
+        load_command = commands.LOAD.format(operation=operation, file=file)
+        with self.instrument.span('load', operation=operation):
+            self.config_mode()
+            outcome, output = self.send_command_markers(
+                load_command, markers=commands.LOAD_MARKERS,
+                strip_prompt=False, strip_command=False,
+                delay_factor=delay_factor)
+        # even a failed load may leave a partial candidate behind
+        self._mode = MODE_DIRTY
+        if outcome != commands.OUTCOME_SUCCESS:
             raise Exception("Load failed:\n\n{0}".format(output))
         return output
 
     def compare(self, delay_factor=1):
         """Compare the candidate and running configurations."""
-        delay_factor = self.select_delay_factor(delay_factor)
-        compare_command = "show candidate diff all"
-        no_changes = '% No configuration changes found.'
-        self.config_mode()
-        output = self.send_command(compare_command, delay_factor=delay_factor)
-        if no_changes in output:
+        with self.instrument.span('compare'):
+            self.config_mode()
+            outcome, output = self.send_command_markers(
+                commands.COMPARE, markers=commands.COMPARE_MARKERS,
+                delay_factor=delay_factor)
+        if outcome == commands.OUTCOME_NOOP:
+            self._mode = MODE_CONFIG
             return ""
+        self._mode = MODE_DIRTY
         return output
 
-    def commit(self, comment=None, label=None, delay_factor=1):
-        """Commit the candidate configuration."""
-        delay_factor = self.select_delay_factor(delay_factor)
-        # wrap the comment and label in quotes
-        if comment:
-            if '"' in comment:
-                raise ValueError("Invalid comment contains double quote")
-            comment = '"{0}"'.format(comment)
-        if label:
-            if '"' in label:
-                raise ValueError("Invalid label contains double quote")
-            label = '"{0}"'.format(label)
+    def stream_compare(self, delay_factor=1):
+        """Compare the candidate and running configurations as a stream.
+
+        Yield the diff in chunks of complete lines as it arrives, or
+        nothing if the candidate has no changes.
+        """
+        self.config_mode()
+        self._mode = MODE_DIRTY
+        for chunk in self.stream_command(commands.COMPARE,
+                                         delay_factor=delay_factor):
+            if commands.COMPARE_MARKERS.match(chunk) == commands.OUTCOME_NOOP:
+                self._mode = MODE_CONFIG
+                continue
+            yield chunk
 
+    def commit(self, comment=None, label=None, delay_factor=1,
+               check=commands.COMMIT_CHECK_SEPARATE, confirmed=None):
+        """Commit the candidate configuration.
+
+        check is one of commands.COMMIT_CHECK_MODES. If confirmed is given,
+        the commit is reverted unless confirm_commit is called within that
+        many minutes.
+        """
+        if check not in commands.COMMIT_CHECK_MODES:
+            raise ValueError("check should be one of {0}".format(
+                commands.COMMIT_CHECK_MODES))
         # Select proper command string based on arguments provided
-        commit_command = 'commit'
-        if comment:
-            commit_command += ' comment {0}'.format(comment)
-        if label:
-            commit_command += ' label {0}'.format(label)
+        commit_command = commands.commit_command(comment=comment, label=label,
+                                                 confirmed=confirmed)
 
         # Enter config mode (if necessary)
         output = self.config_mode()
 
-        # Validate the pending changes
-        check_command = 'commit check'
-        is_valid = 'Validation complete'
-        output = self.send_command(check_command, strip_prompt=False,
-                                   strip_command=False,
-                                   delay_factor=delay_factor)
-        if is_valid not in output:
-            raise ValueError("Commit check failed:\n\n{0}".format(output))
-
-        # Commit changes
-        no_changes = '% No modifications to commit.'
-        commit_complete = 'Commit complete.'
-        output = self.send_command(commit_command, strip_prompt=False,
-                                   strip_command=False,
-                                   delay_factor=delay_factor)
-        if commit_complete not in output:
-            if no_changes not in output:
-                raise ValueError("Commit failed:\n\n{0}".format(output))
+        if check == commands.COMMIT_CHECK_PIPELINED:
+            # the commit validates the candidate as well, so it fails
+            # whenever the check before it fails
+            with self.instrument.span('commit'):
+                check_output, output = self.send_command_batch(
+                    [commands.COMMIT_CHECK, commit_command],
+                    delay_factor=delay_factor)
+            # the outcome of the commit, rather than of the check, tells
+            # whether the candidate was committed
+            outcome = commands.COMMIT_MARKERS.match(output)
+            if (outcome not in (commands.OUTCOME_SUCCESS,
+                                commands.OUTCOME_NOOP) and
+                    commands.COMMIT_CHECK_MARKERS.match(check_output) !=
+                    commands.OUTCOME_SUCCESS):
+                raise ValueError("Commit check failed:\n\n{0}".format(
+                    check_output))
+        else:
+            if check == commands.COMMIT_CHECK_SEPARATE:
+                # Validate the pending changes
+                with self.instrument.span('commit_check'):
+                    outcome, output = self.send_command_markers(
+                        commands.COMMIT_CHECK,
+                        markers=commands.COMMIT_CHECK_MARKERS,
+                        strip_prompt=False, strip_command=False,
+                        delay_factor=delay_factor)
+                if outcome != commands.OUTCOME_SUCCESS:
+                    raise ValueError("Commit check failed:\n\n{0}".format(
+                        output))
+
+            # Commit changes
+            with self.instrument.span('commit'):
+                outcome, output = self.send_command_markers(
+                    commit_command, markers=commands.COMMIT_MARKERS,
+                    strip_prompt=False, strip_command=False,
+                    delay_factor=delay_factor)
+        if outcome not in (commands.OUTCOME_SUCCESS, commands.OUTCOME_NOOP):
+            raise ValueError("Commit failed:\n\n{0}".format(output))
+        self._mode = MODE_CONFIG
+        # any commit also confirms a pending confirmed commit
+        self.confirm_pending = bool(confirmed)
 
         return output
 
+    def confirm_commit(self, delay_factor=1):
+        """Confirm a pending confirmed commit."""
+        if not self.confirm_pending:
+            raise ValueError("No confirmed commit is pending")
+        self.config_mode()
+        with self.instrument.span('commit'):
+            outcome, output = self.send_command_markers(
+                commands.COMMIT, markers=commands.COMMIT_MARKERS,
+                strip_prompt=False, strip_command=False,
+                delay_factor=delay_factor)
+        if outcome not in (commands.OUTCOME_SUCCESS, commands.OUTCOME_NOOP):
+            raise ValueError("Commit confirmation failed:\n\n{0}".format(
+                output))
+        self._mode = MODE_CONFIG
+        self.confirm_pending = False
+        return output
+
+    def abort_commit(self, delay_factor=1):
+        """Revert a pending confirmed commit at once."""
+        if not self.confirm_pending:
+            raise ValueError("No confirmed commit is pending")
+        self.config_mode()
+        outcome, output = self.send_command_markers(
+            commands.COMMIT_ABORT, markers=commands.ROLLBACK_MARKERS,
+            strip_prompt=False, strip_command=False,
+            delay_factor=delay_factor)
+        self._mode = MODE_DIRTY
+        if outcome == commands.OUTCOME_FAILURE:
+            raise ValueError("Commit abort failed:\n\n{0}".format(output))
+        self.confirm_pending = False
+        return output
+
+    def rollback(self, label=commands.COMMIT_LABEL, delay_factor=1,
+                 check=commands.COMMIT_CHECK_SEPARATE):
+        """Revert the latest commit with label.
+
+        The configuration as of before that commit is loaded from the
+        commit list, and then committed. Raise ValueError if no commit has
+        the label.
+        """
+        self.config_mode()
+        outcome, output = self.send_command_markers(commands.COMMIT_LIST,
+                                                    delay_factor=delay_factor)
+        commit_id = commands.commit_id_by_label(output, label)
+        if commit_id is None:
+            raise ValueError("No commit with label '{0}'".format(label))
+        with self.instrument.span('rollback'):
+            outcome, output = self.send_command_markers(
+                commands.ROLLBACK.format(commit_id=commit_id),
+                markers=commands.ROLLBACK_MARKERS, strip_prompt=False,
+                strip_command=False, delay_factor=delay_factor)
+        self._mode = MODE_DIRTY
+        if outcome == commands.OUTCOME_FAILURE:
+            raise ValueError("Rollback failed:\n\n{0}".format(output))
+        return self.commit(comment=commands.ROLLBACK_COMMENT.format(commit_id),
+                           delay_factor=delay_factor, check=check)
+
+    def _scp_client(self):
+        """Return an SCP client on the session transport."""
+        transport = self.remote_conn.get_transport()
+        if self._scp is None or self._scp.transport is not transport:
+            self._scp = SCPClient(transport)
+        return self._scp
+
     def scp_put_file(self, source_file=None, dest_file=None):
         """Put file using SCP."""
+        start = time.time()
+        with self.instrument.span('scp_put_file', file=dest_file) as span:
+            self._scp_client().put(source_file, remote_path=dest_file)
+            span.add_bytes(os.path.getsize(source_file))
+        self._record(RECORD_PUT, dest_file, "", time.time() - start)
+
+    def scp_put_data(self, data, dest_file=None):
+        """Put in-memory data using SCP.
+
+        data may be bytes, text or an iterable of lines.
+        """
+        start = time.time()
+        with self.instrument.span('scp_put_file', file=dest_file) as span:
+            buf = config_buffer(data)
+            self._scp_client().putfo(buf, dest_file)
+            span.add_bytes(buf.tell())
+        self._record(RECORD_PUT, dest_file, "", time.time() - start)
+
+    def _sftp_client(self):
+        """Return an SFTP client on the session transport, or None.
+
+        None is returned if the device does not offer SFTP.
+        """
+        transport = self.remote_conn.get_transport()
+        if self._sftp is False:
+            return None
+        if (self._sftp is None or
+                self._sftp.get_channel().get_transport() is not transport):
+            try:
+                self._sftp = paramiko.SFTPClient.from_transport(transport)
+            except (IOError, paramiko.SSHException):
+                self._sftp = False
+                return None
+        return self._sftp
+
+    def sftp_available(self):
+        """Return True if the device offers SFTP to manage remote files."""
+        return self._sftp_client() is not None
+
+    def remote_file_size(self, filename):
+        """Return the size of a remote file, or None if it is unknown."""
+        start = time.time()
+        size = self._remote_file_size(filename)
+        self._record(RECORD_STAT, filename, "" if size is None else str(size),
+                     time.time() - start)
+        return size
+
+    def _remote_file_size(self, filename):
+        """Return the size of a remote file from SFTP, or None."""
+        sftp = self._sftp_client()
+        if sftp is None:
+            return None
         try:
-            scp = SCPConn(ssh_conn=self)
-            scp.scp_put_file(source_file=source_file, dest_file=dest_file)
-        except Exception:
-            raise
-        finally:
-            scp.close()
+            return sftp.stat(filename).st_size
+        except IOError:
+            return None
+
+    def touch_remote_file(self, filename):
+        """Set the modification time of a remote file to now, if possible."""
+        sftp = self._sftp_client()
+        if sftp is None:
+            return
+        try:
+            sftp.utime(filename, None)
+        except IOError:
+            pass
+
+    def prune_remote_files(self, pattern, keep, exclude=(), grace=None):
+        """Remove all but the newest keep remote files matching pattern.
+
+        Files named in exclude are never removed. If grace is given, nor
+        are files modified later than grace seconds before the newest of
+        them, as told by the device clock. Pruning is best effort, and is
+        skipped if the device does not offer SFTP.
+        """
+        sftp = self._sftp_client()
+        if sftp is None:
+            return
+        try:
+            files = [attr for attr in sftp.listdir_attr('.')
+                     if pattern.match(attr.filename)]
+        except IOError:
+            return
+        excluded = [attr.st_mtime for attr in files
+                    if attr.filename in exclude]
+        cutoff = None
+        if excluded and grace is not None:
+            cutoff = max(excluded) - grace
+        files = sorted([attr for attr in files
+                        if attr.filename not in exclude],
+                       key=lambda attr: attr.st_mtime, reverse=True)
+        for attr in files[max(keep - len(exclude), 0):]:
+            if cutoff is not None and attr.st_mtime >= cutoff:
+                continue
+            try:
+                sftp.remove(attr.filename)
+            except IOError:
+                pass
 
     def cleanup(self):
         """Gracefully exit the SSH session."""
+        self.close_channels()
         self.exit_config_mode()
 
+    def disconnect(self):
+        """Close the SSH session, and then the session recorder."""
+        try:
+            super(ExaROSSSH, self).disconnect()
+        finally:
+            if self.recorder is not None:
+                self.recorder.close()
+
     def telnet_login(self, **kwargs):
         """Telnet login is not supported."""
         raise NotImplementedError
@@ -12,3 +12,61 @@
 # License for the specific language governing permissions and limitations under
 # the License.
 """napalm_exaros.utils package."""
+
+from __future__ import unicode_literals
+
+import io
+import os
+import threading
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), 'textfsm_templates')
+
+# Compiled templates by name, with a lock serialising the use of each
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+def config_buffer(data, encoding='utf-8'):
+    """Return an in-memory binary file object holding configuration data.
+
+    data may be bytes, text or an iterable of lines.
+    """
+    if isinstance(data, bytes):
+        return io.BytesIO(data)
+    if hasattr(data, 'encode'):
+        return io.BytesIO(data.encode(encoding))
+    buf = io.BytesIO()
+    for line in data:
+        if not isinstance(line, bytes):
+            line = line.encode(encoding)
+        buf.write(line)
+        if not line.endswith(b'\n'):
+            buf.write(b'\n')
+    buf.seek(0)
+    return buf
+
+
+def _template(template_name):
+    """Return the compiled template and its lock, compiling it once."""
+    with _templates_lock:
+        if template_name not in _templates:
+            import textfsm
+            path = os.path.join(TEMPLATE_DIR, '{0}.tpl'.format(template_name))
+            with io.open(path, encoding='utf-8') as fobj:
+                _templates[template_name] = (textfsm.TextFSM(fobj),
+                                             threading.Lock())
+        return _templates[template_name]
+
+
+def textfsm_extractor(template_name, raw_text):
+    """Parse raw_text with a TextFSM template from textfsm_templates.
+
+    Return a list of dicts, one per record, keyed by the lowercase value
+    names of the template.
+    """
+    fsm, lock = _template(template_name)
+    with lock:
+        fsm.Reset()
+        rows = fsm.ParseText(raw_text)
+        header = [name.lower() for name in fsm.header]
+    return [dict(zip(header, row)) for row in rows]
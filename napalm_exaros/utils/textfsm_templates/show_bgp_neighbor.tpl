@@ -0,0 +1,30 @@
+Value Required NEIGHBOR (\S+)
+Value VRF (\S+)
+Value LOCAL_AS (\d+)
+Value REMOTE_AS (\d+)
+Value DESCRIPTION (.*?)
+Value ROUTER_ID (\S+)
+Value REMOTE_ID (\S+)
+Value ADMIN_STATE (\S+)
+Value SESSION_STATE (\S+)
+Value UPTIME (.+?)
+Value List ADDRESS_FAMILY (\S+ \S+)
+Value List RECEIVED (\d+)
+Value List ACCEPTED (\d+)
+Value List SENT (\d+)
+
+Start
+  ^BGP neighbor\s -> Continue.Record
+  ^BGP neighbor\s+${NEIGHBOR},\s+vrf\s+${VRF}\s*$$
+  ^\s+Local AS\s*:\s*${LOCAL_AS}\s*$$
+  ^\s+Remote AS\s*:\s*${REMOTE_AS}\s*$$
+  ^\s+Description\s*:\s*${DESCRIPTION}\s*$$
+  ^\s+Local router ID\s*:\s*${ROUTER_ID}\s*$$
+  ^\s+Remote router ID\s*:\s*${REMOTE_ID}\s*$$
+  ^\s+Admin state\s*:\s*${ADMIN_STATE}\s*$$
+  ^\s+Session state\s*:\s*${SESSION_STATE}\s*$$
+  ^\s+Uptime\s*:\s*${UPTIME}\s*$$
+  ^\s+Address family\s+${ADDRESS_FAMILY}\s*$$
+  ^\s+Received prefixes\s*:\s*${RECEIVED}\s*$$
+  ^\s+Accepted prefixes\s*:\s*${ACCEPTED}\s*$$
+  ^\s+Sent prefixes\s*:\s*${SENT}\s*$$
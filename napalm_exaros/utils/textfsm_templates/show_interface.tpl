@@ -0,0 +1,43 @@
+Value Required INTERFACE (\S+ \d+(?:/\d+)*)
+Value DESCRIPTION (.*?)
+Value ADMIN_STATE (\S+)
+Value OPER_STATE (\S+)
+Value MAC_ADDRESS (\S+)
+Value MTU (\d+)
+Value SPEED (.+?)
+Value LAST_CHANGE (.+?)
+Value RX_OCTETS (\d+)
+Value RX_UNICAST (\d+)
+Value RX_MULTICAST (\d+)
+Value RX_BROADCAST (\d+)
+Value RX_ERRORS (\d+)
+Value RX_DISCARDS (\d+)
+Value TX_OCTETS (\d+)
+Value TX_UNICAST (\d+)
+Value TX_MULTICAST (\d+)
+Value TX_BROADCAST (\d+)
+Value TX_ERRORS (\d+)
+Value TX_DISCARDS (\d+)
+
+Start
+  ^Interface\s -> Continue.Record
+  ^Interface\s+${INTERFACE}\s*$$
+  ^\s+Description\s*:\s*${DESCRIPTION}\s*$$
+  ^\s+Admin state\s*:\s*${ADMIN_STATE}\s*$$
+  ^\s+Oper state\s*:\s*${OPER_STATE}\s*$$
+  ^\s+MAC address\s*:\s*${MAC_ADDRESS}\s*$$
+  ^\s+MTU\s*:\s*${MTU}\s*$$
+  ^\s+Speed\s*:\s*${SPEED}\s*$$
+  ^\s+Last state change\s*:\s*${LAST_CHANGE}\s*$$
+  ^\s+RX octets\s*:\s*${RX_OCTETS}\s*$$
+  ^\s+RX unicast packets\s*:\s*${RX_UNICAST}\s*$$
+  ^\s+RX multicast packets\s*:\s*${RX_MULTICAST}\s*$$
+  ^\s+RX broadcast packets\s*:\s*${RX_BROADCAST}\s*$$
+  ^\s+RX errors\s*:\s*${RX_ERRORS}\s*$$
+  ^\s+RX discards\s*:\s*${RX_DISCARDS}\s*$$
+  ^\s+TX octets\s*:\s*${TX_OCTETS}\s*$$
+  ^\s+TX unicast packets\s*:\s*${TX_UNICAST}\s*$$
+  ^\s+TX multicast packets\s*:\s*${TX_MULTICAST}\s*$$
+  ^\s+TX broadcast packets\s*:\s*${TX_BROADCAST}\s*$$
+  ^\s+TX errors\s*:\s*${TX_ERRORS}\s*$$
+  ^\s+TX discards\s*:\s*${TX_DISCARDS}\s*$$
@@ -0,0 +1,7 @@
+Value LOCAL_PORT (\S+ \d+(?:/\d+)*)
+Value CHASSIS_ID (\S+)
+Value PORT (\S+)
+Value HOSTNAME (\S+)
+
+Start
+  ^${LOCAL_PORT}\s+${CHASSIS_ID}\s+${PORT}\s+${HOSTNAME}\s*$$ -> Record
@@ -0,0 +1,12 @@
+Value HOSTNAME (\S+)
+Value MODEL (.+?)
+Value SERIAL_NUMBER (\S+)
+Value OS_VERSION (.+?)
+Value UPTIME (.+?)
+
+Start
+  ^\s*Hostname\s*:\s*${HOSTNAME}\s*$$
+  ^\s*Model\s*:\s*${MODEL}\s*$$
+  ^\s*Serial number\s*:\s*${SERIAL_NUMBER}\s*$$
+  ^\s*Software version\s*:\s*${OS_VERSION}\s*$$
+  ^\s*Uptime\s*:\s*${UPTIME}\s*$$
@@ -33,4 +33,7 @@ setup(
     url="https://github.com/wolcomm/napalm-exaros",
     include_package_data=True,
     install_requires=reqs,
+    extras_require={
+        'async': ['asyncssh>=1.12; python_version >= "3.5"'],
+    },
 )
@@ -0,0 +1,189 @@
+"""Benchmarks of ExaROSDriver against the fake ExaROS server.
+
+Run with 'python test/benchmark/bench_driver.py'. Each benchmark is
+repeated and the minimum, median and maximum wall-clock times are
+reported, followed by the latency of each instrumented operation.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import itertools
+import os
+import shutil
+import tempfile
+import time
+
+from fakeserver import FakeExaROSServer
+
+from napalm_exaros.commands import COMMIT_CHECK_MODES, COMMIT_CHECK_SEPARATE
+from napalm_exaros.exaros import ExaROSDriver
+from napalm_exaros.fleet import Fleet
+from napalm_exaros.instrument import Histogram
+from napalm_exaros.pool import SessionPool
+
+CANDIDATE = """interface loopback 1
+ admin-state up
+ description "bench {0}"
+!
+"""
+
+
+class Benchmarks(object):
+    """Benchmarks sharing a fake server and an instrument."""
+
+    names = ('open', 'open_pooled', 'get_config', 'get_config_section',
+             'commit_cycle', 'fleet', 'replay')
+
+    def __init__(self, server, instrument, devices=16,
+                 commit_check=COMMIT_CHECK_SEPARATE):
+        """Constructor."""
+        self.server = server
+        self.instrument = instrument
+        self.commit_check = commit_check
+        self.devices = devices
+        self.pool = SessionPool()
+        self.count = itertools.count()
+        self._device = None
+        self._tmpdir = tempfile.mkdtemp()
+        self._session = None
+
+    def driver(self, **optional_args):
+        """Return a driver for the fake server."""
+        optional_args['port'] = self.server.port
+        optional_args['instrument'] = self.instrument
+        optional_args['commit_check'] = self.commit_check
+        return ExaROSDriver('127.0.0.1', 'bench', 'bench',
+                            optional_args=optional_args)
+
+    @property
+    def device(self):
+        """Return a driver with a session kept open across runs."""
+        if self._device is None:
+            self._device = self.driver()
+            self._device.open()
+        return self._device
+
+    def close(self):
+        """Close the sessions kept open."""
+        if self._device is not None:
+            self._device.close()
+        self.pool.clear()
+        shutil.rmtree(self._tmpdir)
+
+    def run(self, name, iterations):
+        """Return the sorted wall-clock times of runs of a benchmark."""
+        func = getattr(self, 'bench_' + name)
+        times = []
+        for _ in range(iterations):
+            start = time.time()
+            func()
+            times.append(time.time() - start)
+        return sorted(times)
+
+    def bench_open(self):
+        """Open and close a session."""
+        device = self.driver()
+        device.open()
+        device.close()
+
+    def bench_open_pooled(self):
+        """Open and close a session from a session pool."""
+        device = self.driver(session_pool=self.pool)
+        device.open()
+        device.close()
+
+    def bench_get_config(self):
+        """Get the running configuration on an open session."""
+        self.device.get_config(retrieve='running')
+
+    def bench_get_config_section(self):
+        """Get four interface sections on an open session."""
+        self.device.get_config_section(
+            ['interface x-eth 0/0/{0}'.format(i) for i in range(4)])
+
+    def bench_commit_cycle(self):
+        """Load, compare and commit a merge candidate on an open session."""
+        self.commit_cycle(self.device)
+
+    def commit_cycle(self, device):
+        """Load, compare and commit a merge candidate."""
+        device.load_merge_candidate(config=CANDIDATE.format(next(self.count)))
+        device.compare_config()
+        device.commit_config()
+
+    def bench_fleet(self):
+        """Get the running configuration over many concurrent sessions."""
+        inventory = dict(
+            ('bench{0}'.format(i), {
+                'hostname': '127.0.0.1', 'username': 'bench',
+                'password': 'bench',
+                'optional_args': {'port': self.server.port,
+                                  'instrument': self.instrument}})
+            for i in range(self.devices))
+        for result in Fleet(inventory).get_config(retrieve='running'):
+            if not result.ok:
+                raise result.exception
+
+    def bench_replay(self):
+        """Replay a session with a commit cycle, recorded on first use."""
+        if self._session is None:
+            self._session = os.path.join(self._tmpdir, 'session.json.gz')
+            device = self.driver(record=self._session)
+            device.open()
+            self.commit_cycle(device)
+            device.close()
+        device = self.driver(replay=self._session)
+        device.open()
+        self.commit_cycle(device)
+        device.close()
+
+
+def main():
+    """Run the benchmarks and print a report."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--config-lines', type=int, default=10000)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="seconds per command")
+    parser.add_argument('--bandwidth', type=int, default=None,
+                        help="bytes per second")
+    parser.add_argument('--devices', type=int, default=16,
+                        help="concurrent sessions of the fleet benchmark")
+    parser.add_argument('--commit-check', choices=COMMIT_CHECK_MODES,
+                        default=COMMIT_CHECK_SEPARATE,
+                        help="validation of candidates before commits")
+    parser.add_argument('benchmarks', nargs='*',
+                        help="benchmarks to run, by default all of {0}"
+                        .format(", ".join(Benchmarks.names)))
+    args = parser.parse_args()
+    for name in args.benchmarks:
+        if name not in Benchmarks.names:
+            parser.error("unknown benchmark: {0}".format(name))
+    instrument = Histogram()
+    with FakeExaROSServer(config_lines=args.config_lines,
+                          latency=args.latency,
+                          bandwidth=args.bandwidth) as server:
+        benchmarks = Benchmarks(server, instrument, devices=args.devices,
+                                commit_check=args.commit_check)
+        print("{0:<18} {1:>10} {2:>10} {3:>10}".format(
+            "benchmark", "min", "median", "max"))
+        try:
+            for name in args.benchmarks or Benchmarks.names:
+                times = benchmarks.run(name, args.iterations)
+                print("{0:<18} {1:>10.4f} {2:>10.4f} {3:>10.4f}".format(
+                    name, times[0], times[len(times) // 2], times[-1]))
+        finally:
+            benchmarks.close()
+    print()
+    print("{0:<22} {1:>7} {2:>10} {3:>10} {4:>12}".format(
+        "operation", "count", "mean", "p90", "bytes"))
+    for name, stats in sorted(instrument.summary().items()):
+        print("{0:<22} {1:>7} {2:>10.4f} {3:>10.4f} {4:>12}".format(
+            name, stats['count'], stats['mean'],
+            instrument.quantile(name, 0.9), stats['bytes']))
+
+
+if __name__ == '__main__':
+    main()
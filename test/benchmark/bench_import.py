@@ -0,0 +1,59 @@
+"""Benchmark of the import time of napalm_exaros.
+
+Run with 'python test/benchmark/bench_import.py'. Each import is timed in
+a fresh interpreter. With --max-ms, exit with an error if the median
+time of importing the package exceeds that many milliseconds.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import subprocess
+import sys
+
+STATEMENTS = (
+    "import napalm_exaros",
+    "import napalm_exaros.parser, napalm_exaros.diff",
+    "from napalm_exaros import ExaROSDriver",
+    "import napalm_exaros.ssh",
+)
+
+TIMER = """import time
+start = time.time()
+{0}
+print(time.time() - start)
+"""
+
+
+def time_import(statement, iterations):
+    """Return the sorted import times of statement in milliseconds."""
+    times = []
+    for _ in range(iterations):
+        output = subprocess.check_output(
+            [sys.executable, '-c', TIMER.format(statement)])
+        times.append(float(output) * 1000)
+    return sorted(times)
+
+
+def main():
+    """Time each import and print a report."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help="limit on the median of the package import")
+    args = parser.parse_args()
+    print("{0:<50} {1:>9} {2:>9}".format("statement", "min ms", "median ms"))
+    medians = []
+    for statement in STATEMENTS:
+        times = time_import(statement, args.iterations)
+        medians.append(times[len(times) // 2])
+        print("{0:<50} {1:>9.1f} {2:>9.1f}".format(
+            statement, times[0], medians[-1]))
+    if args.max_ms is not None and medians[0] > args.max_ms:
+        sys.exit("import napalm_exaros took {0:.1f}ms, over {1}ms".format(
+            medians[0], args.max_ms))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,444 @@
+"""Fake ExaROS SSH server for benchmarks.
+
+The server emulates enough of the ExaROS CLI for the driver: prompts,
+session preparation, 'configure private', load, sections of the running
+configuration, 'show candidate diff all', commit check, confirmed and
+plain commits, commit abort, rollback and SCP uploads. Per-command
+latency, output bandwidth and the size of the running configuration are
+configurable.
+
+Run it standalone with 'python test/benchmark/fakeserver.py --port 12443'
+to serve TestConfigExaROSDriver.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import difflib
+import logging
+import posixpath
+import re
+import socket
+import threading
+import time
+
+import paramiko
+
+HOSTNAME = 'bench-lab'
+CHUNK_SIZE = 16384
+LOG_CHANNEL = 'fakeserver.transport'
+LABEL = re.compile(r'label "([^"]*)"')
+
+# clients that disconnect abruptly are expected, and not worth a traceback
+logging.getLogger(LOG_CHANNEL).addHandler(logging.NullHandler())
+logging.getLogger(LOG_CHANNEL).propagate = False
+
+INTERFACE = """interface x-eth 0/0/{0}
+ admin-state  up
+ description  "bench link {0}"
+ ipv4-address 10.{1}.{2}.0/31
+ mtu          9200
+!
+"""
+
+
+def close(channel):
+    """Close a channel whose client may have gone away."""
+    try:
+        channel.close()
+    except (EOFError, socket.error):
+        pass
+
+
+def running_config(lines):
+    """Return a running configuration of about lines lines."""
+    blocks = ["system\n hostname {0}\n!\n".format(HOSTNAME)]
+    for i in range(max(lines // 6, 1)):
+        blocks.append(INTERFACE.format(i, i // 256, i % 256))
+    return "".join(blocks)
+
+
+def section(config, path):
+    """Return the top-level blocks of config whose first line is path."""
+    lines = []
+    keep = False
+    for line in config.splitlines(True):
+        if not line.startswith((" ", "!")):
+            keep = line.strip() == path
+        if keep:
+            lines.append(line)
+    return "".join(lines)
+
+
+class Device(object):
+    """State of the emulated device, shared by its sessions."""
+
+    def __init__(self, config_lines=1000, latency=0.0, bandwidth=None):
+        """Constructor."""
+        self.running = running_config(config_lines)
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.files = {}
+        # (commit ID, label, running configuration before the commit)
+        self.commits = []
+        self.lock = threading.Lock()
+
+
+class CLI(object):
+    """Emulated CLI session on a shell channel."""
+
+    def __init__(self, device, channel):
+        """Constructor."""
+        self.device = device
+        self.channel = channel
+        self.candidate = None
+        # running configuration to restore if a confirmed commit is aborted
+        self.confirmed = None
+
+    @property
+    def prompt(self):
+        """Return the prompt of the current mode."""
+        if self.candidate is None:
+            return "{0}#".format(HOSTNAME)
+        return "{0}(config)#".format(HOSTNAME)
+
+    def send(self, text):
+        """Send text, limited to the configured bandwidth."""
+        data = text.replace("\n", "\r\n").encode('utf-8')
+        for i in range(0, len(data), CHUNK_SIZE):
+            chunk = data[i:i + CHUNK_SIZE]
+            self.channel.sendall(chunk)
+            if self.device.bandwidth:
+                time.sleep(len(chunk) / float(self.device.bandwidth))
+
+    def run(self):
+        """Serve commands until the channel closes."""
+        try:
+            self.serve()
+        except (EOFError, socket.error):
+            # the client went away
+            pass
+        finally:
+            close(self.channel)
+
+    def serve(self):
+        """Echo and execute each command line received."""
+        self.send(self.prompt)
+        buf = b""
+        while True:
+            data = self.channel.recv(CHUNK_SIZE)
+            if not data:
+                return
+            buf += data.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+            while b"\n" in buf:
+                line, buf = buf.split(b"\n", 1)
+                line = line.decode('utf-8', 'replace').replace("\x00", "")
+                self.send(line + "\n")
+                if self.device.latency:
+                    time.sleep(self.device.latency)
+                output = self.execute(line.strip())
+                if output:
+                    self.send(output.rstrip("\n") + "\n")
+                self.send(self.prompt)
+
+    def execute(self, line):
+        """Run a command line and return its output."""
+        words = line.split()
+        if not words:
+            return ""
+        handler = self.COMMANDS.get(words[0])
+        output = handler(self, words, line) if handler else None
+        if output is not None:
+            return output
+        if self.candidate is None:
+            return "% Error: unknown command: {0}".format(line)
+        handler = self.CONFIG_COMMANDS.get(words[0], CLI.set_line)
+        return handler(self, words, line)
+
+    # Operational commands, which return None for lines they do not know
+
+    def configure_private(self, words, line):
+        """Enter a private configuration session."""
+        if line != 'configure private':
+            return None
+        if self.candidate is None:
+            self.candidate = self.device.running
+        return ""
+
+    def prepare(self, words, line):
+        """Accept the session preparation commands."""
+        if line in ('session paginate disable', 'terminal width 511'):
+            return ""
+        return None
+
+    def show(self, words, line):
+        """Show the running configuration, its commits or the version."""
+        device = self.device
+        if line == 'show configuration running all':
+            return device.running
+        if words[1:3] == ['configuration', 'running'] and len(words) > 3:
+            return section(device.running, line.split(" ", 3)[3])
+        if line == 'show configuration commit list':
+            rows = ["  SNo.  ID          User   Label"]
+            for i, commit in enumerate(reversed(device.commits)):
+                rows.append("  {0:<5} {1:<11} admin  {2}".format(
+                    i, commit[0], commit[1]))
+            return "\n".join(rows)
+        if line == 'show version':
+            return ("Hostname         : {0}\nModel            : EX-800\n"
+                    "Software version : ExaROS 3.2.1\n").format(HOSTNAME)
+        return None
+
+    # Configuration mode commands
+
+    def set_line(self, words, line):
+        """Add a configuration command to the candidate."""
+        self.candidate += line + "\n"
+        return ""
+
+    def abort(self, words, line):
+        """Leave the configuration session, discarding the candidate."""
+        if line != 'abort':
+            return self.set_line(words, line)
+        self.candidate = None
+        return ""
+
+    def show_candidate(self, words, line):
+        """Show the candidate, or its differences from the running one."""
+        if line == 'show candidate all':
+            return self.candidate
+        if line != 'show candidate diff all':
+            return self.set_line(words, line)
+        if self.candidate == self.device.running:
+            return "% No configuration changes found."
+        return "\n".join(difflib.unified_diff(
+            self.device.running.splitlines(), self.candidate.splitlines(),
+            lineterm="", n=1))
+
+    def load(self, words, line):
+        """Merge an uploaded file into the candidate, or replace it."""
+        if len(words) != 3:
+            return self.set_line(words, line)
+        data = self.device.files.get(posixpath.basename(words[2]))
+        if data is None:
+            return "% Error: file not found: {0}".format(words[2])
+        data = data.decode('utf-8')
+        if words[1] == 'replace':
+            self.candidate = data
+        else:
+            self.candidate = self.candidate + data
+        return "Loading.\nOperation completed successfully"
+
+    def commit_command(self, words, line):
+        """Check the candidate, abort a confirmed commit or commit."""
+        if line == 'commit check':
+            return "Validation complete"
+        if line == 'commit abort':
+            return self.commit_abort()
+        return self.commit(line)
+
+    def commit_abort(self):
+        """Revert a confirmed commit awaiting confirmation."""
+        if self.confirmed is None:
+            return "% Error: no confirmed commit in progress"
+        with self.device.lock:
+            self.device.running = self.candidate = self.confirmed
+        self.confirmed = None
+        return ""
+
+    def rollback(self, words, line):
+        """Load the configuration from before a commit into the candidate."""
+        if words[:2] != ['rollback', 'configuration'] or len(words) != 3:
+            return self.set_line(words, line)
+        for commit_id, label, before in self.device.commits:
+            if str(commit_id) == words[2]:
+                self.candidate = before
+                return ""
+        return "% Error: no such commit: {0}".format(words[2])
+
+    COMMANDS = {
+        'configure': configure_private,
+        'session': prepare,
+        'terminal': prepare,
+        'show': show,
+    }
+    # any other line changes the candidate, as a configuration command
+    CONFIG_COMMANDS = {
+        'abort': abort,
+        'show': show_candidate,
+        'load': load,
+        'commit': commit_command,
+        'rollback': rollback,
+    }
+
+    def commit(self, line):
+        """Commit the candidate, confirmed or pending confirmation."""
+        device = self.device
+        with device.lock:
+            before = device.running
+            if 'confirmed' not in line.split():
+                self.confirmed = None
+            elif self.confirmed is None:
+                self.confirmed = before
+            if self.candidate == before:
+                return "% No modifications to commit."
+            label = LABEL.search(line)
+            device.running = self.candidate
+            device.commits.append((1000000000 + len(device.commits),
+                                   label.group(1) if label else "", before))
+        return "Commit complete."
+
+
+def scp_sink(device, channel):
+    """Receive files with the SCP sink protocol."""
+    stream = channel.makefile('rb')
+    try:
+        channel.sendall(b"\0")
+        while True:
+            header = stream.readline()
+            if not header:
+                break
+            if header[:1] == b"C":
+                mode, size, name = header[1:].decode('utf-8').split(" ", 2)
+                channel.sendall(b"\0")
+                data = stream.read(int(size))
+                stream.read(1)
+                device.files[name.strip()] = data
+            channel.sendall(b"\0")
+    except (EOFError, socket.error):
+        pass
+    finally:
+        try:
+            channel.send_exit_status(0)
+        except (EOFError, socket.error):
+            pass
+        close(channel)
+
+
+class Server(paramiko.ServerInterface):
+    """SSH server interface accepting any password."""
+
+    def __init__(self, device):
+        """Constructor."""
+        self.device = device
+
+    def check_auth_password(self, username, password):
+        """Accept any credentials."""
+        return paramiko.AUTH_SUCCESSFUL
+
+    def get_allowed_auths(self, username):
+        """Offer password authentication."""
+        return 'password'
+
+    def check_channel_request(self, kind, chanid):
+        """Allow session channels."""
+        if kind == 'session':
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, channel, term, width, height,
+                                  pixelwidth, pixelheight, modes):
+        """Allow pseudo-terminals."""
+        return True
+
+    def check_channel_shell_request(self, channel):
+        """Start a CLI session."""
+        self._start(CLI(self.device, channel).run)
+        return True
+
+    def check_channel_exec_request(self, channel, command):
+        """Start an SCP upload."""
+        if not command.startswith(b"scp -t"):
+            return False
+        self._start(scp_sink, self.device, channel)
+        return True
+
+    @staticmethod
+    def _start(target, *args):
+        """Run target in a daemon thread."""
+        thread = threading.Thread(target=target, args=args)
+        thread.daemon = True
+        thread.start()
+
+
+class FakeExaROSServer(object):
+    """Fake ExaROS device listening on a local port."""
+
+    def __init__(self, port=0, **kwargs):
+        """Constructor.
+
+        kwargs are passed to Device: config_lines, latency in seconds per
+        command and bandwidth in bytes per second.
+        """
+        self.device = Device(**kwargs)
+        self.host_key = paramiko.RSAKey.generate(2048)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(('127.0.0.1', port))
+        self.port = self.sock.getsockname()[1]
+        self.transports = []
+
+    def __enter__(self):
+        """Start serving on entering a with block."""
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Stop serving on leaving a with block."""
+        self.stop()
+
+    def start(self):
+        """Accept connections in a background thread."""
+        self.sock.listen(100)
+        thread = threading.Thread(target=self.serve)
+        thread.daemon = True
+        thread.start()
+
+    def serve(self):
+        """Accept connections until the socket is closed."""
+        while True:
+            try:
+                client, addr = self.sock.accept()
+            except (socket.error, OSError):
+                return
+            # echo, output and prompt are separate writes, which must not
+            # wait for delayed acknowledgements
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            transport = paramiko.Transport(client)
+            transport.set_log_channel(LOG_CHANNEL)
+            transport.add_server_key(self.host_key)
+            self.transports.append(transport)
+            # negotiate in the transport thread, so that clients connect
+            # concurrently
+            transport.start_server(event=threading.Event(),
+                                   server=Server(self.device))
+
+    def stop(self):
+        """Stop accepting connections and close open sessions."""
+        self.sock.close()
+        for transport in self.transports:
+            transport.close()
+
+
+def main():
+    """Run a fake device until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument('--port', type=int, default=12443)
+    parser.add_argument('--config-lines', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--bandwidth', type=int, default=None)
+    args = parser.parse_args()
+    with FakeExaROSServer(port=args.port, config_lines=args.config_lines,
+                          latency=args.latency,
+                          bandwidth=args.bandwidth) as server:
+        print("Listening on 127.0.0.1:{0}".format(server.port))
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -6,7 +6,7 @@ from napalm_base.test import conftest as parent_conftest
 from napalm_base.test.double import BaseTestDouble
 from napalm_base.utils import py23_compat
 
-from napalm_exaros import exaros
+from napalm_exaros import commands, exaros
 from napalm_exaros.ssh import ExaROSSSH
 
 import pytest
@@ -57,6 +57,8 @@ class PatchedExaROSDriver(exaros.ExaROSDriver):
 class FakeExaROSDevice(BaseTestDouble, ExaROSSSH):
     """ExaROS device test double."""
 
+    _mode = commands.MODE_OPERATIONAL
+
     def select_delay_factor(self, delay_factor):
         """Set dummy delay_factor."""
         return 1
@@ -71,3 +73,13 @@ class FakeExaROSDevice(BaseTestDouble, ExaROSSSH):
         full_path = self.find_file(filename)
         result = self.read_txt_file(full_path)
         return py23_compat.text_type(result)
+
+    def send_command_batch(self, command_list, **kwargs):
+        """Fake send_command_batch."""
+        return [self.send_command(command) for command in command_list]
+
+    def send_command_markers(self, command, markers=commands.NO_MARKERS,
+                             **kwargs):
+        """Fake send_command_markers."""
+        output = self.send_command(command)
+        return markers.match(output), output
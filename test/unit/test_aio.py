@@ -0,0 +1,128 @@
+"""Tests for the asyncio driver against the fake ExaROS server."""
+
+import asyncio
+import importlib
+import os
+import sys
+
+from napalm_base.exceptions import ConnectionException
+
+from napalm_exaros import aio, commands
+
+import pytest
+
+pytestmark = pytest.mark.skipif(aio.asyncssh is None,
+                                reason="asyncssh is not installed")
+
+BENCHMARK = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         os.pardir, 'benchmark')
+
+CANDIDATE = """interface loopback 1
+ admin-state up
+!
+"""
+
+
+@pytest.fixture(scope='module')
+def server(request):
+    """Return a fake ExaROS server running for the module."""
+    sys.path.insert(0, BENCHMARK)
+    try:
+        fakeserver = importlib.import_module('fakeserver')
+    finally:
+        sys.path.remove(BENCHMARK)
+    server = fakeserver.FakeExaROSServer(config_lines=30)
+    server.start()
+    request.addfinalizer(server.stop)
+    return server
+
+
+def run(coroutine):
+    """Run a coroutine on a new event loop."""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def driver(server, **optional_args):
+    """Return a driver for the fake server."""
+    optional_args['port'] = server.port
+    return aio.AsyncExaROSDriver('127.0.0.1', 'u', 'p', timeout=10,
+                                 optional_args=optional_args)
+
+
+def test_open(server):
+    """A session is prepared on open, and closed on leaving the block."""
+    async def session():
+        async with driver(server) as device:
+            assert device._prompt.search('bench-lab(config)#')
+            assert await device.is_alive() == {'is_alive': True}
+        assert await device.is_alive() == {'is_alive': False}
+    run(session())
+
+
+def test_open_refused(server):
+    """A failed connection raises ConnectionException."""
+    device = driver(server)
+    device.port = 1
+    with pytest.raises(ConnectionException):
+        run(device.open())
+
+
+def test_get_config(server):
+    """The running and candidate configurations are retrieved."""
+    async def session():
+        async with driver(server) as device:
+            return await device.get_config()
+    config = run(session())
+    assert config['running'] == server.device.running.rstrip("\n")
+    assert config['candidate'] == config['running']
+    assert config['startup'] == ""
+    with pytest.raises(ValueError):
+        run(driver(server).get_config(retrieve="saved"))
+
+
+def test_scp_sink(server):
+    """Data is uploaded with the SCP sink protocol."""
+    async def session():
+        async with driver(server) as device:
+            await device._scp_put_data(b"hostname r1\n", 'upload.conf')
+    run(session())
+    assert server.device.files['upload.conf'] == b"hostname r1\n"
+
+
+def test_load_compare_discard(server):
+    """A discarded candidate leaves the running configuration unchanged."""
+    running = server.device.running
+
+    async def session():
+        async with driver(server) as device:
+            assert await device.compare_config() == ""
+            await device.load_merge_candidate(config=CANDIDATE)
+            diff = await device.compare_config()
+            await device.discard_config()
+            return diff
+    diff = run(session())
+    assert "+interface loopback 1" in diff
+    assert server.device.files['candidate.conf'] == CANDIDATE.encode('utf-8')
+    assert server.device.running == running
+
+
+def test_load_replace_commit(server, tmpdir):
+    """A candidate loaded from a file replaces the running configuration."""
+    config = server.device.running + CANDIDATE
+    source = tmpdir.join('candidate.conf')
+    source.write(config)
+
+    async def session():
+        async with driver(server) as device:
+            await device.load_replace_candidate(filename=str(source))
+            output = await device.commit_config()
+            return output, await device.compare_config()
+    output, diff = run(session())
+    assert "Commit complete." in output
+    assert diff == ""
+    assert server.device.running == config
+    assert server.device.commits[-1][1] == commands.COMMIT_LABEL
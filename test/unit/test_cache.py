@@ -0,0 +1,32 @@
+"""Tests for the running configuration cache."""
+
+from napalm_exaros.cache import ConfigCache
+
+
+def test_lru_eviction():
+    """The least recently used entry is evicted first."""
+    cache = ConfigCache(maxsize=2)
+    cache.put('r1', '1', 'config 1')
+    cache.put('r2', '1', 'config 2')
+    assert cache.get('r1', '1') == 'config 1'
+    cache.put('r3', '1', 'config 3')
+    assert cache.get('r2', '1') is None
+    assert cache.get('r1', '1') == 'config 1'
+    assert len(cache) == 2
+
+
+def test_keyed_by_commit():
+    """An entry only matches the commit it was stored for."""
+    cache = ConfigCache()
+    cache.put('r1', '10001', 'old')
+    assert cache.get('r1', '10002') is None
+
+
+def test_invalidate(tmpdir):
+    """Invalidation removes entries from memory and disk."""
+    cache = ConfigCache(path=str(tmpdir))
+    cache.put('r1', '1', 'config 1')
+    cache.put('r2', '1', 'config 2')
+    cache.invalidate('r1')
+    assert cache.get('r1', '1') is None
+    assert ConfigCache(path=str(tmpdir)).get('r2', '1') == 'config 2'
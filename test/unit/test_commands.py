@@ -0,0 +1,58 @@
+"""Tests for command completion markers."""
+
+from napalm_exaros import commands
+
+import pytest
+
+
+def test_commit_markers():
+    """Commit output is classified by its markers."""
+    markers = commands.COMMIT_MARKERS
+    assert markers.match("commit\nCommit complete.\n") == \
+        commands.OUTCOME_SUCCESS
+    assert markers.match("commit\n% No modifications to commit.\n") == \
+        commands.OUTCOME_NOOP
+    assert markers.match("commit\nAborted: out of memory\n") == \
+        commands.OUTCOME_FAILURE
+    assert markers.match("commit\n") == commands.OUTCOME_PROMPT
+
+
+def test_terminal_markers():
+    """Only success and no-op markers are terminal."""
+    markers = commands.COMMIT_MARKERS
+    assert markers.terminal.search("Commit complete.")
+    assert markers.terminal.search("% No modifications to commit.")
+    assert not markers.terminal.search("Error: bad value")
+    assert commands.NO_MARKERS.terminal is None
+
+
+def test_section_command():
+    """Section commands join and normalise the lines of a path."""
+    assert commands.section_command('running', 'interface  x-eth 0/0/1') == \
+        'show configuration running interface x-eth 0/0/1'
+    assert commands.section_command(
+        'candidate', ('routing bgp 65000', 'neighbor 10.0.0.2')) == \
+        'show candidate routing bgp 65000 neighbor 10.0.0.2'
+    assert commands.section_command('running', 'policy\nabort') == \
+        'show configuration running policy abort'
+    with pytest.raises(ValueError):
+        commands.section_command('startup', 'policy')
+    with pytest.raises(ValueError):
+        commands.section_command('running', ' ')
+
+
+def test_commit_command():
+    """Commit commands carry the comment, label and confirmed timeout."""
+    assert commands.commit_command(label='x', confirmed=10) == \
+        'commit label "x" confirmed 10'
+    assert commands.commit_command(comment='y') == 'commit comment "y"'
+
+
+def test_commit_id_by_label():
+    """The latest commit with a label is found in the commit list."""
+    commit_list = ("  SNo.  ID          User   Label\n"
+                   "  0     1000000002  admin  other\n"
+                   "  1     1000000001  admin  napalm\n"
+                   "  2     1000000000  admin  napalm\n")
+    assert commands.commit_id_by_label(commit_list, 'napalm') == '1000000001'
+    assert commands.commit_id_by_label(commit_list, 'missing') is None
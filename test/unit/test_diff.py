@@ -0,0 +1,133 @@
+"""Tests for the offline configuration diff."""
+
+from napalm_exaros import diff
+
+RUNNING = """vrf default
+!
+interface x-eth 0/0/0
+ admin-state  up
+ description  "old"
+ mtu          9200
+!
+interface x-eth 0/0/1
+ admin-state down
+!
+"""
+
+
+def test_identical():
+    """Identical configurations produce no diff."""
+    assert diff.diff(RUNNING, RUNNING) == ""
+    assert diff.diff(RUNNING, RUNNING.replace("  up", " up")) == ""
+
+
+def test_replace():
+    """Replace removes what the candidate does not contain."""
+    candidate = """vrf default
+!
+interface x-eth 0/0/0
+ admin-state  up
+ description  "new"
+ mtu          9200
+!
+"""
+    assert diff.diff(RUNNING, candidate).split("\n") == [
+        "-interface x-eth 0/0/1",
+        "- admin-state down",
+        "-!",
+        " interface x-eth 0/0/0",
+        "- description  \"old\"",
+        "+ description  \"new\"",
+        " !",
+    ]
+
+
+def test_merge():
+    """Merge keeps existing lines and replaces unique leaves."""
+    candidate = """interface x-eth 0/0/0
+ description "new"
+!
+vrf management
+!
+"""
+    assert diff.diff(RUNNING, candidate, operation='merge').split("\n") == [
+        " interface x-eth 0/0/0",
+        "- description  \"old\"",
+        "+ description \"new\"",
+        " !",
+        "+vrf management",
+        "+!",
+    ]
+
+
+def test_delta_replace():
+    """Replace deltas remove stale lines and set changed ones."""
+    candidate = """vrf default
+!
+interface x-eth 0/0/0
+ admin-state  up
+ description  "new"
+ mtu          9200
+!
+policy route permit-all
+ rule permit-all
+  default-permit
+end-policy
+!
+"""
+    assert diff.delta_commands(RUNNING, candidate) == [
+        "no interface x-eth 0/0/1",
+        "interface x-eth 0/0/0",
+        "description \"new\"",
+        "exit",
+        "policy route permit-all",
+        "rule permit-all",
+        "default-permit",
+        "exit",
+        "end-policy",
+    ]
+
+
+def test_delta_merge():
+    """Merge deltas never remove lines."""
+    candidate = """interface x-eth 0/0/1
+ mtu 9000
+!
+"""
+    assert diff.delta_commands(RUNNING, candidate, operation='merge') == [
+        "interface x-eth 0/0/1",
+        "mtu 9000",
+        "exit",
+    ]
+    assert diff.delta_commands(RUNNING, RUNNING) == []
+
+
+def test_parse_diff():
+    """Diffs are parsed into hunks by stanza, across chunk boundaries."""
+    candidate = """vrf default
+!
+interface x-eth 0/0/0
+ admin-state  up
+ description  "new"
+ mtu          9200
+!
+interface loopback 1
+ admin-state up
+!
+"""
+    text = diff.diff(RUNNING, candidate)
+    chunks = [text[i:i + 7] for i in range(0, len(text), 7)]
+    for source in (text, chunks):
+        result = diff.parse_diff(source)
+        assert [(h.stanza, h.added, h.removed) for h in result] == [
+            ("interface x-eth 0/0/1", [], [
+                "interface x-eth 0/0/1", " admin-state down"]),
+            ("interface x-eth 0/0/0", [" description  \"new\""],
+             [" description  \"old\""]),
+            ("interface loopback 1", [
+                "interface loopback 1", " admin-state up"], []),
+        ]
+        assert (result.added, result.removed) == (3, 3)
+        assert len(result.section('interface')) == 3
+        assert result.text() == text
+    assert len(diff.parse_diff("% No configuration changes found.")) == 0
@@ -0,0 +1,243 @@
+"""Tests for the driver on a fake session."""
+
+from napalm_exaros import commands
+from napalm_exaros.cache import ConfigCache
+from napalm_exaros.exaros import CANDIDATE, CANDIDATE_PATTERN, ExaROSDriver
+from napalm_exaros.pool import SessionPool
+
+import pytest
+
+RUNNING = "system\n hostname r1\n!\n"
+
+
+class FakeConnection(object):
+    """ExaROSSSH double tracking the mode and recording calls."""
+
+    confirm_pending = False
+    sftp = True
+
+    def __init__(self, running=RUNNING):
+        """Constructor."""
+        self.running = running
+        self.mode = commands.MODE_OPERATIONAL
+        self.calls = []
+        # sizes of the remote files
+        self.files = {}
+        self.commit_id = '1000000001'
+
+    def resync_mode(self):
+        """Return the tracked mode."""
+        return self.mode
+
+    def config_mode(self):
+        """Enter a clean configuration session if not in one."""
+        if self.mode == commands.MODE_OPERATIONAL:
+            self.mode = commands.MODE_CONFIG
+
+    def exit_config_mode(self):
+        """Discard the candidate."""
+        self.calls.append(('abort',))
+        self.mode = commands.MODE_OPERATIONAL
+
+    def stream_config(self, store=None):
+        """Return the configuration store as chunks."""
+        self.calls.append(('get_config', store))
+        return iter([self.running])
+
+    def get_config(self, store=None):
+        """Return the configuration store."""
+        self.calls.append(('get_config', store))
+        return self.running
+
+    def send_config_set(self, config_commands):
+        """Apply configuration commands to the candidate."""
+        self.calls.append(('send_config_set', tuple(config_commands)))
+        self.mode = commands.MODE_DIRTY
+
+    def scp_put_data(self, data, dest_file=None):
+        """Upload a candidate."""
+        self.calls.append(('put', dest_file))
+        self.files[dest_file] = len(data)
+
+    def sftp_available(self):
+        """Return True if remote files can be managed."""
+        return self.sftp
+
+    def remote_file_size(self, filename):
+        """Return the size of a remote file, or None."""
+        self.calls.append(('stat', filename))
+        return self.files.get(filename)
+
+    def touch_remote_file(self, filename):
+        """Record the touching of a remote file."""
+        self.calls.append(('touch', filename))
+
+    def prune_remote_files(self, pattern, keep, exclude=(), grace=None):
+        """Record the pruning of remote files."""
+        self.calls.append(('prune', keep, tuple(exclude)))
+
+    def load(self, operation=None, file=None):
+        """Load a candidate file."""
+        self.calls.append(('load', operation, file))
+        self.mode = commands.MODE_DIRTY
+
+    def get_commit_id(self):
+        """Return the ID of the latest commit."""
+        self.calls.append(('commit_id',))
+        return self.commit_id
+
+    def commit(self, label=None, check=None, confirmed=None):
+        """Commit the candidate."""
+        self.calls.append(('commit', label))
+        self.mode = commands.MODE_CONFIG
+
+    def rollback(self, label=None, check=None):
+        """Revert the latest commit with label."""
+        self.calls.append(('rollback', label))
+
+    def get_config_sections(self, paths, store=None):
+        """Return the section of store at each of paths."""
+        self.calls.append(('get_config_sections', tuple(paths)))
+        return ['section {0}'.format(i) for i in range(len(paths))]
+
+    def disconnect(self):
+        """Close the session."""
+        self.calls.append(('disconnect',))
+
+    def names(self):
+        """Return the names of the calls made."""
+        return [call[0] for call in self.calls]
+
+
+def driver(connection=None, **optional_args):
+    """Return a driver on a fake session."""
+    device = ExaROSDriver('r1', 'u', 'p', optional_args=optional_args)
+    device.connection = connection or FakeConnection()
+    return device
+
+
+def test_skip_unchanged_clean():
+    """An unchanged candidate is skipped on a clean session."""
+    device = driver(skip_unchanged=True)
+    device.load_replace_candidate(config=RUNNING)
+    assert device.compare_config() == ""
+    assert 'load' not in device.connection.names()
+
+
+def test_skip_unchanged_dirty_replace():
+    """A replace discards earlier changes before being skipped."""
+    device = driver(skip_unchanged=True)
+    device.connection.mode = commands.MODE_DIRTY
+    device.load_replace_candidate(config=RUNNING)
+    assert device.connection.names() == ['abort', 'get_config']
+    assert device.connection.mode == commands.MODE_OPERATIONAL
+
+
+def test_skip_unchanged_dirty_merge():
+    """A merge onto earlier changes is loaded from a file."""
+    device = driver(skip_unchanged=True)
+    device.connection.mode = commands.MODE_DIRTY
+    device.load_merge_candidate(config=RUNNING)
+    assert device.connection.names() == ['put', 'load']
+
+
+def test_delta_load_dirty():
+    """Delta loads only apply on top of a clean candidate."""
+    device = driver(delta_load=True, delta_threshold=1)
+    device.connection.mode = commands.MODE_DIRTY
+    device.load_merge_candidate(config="system\n hostname r2\n!\n")
+    assert device.connection.names() == ['put', 'load']
+    device.load_replace_candidate(config="system\n hostname r3\n!\n")
+    assert device.connection.names()[2:] == ['abort', 'get_config',
+                                             'send_config_set']
+
+
+def test_content_addressed_skip():
+    """A candidate already on the device with the same size is not sent."""
+    device = driver(content_addressed=True, candidate_retention=3)
+    device.load_merge_candidate(config=RUNNING)
+    name = device.candidate
+    assert CANDIDATE_PATTERN.match(name)
+    # older candidates are only pruned once this one is loaded
+    assert device.connection.calls == [
+        ('stat', name), ('put', name), ('load', commands.MERGE_CONFIG, name),
+        ('prune', 3, (name,))]
+    del device.connection.calls[:]
+    device.load_merge_candidate(config=RUNNING)
+    assert device.connection.names() == ['stat', 'touch', 'load']
+    device.connection.files[name] = 1
+    device.load_merge_candidate(config=RUNNING)
+    assert device.connection.names()[3:] == ['stat', 'put', 'load', 'prune']
+
+
+def test_content_addressed_without_sftp():
+    """Without SFTP the candidate is sent to the fixed name."""
+    device = driver(content_addressed=True)
+    device.connection.sftp = False
+    device.load_merge_candidate(config=RUNNING)
+    assert device.candidate == CANDIDATE
+    assert device.connection.calls == [
+        ('put', CANDIDATE), ('load', commands.MERGE_CONFIG, CANDIDATE)]
+
+
+def test_cached_running():
+    """The cached running configuration is revalidated by commit ID."""
+    device = driver(config_cache=True)
+    assert device.get_config(retrieve="running")["running"] == RUNNING
+    assert device.get_config(retrieve="running")["running"] == RUNNING
+    assert device.connection.names() == ['commit_id', 'get_config',
+                                         'commit_id']
+    device.connection.commit_id = '1000000002'
+    device.connection.running = "system\n hostname r2\n!\n"
+    assert device.get_config(retrieve="running")["running"] == (
+        device.connection.running)
+    assert device.connection.names()[3:] == ['commit_id', 'get_config']
+
+
+def test_cached_running_without_commit_id():
+    """Without a commit ID the running configuration is always fetched."""
+    device = driver(config_cache=True)
+    device.connection.commit_id = None
+    device.get_config(retrieve="running")
+    device.get_config(retrieve="running")
+    assert device.connection.names().count('get_config') == 2
+
+
+@pytest.mark.parametrize('operation', ['commit_config', 'discard_config',
+                                       'rollback_config'])
+def test_cache_invalidated(operation):
+    """Operations changing the configuration drop the cached copy."""
+    cache = ConfigCache()
+    device = driver(config_cache=cache)
+    device.get_config(retrieve="running")
+    assert cache.get('r1', '1000000001') == RUNNING
+    getattr(device, operation)()
+    assert cache.get('r1', '1000000001') is None
+
+
+def test_get_config_section_paths():
+    """Paths given as lists are returned keyed by tuples."""
+    device = driver()
+    nested = ['interface x-eth 0/0/1', 'ipv4-address']
+    assert device.get_config_section(['system', nested]) == {
+        'system': 'section 0', tuple(nested): 'section 1'}
+    assert device.get_config_section('system') == {'system': 'section 0'}
+
+
+def test_close_twice():
+    """Closing a closed driver does nothing."""
+    device = driver()
+    connection = device.connection
+    device.close()
+    device.close()
+    assert connection.names() == ['disconnect']
+    assert device.connection is None
+
+
+def test_close_twice_pooled():
+    """A pooled session is only checked in once."""
+    pool = SessionPool()
+    device = driver(session_pool=pool)
+    device.close()
+    device.close()
+    assert pool.stats()['idle'] == 1
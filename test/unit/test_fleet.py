@@ -0,0 +1,122 @@
+"""Tests for the fleet executor."""
+
+import threading
+import time
+
+from napalm_exaros.fleet import DeviceTimeoutError, Fleet
+
+
+class FakeDriver(object):
+    """Driver double recording calls."""
+
+    lock = threading.Lock()
+    active = {}
+    peak = {}
+    closed = []
+
+    def __init__(self, hostname, username, password, timeout=60,
+                 optional_args=None):
+        """Constructor."""
+        self.hostname = hostname
+        self.delay = (optional_args or {}).get('delay', 0)
+        self.candidate = None
+
+    def open(self):
+        """Open a session."""
+        if self.hostname == 'unreachable':
+            raise IOError("connection refused")
+        with self.lock:
+            count = self.active.get(self.hostname[0], 0) + 1
+            self.active[self.hostname[0]] = count
+            self.peak[self.hostname[0]] = max(
+                count, self.peak.get(self.hostname[0], 0))
+
+    def close(self):
+        """Close the session."""
+        with self.lock:
+            self.active[self.hostname[0]] -= 1
+        self.closed.append(self.hostname)
+
+    def get_config(self, retrieve="all"):
+        """Return a fake config."""
+        time.sleep(self.delay)
+        return {"running": self.hostname}
+
+    def load_merge_candidate(self, filename=None, config=None):
+        """Load a candidate."""
+        self.candidate = config
+
+    def compare_config(self):
+        """Return a diff if the candidate changes anything."""
+        if self.candidate == self.hostname:
+            return ""
+        return "+{0}".format(self.candidate)
+
+    def discard_config(self):
+        """Discard the candidate."""
+        self.candidate = None
+
+    def commit_config(self):
+        """Commit the candidate."""
+
+    def rollback(self):
+        """Revert the last commit."""
+        return "reverted {0}".format(self.hostname)
+
+
+def inventory(names, site=None, delay=0):
+    """Build an inventory."""
+    return dict((name, {'hostname': name, 'username': 'u', 'password': 'p',
+                        'site': site or name[0],
+                        'optional_args': {'delay': delay}})
+                for name in names)
+
+
+def test_run_yields_every_device():
+    """Every device produces exactly one result."""
+    fleet = Fleet(inventory(['a1', 'a2', 'b1', 'unreachable']),
+                  driver=FakeDriver)
+    results = dict((r.device, r) for r in fleet.get_config())
+    assert sorted(results) == ['a1', 'a2', 'b1', 'unreachable']
+    assert results['a1'].result == {"running": "a1"}
+    assert not results['unreachable'].ok
+    assert isinstance(results['unreachable'].exception, IOError)
+
+
+def test_site_limit():
+    """No more than site_limit sessions are open per site."""
+    FakeDriver.peak.clear()
+    names = ['x{0}'.format(i) for i in range(6)]
+    fleet = Fleet(inventory(names, delay=0.05), site_limit=2,
+                  driver=FakeDriver)
+    assert all(r.ok for r in fleet.get_config())
+    assert FakeDriver.peak['x'] == 2
+
+
+def test_timeout():
+    """Slow devices are reported as timed out."""
+    fleet = Fleet(inventory(['s1'], delay=0.5), timeout=0.1,
+                  driver=FakeDriver)
+    start = time.time()
+    results = list(fleet.get_config())
+    assert time.time() - start < 0.4
+    assert len(results) == 1
+    assert isinstance(results[0].exception, DeviceTimeoutError)
+
+
+def test_rollout_commits_changed_devices_in_waves():
+    """Only devices with a diff reach the commit stage."""
+    fleet = Fleet(inventory(['c1', 'c2', 'c3']), driver=FakeDriver)
+    results = list(fleet.rollout(config='c2', wave_size=1))
+    compares = [r for r in results if r.operation == 'compare']
+    commits = [r.device for r in results if r.operation == 'commit']
+    assert len(compares) == 3
+    assert commits == ['c1', 'c3']
+
+
+def test_rollback_selected_devices():
+    """Rollback runs only on the selected devices."""
+    fleet = Fleet(inventory(['d1', 'd2', 'd3']), driver=FakeDriver)
+    results = dict((r.device, r.result)
+                   for r in fleet.rollback(devices=['d1', 'd3']))
+    assert results == {'d1': 'reverted d1', 'd3': 'reverted d3'}
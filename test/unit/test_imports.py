@@ -0,0 +1,43 @@
+"""Tests for the lazy import layout."""
+
+import subprocess
+import sys
+
+import pytest
+
+SSH_MODULES = ('netmiko', 'paramiko', 'scp', 'textfsm')
+
+
+def _imported(statement):
+    """Return the modules imported by running statement in a new process."""
+    output = subprocess.check_output([
+        sys.executable, '-c',
+        "import sys\n{0}\nprint(' '.join(sys.modules))".format(statement)])
+    return set(output.decode('ascii').split())
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7),
+                    reason="module __getattr__ needs Python 3.7")
+def test_package_import():
+    """Importing the package imports neither napalm_base nor the SSH stack."""
+    modules = _imported("import napalm_exaros")
+    for name in ('napalm_base', 'napalm_exaros.exaros') + SSH_MODULES:
+        assert name not in modules
+
+
+def test_driver_import():
+    """Importing the driver module leaves the SSH stack to open()."""
+    baseline = _imported("import napalm_base.base, napalm_base.exceptions, "
+                         "napalm_base.utils.py23_compat")
+    modules = _imported("import napalm_exaros.exaros")
+    for name in SSH_MODULES:
+        assert name in baseline or name not in modules
+
+
+def test_lazy_attributes():
+    """ExaROSDriver and __version__ resolve on access."""
+    import napalm_exaros
+    from napalm_exaros.exaros import ExaROSDriver
+    assert napalm_exaros.ExaROSDriver is ExaROSDriver
+    assert 'ExaROSDriver' in dir(napalm_exaros)
+    assert napalm_exaros.__version__
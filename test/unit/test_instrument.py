@@ -0,0 +1,47 @@
+"""Tests for the instrumentation module."""
+
+from napalm_exaros.instrument import (
+    Callback,
+    Histogram,
+    Measurement,
+    NOOP_INSTRUMENT,
+    NOOP_SPAN,
+    )
+
+import pytest
+
+
+def test_noop():
+    """The default instrument hands out a shared span."""
+    with NOOP_INSTRUMENT.span('open', host='r1') as span:
+        span.add_bytes(10)
+    assert span is NOOP_SPAN
+
+
+def test_callback():
+    """Measurements carry the bytes, tags and error flag of the span."""
+    measurements = []
+    instrument = Callback(measurements.append)
+    with instrument.span('send_command', command='show version') as span:
+        span.add_bytes(42)
+    with pytest.raises(IOError):
+        with instrument.span('commit'):
+            raise IOError("timed out")
+    assert [(m.name, m.nbytes, m.error, m.tags) for m in measurements] == [
+        ('send_command', 42, False, {'command': 'show version'}),
+        ('commit', 0, True, {})]
+
+
+def test_histogram():
+    """The histogram aggregates measurements by span name."""
+    histogram = Histogram(buckets=(0.1, 1, float('inf')))
+    for elapsed in (0.05, 0.5, 0.6, 5):
+        histogram.record(Measurement('load', elapsed, 100, False, {}))
+    summary = histogram.summary()['load']
+    assert summary['count'] == 4
+    assert summary['bytes'] == 400
+    assert summary['max'] == 5
+    assert summary['buckets'] == [(0.1, 1), (1, 2), (float('inf'), 1)]
+    assert histogram.quantile('load', 0.5) == 1
+    assert histogram.quantile('load', 1) == 5
+    assert histogram.quantile('commit', 0.5) is None
@@ -0,0 +1,75 @@
+"""Tests for the configuration parser."""
+
+import os
+
+from napalm_exaros import parser
+
+import pytest
+
+RUNNING = os.path.join(os.path.dirname(__file__), 'mocked_data',
+                       'test_get_config', 'normal',
+                       'show_configuration_running_all.txt')
+
+
+@pytest.fixture(scope='module')
+def running():
+    """Return the mocked running configuration text."""
+    with open(RUNNING) as fobj:
+        return fobj.read()
+
+
+def test_sections(running):
+    """Top-level stanzas are indexed by keyword."""
+    tree = parser.parse(running)
+    interfaces = tree.section('interface')
+    assert len(interfaces) == 59
+    assert interfaces[0].line == 'interface mgmt 0/0/0'
+    assert [vrf.key for vrf in tree.section('vrf')] == \
+        ['vrf default', 'vrf management']
+
+
+def test_unique(running):
+    """Only a keyword used by a single child has a unique child."""
+    tree = parser.parse(running)
+    assert tree.unique('system').key == 'system'
+    assert tree.unique('interface') is None
+    assert tree.unique('missing') is None
+
+
+def test_non_ascii_keyword():
+    """Lines starting with a non-ASCII word are parsed and indexed."""
+    tree = parser.parse(u'caf\u00e9 1\n description x\n!\n')
+    assert tree.unique(u'caf\u00e9').key == u'caf\u00e9 1'
+
+
+def test_path_lookup(running):
+    """Nodes are found by path with whitespace normalised."""
+    tree = parser.parse(running)
+    node = tree.get('interface x-eth 0/0/0', 'admin-state up')
+    assert node.line == 'admin-state  up'
+    assert tree.get('routing bgp 65000', 'vrf default', 'neighbor 10.0.0.2',
+                    'group ibgp') is not None
+    assert tree.get('interface x-eth 9/9/9') is None
+    assert 'vrf management' in tree
+
+
+def test_closers(running):
+    """Block closers are recorded on the node they close."""
+    tree = parser.parse(running)
+    policy = tree.get('policy route permit-all')
+    assert policy.closers == ('end-policy', '!')
+    assert policy.get('rule permit-all').closers == ()
+    assert tree.get('vrf default').closers == ('!',)
+
+
+def test_round_trip(running):
+    """Rendering a parsed tree reproduces the configuration."""
+    tree = parser.parse(running)
+    expected = running.replace('!end-of-config', '').rstrip('\n') + '\n'
+    assert tree.text() == expected
+
+
+def test_parse_chunks(running):
+    """Parsing chunks of text gives the same tree as parsing the text."""
+    chunks = [running[i:i + 100] for i in range(0, len(running), 100)]
+    assert parser.parse(chunks).text() == parser.parse(running).text()
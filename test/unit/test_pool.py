@@ -0,0 +1,74 @@
+"""Tests for the session pool."""
+
+from napalm_exaros.pool import SessionPool
+
+
+class FakeSession(object):
+    """Session double."""
+
+    def __init__(self, healthy=True):
+        """Constructor."""
+        self.healthy = healthy
+        self.connected = True
+        self.probes = []
+
+    def probe(self, tier):
+        """Record a liveness probe."""
+        self.probes.append(tier)
+        return self.healthy, 0.0
+
+    def exit_config_mode(self):
+        """Leave configuration mode."""
+        return ""
+
+    def disconnect(self):
+        """Disconnect the session."""
+        self.connected = False
+
+
+def test_reuse():
+    """A checked in session is handed out again."""
+    pool = SessionPool(health_check=lambda s: s.healthy)
+    first = pool.checkout('r1', FakeSession)
+    pool.checkin('r1', first)
+    assert pool.checkout('r1', FakeSession) is first
+    assert pool.checkout('r1', FakeSession) is not first
+    assert pool.stats() == {'hits': 1, 'misses': 2, 'evictions': 0,
+                            'idle': 0}
+
+
+def test_unhealthy_evicted():
+    """Sessions failing the health check are disconnected."""
+    pool = SessionPool(health_check=lambda s: s.healthy)
+    session = FakeSession(healthy=False)
+    pool.checkin('r1', session)
+    assert pool.checkout('r1', FakeSession) is not session
+    assert not session.connected
+    assert pool.evictions == 1
+
+
+def test_ttl_and_max_idle():
+    """Expired and excess idle sessions are disconnected."""
+    pool = SessionPool(ttl=0, health_check=lambda s: s.healthy)
+    session = FakeSession()
+    pool.checkin('r1', session)
+    assert not session.connected
+    pool = SessionPool(max_idle=1, health_check=lambda s: s.healthy)
+    sessions = [FakeSession(), FakeSession()]
+    for s in sessions:
+        pool.checkin('r1', s)
+    assert [s.connected for s in sessions] == [False, True]
+
+
+def test_sweep():
+    """A sweep probes every idle session and evicts the dead ones."""
+    pool = SessionPool()
+    live, dead = FakeSession(), FakeSession(healthy=False)
+    pool.checkin('r1', live)
+    pool.checkin('r2', dead)
+    results = sorted(pool.sweep(tier='transport'))
+    assert [(key, alive) for key, alive, latency in results] == [
+        ('r1', True), ('r2', False)]
+    assert live.probes == ['transport']
+    assert not dead.connected
+    assert pool.checkout('r1', FakeSession) is live
@@ -0,0 +1,79 @@
+"""Tests for session recording and replay."""
+
+import time
+
+from napalm_exaros import commands
+from napalm_exaros.replay import ReplayError, ReplaySSH, Session
+from napalm_exaros.replay import SessionRecorder
+from napalm_exaros.ssh import MODE_CONFIG, MODE_OPERATIONAL
+
+import pytest
+
+from test_ssh import FakeSSH
+
+RUNNING = "system\n hostname router\n!\n"
+DIFF = "+interface loopback 1\n+!"
+
+
+def record_session(path):
+    """Record a load, compare and commit session."""
+    recorder = SessionRecorder(path, host='router')
+    recorder.record('open', None, 'router', 0.5)
+    recorder.record('command', commands.CONFIG_MODE, 'router(config)#', 0.01)
+    recorder.record('command', commands.SHOW_RUNNING, RUNNING, 0.02)
+    recorder.record('put', 'candidate.conf', '', 0.03)
+    recorder.record('command', 'load merge candidate.conf',
+                    'Operation completed successfully', 0.04)
+    recorder.record('command', commands.COMPARE, DIFF, 0.05)
+    recorder.record('command', commands.COMPARE,
+                    '% No configuration changes found.', 0.05)
+    recorder.record('stream', commands.SHOW_RUNNING, RUNNING, 0.02)
+    recorder.record('config', 'hostname r1\nhostname r2', 'router(config)#',
+                    0.01)
+    recorder.close()
+
+
+@pytest.mark.parametrize('name', ['session.json', 'session.json.gz'])
+def test_replay(tmpdir, name):
+    """A replayed session returns the recorded outputs in order."""
+    path = str(tmpdir.join(name))
+    record_session(path)
+    ssh = ReplaySSH(path)
+    assert ssh.base_prompt == 'router'
+    assert ssh.mode == MODE_OPERATIONAL
+    assert ssh.get_config(store='running') == RUNNING
+    assert ''.join(ssh.stream_config(store='running')) == RUNNING
+    ssh.scp_put_data(RUNNING, dest_file='candidate.conf')
+    ssh.load(operation='merge', file='candidate.conf')
+    assert ssh.compare() == DIFF
+    assert ssh.compare() == ''
+    assert ssh.mode == MODE_CONFIG
+    assert ssh.compare() == ''
+    ssh.send_config_set(['hostname r1', 'hostname r2'])
+    with pytest.raises(ReplayError):
+        ssh.send_command('show version')
+    assert len(Session(path)) == 9
+
+
+def test_replay_timing(tmpdir):
+    """Replay with timing waits for the scaled recorded latency."""
+    path = str(tmpdir.join('session.json'))
+    record_session(path)
+    ssh = ReplaySSH(Session(path), timing=2.0)
+    start = time.time()
+    ssh.send_command(commands.SHOW_RUNNING)
+    assert time.time() - start >= 0.04
+
+
+def test_record(tmpdir):
+    """Commands run on a session are recorded with their output."""
+    path = str(tmpdir.join('session.json'))
+    ssh = FakeSSH(max_channels=1)
+    ssh.recorder = SessionRecorder(path)
+    ssh.recorder.record('open', None, ssh.base_prompt, 0.0)
+    ssh.send_command_parallel(['show version', 'show clock'])
+    ssh.recorder.close()
+    replay = ReplaySSH(path)
+    replay.max_channels = 1
+    assert replay.send_command_parallel(['show clock', 'show version']) == [
+        'output of show clock', 'output of show version']
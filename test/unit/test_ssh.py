@@ -0,0 +1,636 @@
+"""Tests for the SSH side channels and commits."""
+
+import codecs
+import collections
+import os
+import re
+import socket
+import threading
+import time
+
+from napalm_exaros import commands
+from napalm_exaros.replay import ReplaySSH, SessionRecorder
+from napalm_exaros.ssh import ExaROSChannel, ExaROSSSH, MAX_BUFFER
+from napalm_exaros.ssh import MODE_CONFIG, MODE_DIRTY, MODE_OPERATIONAL
+from napalm_exaros.ssh import MODE_UNKNOWN
+
+from netmiko import BaseConnection
+
+import paramiko
+
+import pytest
+
+PROMPT = 'admin@ex1-lab# '
+CONFIG_PROMPT = 'admin@ex1-lab(config)# '
+
+
+class FakeChannel(object):
+    """Paramiko channel double answering each command with its name."""
+
+    def __init__(self):
+        """Constructor."""
+        self.closed = False
+        self.sent = []
+        self._buffer = b''
+
+    def get_pty(self, **kwargs):
+        """Request a pseudo-terminal."""
+
+    def invoke_shell(self):
+        """Start the shell, which prints the prompt."""
+        self._buffer += b'router#'
+
+    def sendall(self, data):
+        """Echo the command and reply with its output and the prompt."""
+        command = data.decode('utf-8').strip()
+        self.sent.append(command)
+        self._buffer += '{0}\r\noutput of {0}\r\nrouter#'.format(
+            command).encode('utf-8')
+
+    def recv_ready(self):
+        """Return True if there is data to read."""
+        return bool(self._buffer)
+
+    def recv(self, size):
+        """Read up to size bytes."""
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def close(self):
+        """Close the channel."""
+        self.closed = True
+
+
+class FakeTransport(object):
+    """Paramiko transport double."""
+
+    def __init__(self, channel_class=FakeChannel):
+        """Constructor."""
+        self.channel_class = channel_class
+        self.channels = []
+        self.lock = threading.Lock()
+
+    def open_session(self):
+        """Open a channel."""
+        with self.lock:
+            self.channels.append(self.channel_class())
+            return self.channels[-1]
+
+    def get_transport(self):
+        """Return the transport of the primary channel."""
+        return self
+
+
+class FakeSSH(ExaROSSSH):
+    """ExaROSSSH without a primary session."""
+
+    def __init__(self, max_channels):
+        """Constructor."""
+        self.base_prompt = 'router'
+        self.remote_conn = FakeTransport()
+        self.max_channels = max_channels
+
+    def select_delay_factor(self, delay_factor):
+        """Set dummy delay_factor."""
+        return 1
+
+
+class KeepaliveTransport(object):
+    """Paramiko transport double replying to keepalives, or never."""
+
+    def __init__(self, active=True, reply=True):
+        """Constructor."""
+        self.active = active
+        self.reply = reply
+        self.requests = []
+        self._never = threading.Event()
+
+    def is_active(self):
+        """Return True if the transport is active."""
+        return self.active
+
+    def global_request(self, kind, wait=True):
+        """Send a global request and wait for the reply."""
+        self.requests.append(kind)
+        if not self.reply:
+            self._never.wait(1)
+
+
+class ScriptedChannel(object):
+    """Paramiko channel double replying to commands with scripted chunks.
+
+    script maps each command to the chunks read after it is written,
+    including its echo and the prompt, as text or bytes. A command mapped
+    to an exception raises it when written.
+    """
+
+    def __init__(self, script):
+        """Constructor."""
+        self.script = script
+        self.sent = []
+        self.transport = KeepaliveTransport()
+        self._chunks = collections.deque()
+
+    def get_transport(self):
+        """Return the transport of the channel."""
+        return self.transport
+
+    def send(self, data):
+        """Queue the replies to each command line written."""
+        for command in data.split('\n')[:-1]:
+            self.sent.append(command)
+            reply = self.script[command]
+            if isinstance(reply, Exception):
+                raise reply
+            self._chunks.extend(chunk if isinstance(chunk, bytes)
+                                else chunk.encode('utf-8') for chunk in reply)
+
+    def recv_ready(self):
+        """Return True if there is data to read."""
+        return bool(self._chunks)
+
+    def recv(self, size):
+        """Read the next chunk."""
+        return self._chunks.popleft()
+
+
+class ScriptedConnection(BaseConnection):
+    """Netmiko connection double on a scripted channel."""
+
+    RETURN = RESPONSE_RETURN = '\n'
+
+    def send_command(self, command_string, expect_string=None,
+                     strip_prompt=True, strip_command=True, **kwargs):
+        """Return the output of a command, up to the prompt."""
+        self.write_channel(self.normalize_cmd(command_string))
+        output = ""
+        while self.remote_conn.recv_ready():
+            output += self.read_channel()
+        output = self.normalize_linefeeds(output)
+        if strip_command:
+            output = self.strip_command(command_string, output)
+        if strip_prompt:
+            output = self.strip_prompt(output)
+        return output
+
+    def check_config_mode(self, check_string='', pattern='', **kwargs):
+        """Check the last prompt read for check_string."""
+        return check_string in self.prompt
+
+
+class ScriptedSSH(ExaROSSSH, ScriptedConnection):
+    """ExaROSSSH on a scripted primary channel."""
+
+    def __init__(self, script, mode=MODE_OPERATIONAL):
+        """Constructor."""
+        self.base_prompt = 'admin@ex1-lab'
+        self.remote_conn = ScriptedChannel(script)
+        self.prompt = PROMPT
+        self._mode = mode
+        self._decoder = codecs.getincrementaldecoder('utf-8')('replace')
+
+    def select_delay_factor(self, delay_factor):
+        """Set dummy delay_factor."""
+        return 1
+
+    def write_channel(self, out_data):
+        """Write to the channel."""
+        self.remote_conn.send(out_data)
+
+    def read_channel(self):
+        """Read a chunk, keeping the last line as the prompt."""
+        if not self.remote_conn.recv_ready():
+            return ""
+        data = self._decoder.decode(self.remote_conn.recv(MAX_BUFFER))
+        self.prompt = (self.prompt + data).rsplit('\n', 1)[-1]
+        return data
+
+    def _wait_readable(self, timeout):
+        """Fail at once rather than wait for output that never comes."""
+        raise IOError("Timed-out waiting for output")
+
+
+def test_markers_split_prompt():
+    """A prompt split across reads after a marker is drained."""
+    ssh = ScriptedSSH({
+        'commit': ['commit\r\nCommit complete.\r\nadmin@ex1',
+                   '-lab(config)# '],
+        'show version': ['show version\r\nExaROS 3.2\r\n', CONFIG_PROMPT],
+    }, mode=MODE_CONFIG)
+    outcome, output = ssh.send_command_markers(
+        'commit', markers=commands.COMMIT_MARKERS)
+    assert outcome == commands.OUTCOME_SUCCESS
+    assert output == 'Commit complete.\n'
+    assert ssh.send_command_markers('show version') == (
+        commands.OUTCOME_PROMPT, 'ExaROS 3.2')
+    assert not ssh.remote_conn.recv_ready()
+
+
+def test_drain_prompt():
+    """A prompt read after a marker is consumed before the next command."""
+    ssh = ScriptedSSH({
+        'load merge c.conf': ['load merge c.conf\r\nLoading.\r\n',
+                              'Operation completed successfully\r\n',
+                              CONFIG_PROMPT],
+    }, mode=MODE_CONFIG)
+    outcome, output = ssh.send_command_markers(
+        'load merge c.conf', markers=commands.LOAD_MARKERS)
+    assert outcome == commands.OUTCOME_SUCCESS
+    assert ssh.remote_conn.recv_ready()
+    ssh._drain_prompt()
+    assert not ssh.remote_conn.recv_ready()
+    assert not ssh._prompt_pending
+
+
+def test_probe():
+    """Each tier checks the session as far as it goes."""
+    ssh = ScriptedSSH({'': ['\r\n', PROMPT]})
+    transport = ssh.remote_conn.transport
+    alive, latency = ssh.probe(commands.ALIVE_TRANSPORT)
+    assert alive and latency >= 0
+    assert ssh.remote_conn.sent == [] and transport.requests == []
+    assert ssh.probe(commands.ALIVE_KEEPALIVE)[0]
+    assert transport.requests == [commands.KEEPALIVE_REQUEST]
+    assert ssh.probe(commands.ALIVE_PROMPT)[0]
+    assert ssh.remote_conn.sent == ['']
+    with pytest.raises(ValueError):
+        ssh.probe('ping')
+
+
+def test_probe_dead_transport():
+    """No tier sends anything on a transport that is no longer active."""
+    ssh = ScriptedSSH({})
+    ssh.remote_conn.transport = KeepaliveTransport(active=False)
+    for tier in commands.ALIVE_TIERS:
+        assert not ssh.probe(tier)[0]
+    ssh.remote_conn.transport = None
+    assert not ssh._probe(commands.ALIVE_PROMPT, 1)
+    assert ssh.remote_conn.sent == []
+
+
+def test_probe_prompt_timeout():
+    """A missing prompt fails the probe, and is drained if it comes late."""
+    ssh = ScriptedSSH({'': ['\r\n']})
+    assert not ssh.probe(commands.ALIVE_PROMPT, timeout=0.01)[0]
+    assert ssh._prompt_pending
+
+
+def test_keepalive_timeout():
+    """An unanswered keepalive fails, and is not sent again until answered."""
+    ssh = ScriptedSSH({})
+    transport = KeepaliveTransport(reply=False)
+    start = time.time()
+    assert not ssh._keepalive(transport, 0.05)
+    assert not ssh._keepalive(transport, 0.05)
+    assert time.time() - start < 0.5
+    assert transport.requests == [commands.KEEPALIVE_REQUEST]
+    # once the late reply arrives, the next probe sends a new request
+    transport.reply = True
+    transport._never.set()
+    assert ssh._keepalive_reply.wait(1)
+    assert ssh._keepalive(transport, 1)
+    assert len(transport.requests) == 2
+
+
+def test_channel():
+    """A side channel is prepared and strips echo and prompt."""
+    channel = ExaROSChannel(FakeTransport(), 'router')
+    assert channel.send_command('show version') == 'output of show version'
+    channel.config_mode()
+    channel.close()
+    assert channel.channel.sent == ['session paginate disable',
+                                    'terminal width 511', 'show version',
+                                    'configure private', 'abort']
+    assert channel.channel.closed
+
+
+class FakeSFTP(object):
+    """Paramiko SFTP client double on a fake transport."""
+
+    def __init__(self, transport, files):
+        """Constructor.
+
+        files maps the names of remote files to their mtime.
+        """
+        self.transport = transport
+        self.files = files
+
+    def get_channel(self):
+        """Return the channel of the client."""
+        return self
+
+    def get_transport(self):
+        """Return the transport of the channel."""
+        return self.transport
+
+    def listdir_attr(self, path):
+        """Return the attributes of the remote files."""
+        attrs = []
+        for filename, mtime in self.files.items():
+            stat = os.stat_result((0o100644, 0, 0, 1, 0, 0, 10, mtime, mtime,
+                                   mtime))
+            attrs.append(paramiko.SFTPAttributes.from_stat(stat, filename))
+        return attrs
+
+    def remove(self, path):
+        """Remove a remote file."""
+        del self.files[path]
+
+    def utime(self, path, times):
+        """Set the modification time of a remote file to now."""
+        if path not in self.files:
+            raise IOError("No such file")
+        self.files[path] = time.time()
+
+
+def test_prune_remote_files():
+    """Only the newest matching files, and excluded ones, are kept."""
+    ssh = FakeSSH(max_channels=0)
+    files = dict(('napalm-{0:016x}.conf'.format(i), 100 + i)
+                 for i in range(5))
+    files['startup.conf'] = 0
+    ssh._sftp = FakeSFTP(ssh.remote_conn, files)
+    assert ssh.sftp_available()
+    pattern = re.compile(r'^napalm-[0-9a-f]{16}\.conf$')
+    ssh.prune_remote_files(pattern, keep=3,
+                           exclude=('napalm-0000000000000000.conf',))
+    assert sorted(files) == ['napalm-0000000000000000.conf',
+                             'napalm-0000000000000003.conf',
+                             'napalm-0000000000000004.conf', 'startup.conf']
+
+
+def test_prune_remote_files_grace():
+    """Files modified shortly before the excluded one are kept."""
+    ssh = FakeSSH(max_channels=0)
+    files = dict(('napalm-{0:016x}.conf'.format(i), 100 * i)
+                 for i in range(5))
+    ssh._sftp = FakeSFTP(ssh.remote_conn, files)
+    pattern = re.compile(r'^napalm-[0-9a-f]{16}\.conf$')
+    ssh.prune_remote_files(pattern, keep=1,
+                           exclude=('napalm-0000000000000004.conf',),
+                           grace=150)
+    assert sorted(files) == ['napalm-0000000000000003.conf',
+                             'napalm-0000000000000004.conf']
+
+
+def test_touch_remote_file():
+    """Touching a remote file sets its modification time."""
+    ssh = FakeSSH(max_channels=0)
+    files = {'napalm-0000000000000000.conf': 0}
+    ssh._sftp = FakeSFTP(ssh.remote_conn, files)
+    ssh.touch_remote_file('napalm-0000000000000000.conf')
+    assert files['napalm-0000000000000000.conf'] > 0
+    ssh.touch_remote_file('missing.conf')
+
+
+class FakeSCP(object):
+    """SCP client double keeping the uploaded data."""
+
+    def __init__(self, transport):
+        """Constructor."""
+        self.transport = transport
+        self.files = {}
+
+    def putfo(self, fl, remote_path):
+        """Upload a file object."""
+        self.files[remote_path] = fl.read()
+
+
+@pytest.mark.parametrize('data', [
+    b'hostname r1\nhostname r2\n', u'hostname r1\nhostname r2\n',
+    ['hostname r1', u'hostname r2\n'],
+])
+def test_scp_put_data(data):
+    """In-memory data is uploaded without a temporary file."""
+    ssh = FakeSSH(max_channels=0)
+    ssh._scp = FakeSCP(ssh.remote_conn)
+    ssh.scp_put_data(data, dest_file='candidate.conf')
+    assert ssh._scp.files == {'candidate.conf': b'hostname r1\nhostname r2\n'}
+
+
+class FailingChannel(FakeChannel):
+    """Paramiko channel double whose shell fails to start."""
+
+    def invoke_shell(self):
+        """Fail to start the shell."""
+        raise socket.error("channel refused")
+
+
+def test_channel_failed_preparation():
+    """A side channel that fails to start is closed, and its slot freed."""
+    ssh = FakeSSH(max_channels=1)
+    ssh.remote_conn = FakeTransport(FailingChannel)
+    with pytest.raises(socket.error):
+        ssh.send_command_parallel(['show version'])
+    assert [c.closed for c in ssh.remote_conn.channels] == [True]
+    assert ssh._channels[1] == [0]
+
+
+def test_send_command_parallel():
+    """Commands run on reusable side channels and keep their order."""
+    ssh = FakeSSH(max_channels=2)
+    command_list = ['show {0}'.format(i) for i in range(5)]
+    outputs = ssh.send_command_parallel(command_list)
+    assert outputs == ['output of {0}'.format(c) for c in command_list]
+    opened = len(ssh.remote_conn.channels)
+    assert 1 <= opened <= 2
+    ssh.send_command_parallel(command_list)
+    assert len(ssh.remote_conn.channels) <= 2
+    assert ssh._channels[1] == [len(ssh.remote_conn.channels)]
+    ssh.close_channels()
+    assert all(c.closed for c in ssh.remote_conn.channels)
+
+
+def test_send_command_parallel_modes():
+    """Side channels are in the mode each caller asks for."""
+    ssh = FakeSSH(max_channels=1)
+    ssh.send_command_parallel(['show candidate all'], config_mode=True)
+    ssh.send_command_parallel(['show version'])
+    ssh.send_command_parallel(['show candidate all'], config_mode=True)
+    channel, = ssh.remote_conn.channels
+    assert channel.sent[2:] == ['configure private', 'show candidate all',
+                                'abort', 'show version',
+                                'configure private', 'show candidate all']
+
+
+def test_send_command_parallel_primary():
+    """Without side channels, shows keep the primary's candidate."""
+    ssh = ScriptedSSH({
+        commands.CONFIG_MODE: ['configure private\r\n', CONFIG_PROMPT],
+        'show version': ['show version\r\nModel : EX-800\r\n', PROMPT],
+        'do show version': ['do show version\r\nModel : EX-800\r\n',
+                            CONFIG_PROMPT],
+    })
+    assert ssh.send_command_parallel(['show version']) == ['Model : EX-800']
+    ssh.config_mode()
+    ssh._mode = MODE_DIRTY
+    assert ssh.send_command_parallel(['show version']) == ['Model : EX-800']
+    assert ssh.mode == MODE_DIRTY
+    assert ssh.remote_conn.sent == ['show version', 'configure private',
+                                    'do show version']
+
+
+def replay(tmpdir, exchanges):
+    """Return a session replaying exchanges of commands and outputs."""
+    path = str(tmpdir.join('session.json'))
+    recorder = SessionRecorder(path)
+    recorder.record('open', None, 'router', 0.0)
+    recorder.record('command', commands.CONFIG_MODE, 'router(config)#', 0.0)
+    for command, output in exchanges:
+        recorder.record('command', command, output, 0.0)
+    recorder.close()
+    return ReplaySSH(path)
+
+
+def test_commit_pipelined(tmpdir):
+    """A pipelined commit check fails the commit."""
+    ssh = replay(tmpdir, [
+        (commands.COMMIT_CHECK, 'Error: bad value'),
+        ('commit confirmed 5', 'Aborted: bad value'),
+    ])
+    with pytest.raises(ValueError) as excinfo:
+        ssh.commit(check=commands.COMMIT_CHECK_PIPELINED, confirmed=5)
+    assert 'Commit check failed' in str(excinfo.value)
+    assert not ssh.confirm_pending
+
+
+def test_commit_pipelined_committed(tmpdir):
+    """A pipelined commit that went through is tracked as committed."""
+    ssh = replay(tmpdir, [
+        (commands.COMMIT_CHECK, 'Warning: interface x-eth 0/0/1 is down'),
+        ('commit confirmed 5', 'Commit complete.'),
+    ])
+    ssh._mode = MODE_DIRTY
+    assert ssh.commit(check=commands.COMMIT_CHECK_PIPELINED,
+                      confirmed=5) == 'Commit complete.'
+    assert ssh.confirm_pending
+    assert ssh.mode == MODE_CONFIG
+
+
+def test_commit_confirmed(tmpdir):
+    """A confirmed commit is pending until it is confirmed."""
+    ssh = replay(tmpdir, [
+        ('commit confirmed 5', 'Commit complete.'),
+        (commands.COMMIT, 'Commit complete.'),
+    ])
+    ssh.commit(check=commands.COMMIT_CHECK_SKIP, confirmed=5)
+    assert ssh.confirm_pending
+    ssh.confirm_commit()
+    assert not ssh.confirm_pending
+    with pytest.raises(ValueError):
+        ssh.confirm_commit()
+
+
+def test_rollback(tmpdir):
+    """Rollback reverts the latest commit with the label."""
+    ssh = replay(tmpdir, [
+        (commands.COMMIT_LIST, '  0     1000000001  admin  other\n'
+                               '  1     1000000000  admin  napalm'),
+        ('rollback configuration 1000000000', ''),
+        ('commit comment "rollback of commit 1000000000 using '
+         'napalm_exaros"', 'Commit complete.'),
+    ])
+    ssh.rollback(label='napalm', check=commands.COMMIT_CHECK_SKIP)
+    assert ssh.mode == MODE_CONFIG
+    with pytest.raises(ValueError):
+        ssh.rollback(label='missing')
+
+
+def test_config_mode_transitions():
+    """Entering and leaving configuration mode is only sent when needed."""
+    ssh = ScriptedSSH({
+        commands.CONFIG_MODE: ['configure private\r\n', CONFIG_PROMPT],
+        commands.EXIT_CONFIG_MODE: ['abort\r\n', PROMPT],
+    })
+    ssh.config_mode()
+    ssh.config_mode()
+    assert ssh.mode == MODE_CONFIG
+    ssh.exit_config_mode()
+    ssh.exit_config_mode()
+    assert ssh.mode == MODE_OPERATIONAL
+    assert ssh.remote_conn.sent == ['configure private', 'abort']
+
+
+def test_resync_after_failure():
+    """A failed command makes the mode unknown until the prompt is read."""
+    ssh = ScriptedSSH({
+        commands.CONFIG_MODE: ['configure private\r\n', CONFIG_PROMPT],
+        'show version': socket.error("connection reset"),
+    })
+    ssh.config_mode()
+    with pytest.raises(socket.error):
+        ssh.send_command_markers('show version')
+    assert ssh.mode == MODE_UNKNOWN
+    # the device prompt shows a configuration session of unknown state
+    ssh.config_mode()
+    assert ssh.mode == MODE_DIRTY
+    assert ssh.remote_conn.sent == ['configure private', 'show version']
+    ssh._mode = MODE_UNKNOWN
+    ssh.prompt = PROMPT
+    assert ssh.resync_mode() == MODE_OPERATIONAL
+
+
+def test_load_compare_commit_modes():
+    """Load dirties the candidate, and a clean compare or commit cleans it."""
+    script = {
+        commands.CONFIG_MODE: ['configure private\r\n', CONFIG_PROMPT],
+        'load merge c.conf': ['load merge c.conf\r\n'
+                              'Operation completed successfully\r\n',
+                              CONFIG_PROMPT],
+        commands.COMPARE: ['show candidate diff all\r\n+ hostname r1\r\n',
+                           CONFIG_PROMPT],
+        commands.COMMIT_CHECK: ['commit check\r\nValidation complete\r\n',
+                                CONFIG_PROMPT],
+        'commit': ['commit\r\nCommit complete.\r\n', CONFIG_PROMPT],
+    }
+    ssh = ScriptedSSH(script)
+    ssh.load(operation='merge', file='c.conf')
+    assert ssh.mode == MODE_DIRTY
+    assert ssh.compare() == '+ hostname r1'
+    assert ssh.mode == MODE_DIRTY
+    ssh.commit()
+    assert ssh.mode == MODE_CONFIG
+    # a clean session is known to have no changes without asking
+    assert not ssh.candidate_changed()
+    script[commands.COMPARE] = ['show candidate diff all\r\n'
+                                '% No configuration changes found.\r\n',
+                                CONFIG_PROMPT]
+    ssh._mode = MODE_DIRTY
+    assert ssh.compare() == ''
+    assert ssh.mode == MODE_CONFIG
+    assert ssh.remote_conn.sent.count(commands.COMPARE) == 2
+
+
+def test_stream_command():
+    """Streamed output is stripped of echo and prompt, line by line."""
+    ssh = ScriptedSSH({
+        commands.SHOW_RUNNING: ['show configuration running all\r\nsys',
+                                'tem\r\n hostname r1\r\n!\r\n' + PROMPT],
+    })
+    chunks = list(ssh.stream_command(commands.SHOW_RUNNING))
+    assert all(chunk.endswith('\n') for chunk in chunks)
+    assert ''.join(chunks) == 'system\n hostname r1\n!\n'
+
+
+def test_stream_command_split_utf8():
+    """A character split across reads is decoded whole."""
+    data = b' description "caf\xc3\xa9"\r\n'
+    split = data.index(b'\xa9')
+    ssh = ScriptedSSH({
+        'show x': [b'show x\r\n' + data[:split], data[split:], PROMPT],
+    })
+    assert ''.join(ssh.stream_command('show x')) == \
+        u' description "caf\u00e9"\n'
+
+
+def test_stream_command_stopped_early():
+    """The rest of a stream is drained if the caller stops early."""
+    ssh = ScriptedSSH({
+        'show x': ['show x\r\none\r\n', 'two\r\n', 'three\r\n', PROMPT],
+        'show y': ['show y\r\ny\r\n', PROMPT],
+    })
+    stream = ssh.stream_command('show x')
+    assert next(stream) == 'one\n'
+    stream.close()
+    assert not ssh.remote_conn.recv_ready()
+    assert ssh.send_command_markers('show y')[1] == 'y'
@@ -0,0 +1,32 @@
+"""Tests for the utils package."""
+
+from napalm_exaros import utils
+
+import pytest
+
+CONFIG = b'system\n hostname caf\xc3\xa9\n!\n'
+
+
+def test_textfsm_extractor():
+    """Templates are compiled once and reset between uses."""
+    text = "x-eth 0/0/0  52:54:00:12:34:56  eth1  ar1-lab\n"
+    first = utils.textfsm_extractor('show_lldp_neighbors', text)
+    fsm = utils._templates['show_lldp_neighbors'][0]
+    second = utils.textfsm_extractor('show_lldp_neighbors', text)
+    assert utils._templates['show_lldp_neighbors'][0] is fsm
+    assert first == second == [{
+        'local_port': 'x-eth 0/0/0', 'chassis_id': '52:54:00:12:34:56',
+        'port': 'eth1', 'hostname': 'ar1-lab'}]
+
+
+@pytest.mark.parametrize('data', [
+    CONFIG,
+    CONFIG.decode('utf-8'),
+    [u'system', u' hostname caf\u00e9\n', b'!'],
+    (line for line in CONFIG.decode('utf-8').splitlines()),
+])
+def test_config_buffer(data):
+    """Bytes, text and iterables of lines are buffered as UTF-8 lines."""
+    buf = utils.config_buffer(data)
+    assert buf.tell() == 0
+    assert buf.read() == CONFIG